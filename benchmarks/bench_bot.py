@@ -0,0 +1,160 @@
+"""Сквозной нагрузочный тест бота на имитаторах Telegram Bot API и GigaChat.
+
+Каждый сценарий выполняется в отдельном процессе: пропускная способность,
+p50/p95/p99 задержки обработки обновления и пиковый RSS (бот и воркеры извлечения).
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_bot --requests 50 --chats 10 --latency 0.3
+    python -m benchmarks.bench_bot --scenario text pdf --size medium --rate 5
+"""
+import argparse
+import asyncio
+import logging
+import tempfile
+import time
+
+from gigachat import GigaChat
+
+from benchmarks.corpus import build_corpus
+from benchmarks.fake_gigachat import FakeGigaChatServer
+from benchmarks.fake_telegram import BENCH_TOKEN, FakeTelegramServer, UpdateFactory
+from benchmarks.report import latency_summary, peak_rss_mb, print_table, run_isolated
+from config import Config
+
+# Сценарий -> виды сообщений, которые в нем чередуются
+SCENARIOS = {
+    "text": ["text"],
+    "image": ["image"],
+    "pdf": ["pdf"],
+    "pdf_scan": ["pdf_scan"],
+    "docx": ["docx"],
+    "xlsx": ["xlsx"],
+    "mixed": ["text", "text", "image", "pdf", "docx", "xlsx"],
+}
+
+FAILURE_PREFIXES = ("❌", "🐢", "🤖 Извините")
+
+
+def configure(args, telegram: FakeTelegramServer, cache_dir: str):
+    """Настройки бота для прогона: локальные адреса, без лимитов на пользователя и без /metrics"""
+    Config.TELEGRAM_TOKEN = BENCH_TOKEN
+    Config.TELEGRAM_API_URL = telegram.base_url
+    Config.TELEGRAM_FILE_URL = telegram.base_file_url
+    Config.METRICS_PORT = 0
+    Config.TRACE_FILE = ""
+    Config.STREAM_REPLIES = args.stream
+    Config.STORAGE_DB = ""
+    Config.EXTRACTION_CACHE_DIR = cache_dir
+    Config.RATE_LIMIT_TEXT_BURST = Config.RATE_LIMIT_OCR_BURST = args.requests + 1
+    if args.workers:
+        Config.EXTRACTION_WORKERS = args.workers
+
+
+def make_updates(factory: UpdateFactory, kinds: list, requests: int, corpus: dict) -> list:
+    updates = []
+    for i in range(requests):
+        kind = kinds[i % len(kinds)]
+        if kind == "text":
+            updates.append(factory.text(i))
+            continue
+        variants = corpus[kind]
+        item = variants[i % len(variants)]
+        data = item.path.read_bytes()
+        if kind == "image":
+            updates.append(factory.photo(i, data))
+        else:
+            updates.append(factory.document(i, data, item.path.name, item.mime_type))
+    return updates
+
+
+async def run_scenario(name: str, args) -> dict:
+    # Импорт после разбора аргументов: bot.py настраивает логирование при импорте
+    from bot import OfficeAssistantBot
+    logging.getLogger().setLevel(logging.WARNING)
+
+    kinds = SCENARIOS[name]
+    file_kinds = sorted(set(kinds) - {"text"})
+    corpus = {}
+    for item in build_corpus(args.corpus, (args.size,), file_kinds, args.variants):
+        corpus.setdefault(item.name.rsplit("_", 2)[0], []).append(item)
+
+    gigachat = FakeGigaChatServer(latency=args.latency, chunk_delay=args.chunk_delay).start()
+    telegram = await FakeTelegramServer().start()
+    cache_dir = tempfile.TemporaryDirectory()
+    configure(args, telegram, cache_dir.name)
+
+    bot = OfficeAssistantBot()
+    bot.gigachat_client.client = GigaChat(
+        base_url=gigachat.base_url, access_token="bench", timeout=Config.GIGA_CHAT_TIMEOUT
+    )
+    application = bot.build_application(with_updater=False)
+    latencies = []
+
+    async def process(update, delay: float):
+        await asyncio.sleep(delay)
+        start = time.perf_counter()
+        # Тот же путь, что у обновлений из polling/webhook: с ограничением CONCURRENT_UPDATES
+        await application.update_processor.process_update(update, application.process_update(update))
+        latencies.append(time.perf_counter() - start)
+
+    try:
+        async with application:
+            updates = make_updates(UpdateFactory(application.bot, telegram, args.chats), kinds, args.requests, corpus)
+            start = time.perf_counter()
+            await asyncio.gather(*(
+                process(update, i / args.rate if args.rate else 0) for i, update in enumerate(updates)
+            ))
+            elapsed = time.perf_counter() - start
+    finally:
+        # Ожидание завершения воркеров - чтобы их пиковая память попала в RUSAGE_CHILDREN
+        bot.extractor.shutdown(wait=True)
+        await bot.shutdown(application)
+        await telegram.stop()
+        gigachat.stop()
+        cache_dir.cleanup()
+
+    failures = sum(1 for _, _, text, _ in telegram.sent if text.startswith(FAILURE_PREFIXES))
+    return {
+        "scenario": name,
+        **latency_summary(latencies, elapsed),
+        "failed": failures,
+        "api_calls": len(telegram.sent),
+        "cache_hit": round(bot.extraction_cache.hit_rate, 2),
+        **peak_rss_mb(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", nargs="+", default=list(SCENARIOS), choices=list(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--chats", type=int, default=10)
+    parser.add_argument("--rate", type=float, default=0, help="обновлений в секунду; 0 - все сразу")
+    parser.add_argument("--latency", type=float, default=0.3, help="задержка первого токена GigaChat, сек")
+    parser.add_argument("--chunk-delay", type=float, default=0.02)
+    parser.add_argument("--stream", action=argparse.BooleanOptionalAction, default=True)
+    parser.add_argument("--size", default="small", choices=["small", "medium", "large"])
+    parser.add_argument("--variants", type=int, default=4, help="разных файлов каждого вида")
+    parser.add_argument("--workers", type=int, default=0, help="EXTRACTION_WORKERS; 0 - из настроек")
+    parser.add_argument("--corpus", default="bench_corpus")
+    parser.add_argument("--json", action="store_true", help="один сценарий в текущем процессе, результат JSON")
+    args = parser.parse_args()
+
+    if args.json:
+        import json
+        print(json.dumps(asyncio.run(run_scenario(args.scenario[0], args))))
+        return
+
+    common = [
+        "--requests", str(args.requests), "--chats", str(args.chats), "--rate", str(args.rate),
+        "--latency", str(args.latency), "--chunk-delay", str(args.chunk_delay),
+        "--stream" if args.stream else "--no-stream", "--size", args.size,
+        "--variants", str(args.variants), "--workers", str(args.workers), "--corpus", args.corpus,
+    ]
+    rows = [run_isolated("benchmarks.bench_bot", ["--scenario", name, *common]) for name in args.scenario]
+    print_table(rows, ["scenario", "requests", "seconds", "throughput", "p50", "p95", "p99",
+                       "failed", "api_calls", "cache_hit", "rss_mb", "children_rss_mb"])
+
+
+if __name__ == "__main__":
+    main()
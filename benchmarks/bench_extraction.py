@@ -0,0 +1,78 @@
+"""Микробенчмарки FileProcessor.process_* на сгенерированном корпусе.
+
+Каждый метод измеряется в отдельном процессе (время на файл, скорость
+и пиковый RSS); источник - путь к файлу или содержимое в памяти.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_extraction --sizes small medium --repeat 5
+"""
+import argparse
+import statistics
+import time
+
+from benchmarks.corpus import GENERATORS, build_corpus
+from benchmarks.report import peak_rss_mb, percentile, print_table, run_isolated
+from config import Config
+
+
+def run_method(kind: str, size: str, args) -> dict:
+    from file_processor import FileProcessor, warm_up
+
+    # Импорт библиотек разбора ленивый - в замеры попадает только сам разбор
+    warm_up()
+    item = build_corpus(args.corpus, (size,), (kind,))[0]
+    source = item.path.read_bytes() if args.source == "bytes" else item.path
+    processor = FileProcessor()
+    method = getattr(processor, f"process_{item.file_type}")
+    max_chars = None if args.max_chars == 0 else args.max_chars
+
+    timings = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        text = method(source, max_chars)
+        timings.append(time.perf_counter() - start)
+
+    file_mb = item.path.stat().st_size / 1024 / 1024
+    median = statistics.median(timings)
+    return {
+        "method": f"process_{item.file_type}",
+        "file": item.name,
+        "file_kb": round(file_mb * 1024, 1),
+        "min_ms": round(min(timings) * 1000, 1),
+        "median_ms": round(median * 1000, 1),
+        "p95_ms": round(percentile(timings, 95) * 1000, 1),
+        "mb_per_s": round(file_mb / median, 2) if median else 0.0,
+        "chars": len(text),
+        "failed": text.startswith("❌"),
+        **peak_rss_mb(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--kinds", nargs="+", default=list(GENERATORS), choices=list(GENERATORS))
+    parser.add_argument("--sizes", nargs="+", default=["small", "medium"], choices=["small", "medium", "large"])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--source", default="path", choices=["path", "bytes"])
+    parser.add_argument("--max-chars", type=int, default=Config.MAX_TEXT_LENGTH, help="бюджет символов; 0 - без ограничения")
+    parser.add_argument("--corpus", default="bench_corpus")
+    parser.add_argument("--json", action="store_true", help="один вид и размер в текущем процессе, результат JSON")
+    args = parser.parse_args()
+
+    if args.json:
+        import json
+        print(json.dumps(run_method(args.kinds[0], args.sizes[0], args)))
+        return
+
+    common = ["--repeat", str(args.repeat), "--source", args.source,
+              "--max-chars", str(args.max_chars), "--corpus", args.corpus]
+    rows = [
+        run_isolated("benchmarks.bench_extraction", ["--kinds", kind, "--sizes", size, *common])
+        for kind in args.kinds for size in args.sizes
+    ]
+    print_table(rows, ["method", "file", "file_kb", "min_ms", "median_ms", "p95_ms",
+                       "mb_per_s", "chars", "failed", "rss_mb"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Сравнение блокирующего и асинхронного транспорта GigaChat.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_gigachat --requests 32 --latency 0.5
+"""
+import argparse
+import asyncio
+import time
+
+from gigachat import GigaChat
+
+from benchmarks.fake_gigachat import FakeGigaChatServer
+from config import Config
+from gigachat_client import GigaChatClient
+
+
+def make_client(base_url: str) -> GigaChatClient:
+    return GigaChatClient(GigaChat(base_url=base_url, access_token="bench", timeout=Config.GIGA_CHAT_TIMEOUT))
+
+
+async def run_blocking(client: GigaChatClient, requests: int) -> float:
+    """Старый путь: синхронный вызов внутри обработчиков блокирует цикл событий"""
+    async def handler(i):
+        client.send_message(i, f"Вопрос {i}")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(handler(i) for i in range(requests)))
+    return time.perf_counter() - start
+
+
+async def run_async(client: GigaChatClient, requests: int) -> float:
+    """Новый путь: обработчики ожидают asend_message и выполняются параллельно"""
+    async def handler(i):
+        await client.asend_message(i, f"Вопрос {i}")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(handler(i) for i in range(requests)))
+    elapsed = time.perf_counter() - start
+    await client.aclose()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=32)
+    parser.add_argument("--latency", type=float, default=0.5)
+    args = parser.parse_args()
+
+    # Истории не сохраняются между прогонами
+    Config.STORAGE_DB = ""
+    server = FakeGigaChatServer(latency=args.latency).start()
+    try:
+        for name, runner in (("blocking", run_blocking), ("async", run_async)):
+            elapsed = asyncio.run(runner(make_client(server.base_url), args.requests))
+            print(f"{name:>8}: {args.requests} запросов за {elapsed:.2f} с, "
+                  f"{args.requests / elapsed:.1f} запр/с "
+                  f"(concurrency={Config.GIGA_CHAT_MAX_CONCURRENCY})")
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
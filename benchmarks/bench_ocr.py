@@ -0,0 +1,184 @@
+"""Сравнение OCR изображений до и после подготовки (ocr_preprocess).
+
+Фиксированный набор синтетических картинок с известным текстом: мелкий шрифт
+скриншота, крупный текст с телефона, наклонный скан, темная тема, сетка Excel,
+английский текст, одна строка на большом снимке, страница при неравномерном
+освещении и фото без текста. Для каждой - медианное время и точность
+(SequenceMatcher с эталоном) старого пути и пути с подготовкой.
+
+С --skip-no-text включается OCR_SKIP_NO_TEXT: колонка skipped показывает, какие
+картинки проверка наличия текста отбросила бы. Пропуск стоит включать в боте,
+только если здесь не отброшено ни одной картинки с текстом.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_ocr --repeat 3 --skip-no-text
+"""
+import argparse
+import difflib
+import random
+import statistics
+import time
+
+import pytesseract
+from PIL import Image, ImageChops, ImageDraw, ImageFilter
+
+from benchmarks.corpus import LATIN_WORDS, WORDS, load_font, sentence
+from benchmarks.report import print_table
+from config import Config
+
+
+def _text_image(lines: list, size: tuple, font_size: int, angle: float = 0,
+                background: int = 255, ink: int = 0, grid: bool = False) -> Image.Image:
+    img = Image.new("L", size, background)
+    draw = ImageDraw.Draw(img)
+    font = load_font(font_size)
+    for i, line in enumerate(lines):
+        draw.text((40, 40 + i * int(font_size * 1.6)), line, fill=ink, font=font)
+    if grid:
+        for x in range(0, size[0], 160):
+            draw.line([(x, 0), (x, size[1])], fill=128)
+        for y in range(30, size[1], int(font_size * 1.6)):
+            draw.line([(0, y), (size[0], y)], fill=200)
+    if angle:
+        img = img.rotate(angle, resample=Image.Resampling.BICUBIC, expand=True, fillcolor=background)
+    return img.convert("RGB")
+
+
+def _unevenly_lit(img: Image.Image, blur: float = 0, noise: float = 0) -> Image.Image:
+    """Фото страницы: освещение от темно-серого к белому, при необходимости размытие и шум"""
+    gray = img.convert("L")
+    light = Image.linear_gradient("L").rotate(90).resize(gray.size).point(lambda value: 60 + value * 0.7)
+    gray = ImageChops.darker(gray, light)
+    if noise:
+        gray = Image.blend(gray, Image.effect_noise(gray.size, 40), noise)
+    if blur:
+        gray = gray.filter(ImageFilter.GaussianBlur(blur))
+    return gray.convert("RGB")
+
+
+def _photo(size: tuple) -> Image.Image:
+    img = Image.linear_gradient("L").resize(size)
+    img = Image.blend(img, Image.effect_noise(size, 40), 0.3)
+    ImageDraw.Draw(img).ellipse((size[0] // 8, size[1] // 8, size[0] // 2, size[1] // 2), fill=30)
+    return img.filter(ImageFilter.GaussianBlur(3)).convert("RGB")
+
+
+def build_cases(seed: int = 1) -> list:
+    """[(название, изображение, эталонный текст)]; пустой эталон - текста нет"""
+    rng = random.Random(seed)
+
+    def lines(count: int, words=WORDS, length: int = 6) -> list:
+        return [sentence(rng, words, length) for _ in range(count)]
+
+    cases = []
+    text = lines(25)
+    cases.append(("screenshot_small_font", _text_image(text, (1920, 1080), 11), text))
+    text = lines(10, length=3)
+    cases.append(("phone_huge_text", _text_image(text, (4000, 3000), 90), text))
+    text = lines(30, length=8)
+    cases.append(("skewed_scan", _text_image(text, (1654, 2339), 28, angle=3), text))
+    text = lines(15)
+    cases.append(("dark_mode", _text_image(text, (1280, 800), 16, background=30, ink=220), text))
+    text = lines(20, length=5)
+    cases.append(("excel_grid", _text_image(text, (1600, 900), 14, grid=True), text))
+    text = lines(20, LATIN_WORDS)
+    cases.append(("english_only", _text_image(text, (1600, 1000), 18), text))
+    text = lines(1, length=8)
+    cases.append(("screenshot_one_line", _text_image(text, (1920, 1080), 14), text))
+    text = lines(1, length=8)
+    cases.append(("large_one_line", _text_image(text, (3000, 2000), 20), text))
+    text = lines(25, length=8)
+    cases.append(("uneven_light_page", _unevenly_lit(_text_image(text, (1600, 1200), 22)), text))
+    cases.append(("uneven_light_blurred", _unevenly_lit(_text_image(text, (1600, 1200), 22), 1.2, 0.15), text))
+    text = lines(2, length=8)
+    cases.append(("uneven_light_two_lines", _unevenly_lit(_text_image(text, (1600, 1200), 22)), text))
+    cases.append(("photo_no_text", _photo((1600, 1200)), []))
+    return cases
+
+
+def baseline_ocr(img: Image.Image) -> str:
+    """Путь до подготовки: только уменьшение очень больших изображений"""
+    if max(img.size) > 3000:
+        img = img.copy()
+        img.thumbnail((2500, 2500), Image.Resampling.LANCZOS)
+    return pytesseract.image_to_string(img, lang=Config.TESSERACT_LANG).strip()
+
+
+def prepared_ocr(img: Image.Image) -> str:
+    import ocr_preprocess
+
+    prepared = ocr_preprocess.prepare(img)
+    if prepared is None:
+        return ""
+    return pytesseract.image_to_string(prepared.image, lang=prepared.lang).strip()
+
+
+def accuracy(text: str, expected: list) -> float:
+    """Сходство с эталоном без учета пробелов и переносов; для картинок без текста - 1, если текста нет"""
+    actual = " ".join(text.split())
+    reference = " ".join(" ".join(expected).split())
+    if not reference:
+        return 1.0 if not actual else 0.0
+    return difflib.SequenceMatcher(None, actual, reference, autojunk=False).ratio()
+
+
+def measure(method, img: Image.Image, expected: list, repeat: int) -> dict:
+    timings = []
+    text = ""
+    for _ in range(repeat):
+        start = time.perf_counter()
+        text = method(img)
+        timings.append(time.perf_counter() - start)
+    return {"ms": round(statistics.median(timings) * 1000, 1), "accuracy": round(accuracy(text, expected), 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--skip-no-text", action="store_true", help="включить OCR_SKIP_NO_TEXT для пути с подготовкой")
+    args = parser.parse_args()
+    Config.OCR_SKIP_NO_TEXT = args.skip_no_text
+
+    try:
+        pytesseract.get_tesseract_version()
+    except pytesseract.TesseractNotFoundError:
+        # Без tesseract измеряется только сама подготовка
+        import ocr_preprocess
+
+        rows = []
+        for name, img, _ in build_cases(args.seed):
+            start = time.perf_counter()
+            prepared = ocr_preprocess.prepare(img, detect_language=False)
+            rows.append({
+                "image": name,
+                "size": "x".join(map(str, img.size)),
+                "prepare_ms": round((time.perf_counter() - start) * 1000, 1),
+                "skipped": prepared is None,
+                "scale": round(prepared.scale, 2) if prepared else "",
+                "angle": prepared.angle if prepared else "",
+            })
+        print("tesseract не найден - измерено только время подготовки")
+        print_table(rows, ["image", "size", "prepare_ms", "skipped", "scale", "angle"])
+        return
+
+    import ocr_preprocess
+
+    rows = []
+    for name, img, expected in build_cases(args.seed):
+        before = measure(baseline_ocr, img, expected, args.repeat)
+        after = measure(prepared_ocr, img, expected, args.repeat)
+        rows.append({
+            "image": name,
+            "size": "x".join(map(str, img.size)),
+            "skipped": ocr_preprocess.prepare(img, detect_language=False) is None,
+            "baseline_ms": before["ms"],
+            "prepared_ms": after["ms"],
+            "baseline_acc": before["accuracy"],
+            "prepared_acc": after["accuracy"],
+        })
+    print_table(rows, ["image", "size", "skipped", "baseline_ms", "prepared_ms", "baseline_acc", "prepared_acc"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""Генератор тестового корпуса: PDF (текстовые и сканы), DOCX, XLSX и сканированные изображения.
+
+Запуск из корня репозитория:
+    python -m benchmarks.corpus --out bench_corpus --sizes small medium
+"""
+import argparse
+import datetime
+import io
+import random
+from collections import namedtuple
+from pathlib import Path
+
+import fitz  # PyMuPDF
+import openpyxl
+from docx import Document
+from PIL import Image, ImageDraw, ImageFilter, ImageFont
+
+FONT_PATH = Path("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf")
+
+# Параметры размеров: страниц PDF, абзацев DOCX, строк XLSX, строк текста на изображении
+SIZES = {
+    "small": {"pages": 1, "paragraphs": 20, "rows": 50, "lines": 10},
+    "medium": {"pages": 10, "paragraphs": 300, "rows": 5000, "lines": 30},
+    "large": {"pages": 50, "paragraphs": 3000, "rows": 100000, "lines": 60},
+}
+
+MIME_TYPES = {
+    "pdf": "application/pdf",
+    "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "image": "image/png",
+}
+
+WORDS = (
+    "таблица формула ячейка столбец строка диаграмма сводная макрос документ абзац "
+    "стиль оглавление колонтитул раздел шаблон презентация слайд формат фильтр "
+    "сортировка функция значение диапазон лист книга печать поле закладка ссылка"
+).split()
+
+# Tesseract и встроенный шрифт PIL без TrueType не работают с кириллицей - для картинок латиница
+LATIN_WORDS = (
+    "table formula cell column row chart pivot macro document paragraph style "
+    "contents header section template slide format filter sort function value "
+    "range sheet workbook print field bookmark link"
+).split()
+
+CorpusItem = namedtuple("CorpusItem", "name file_type size path mime_type")
+
+
+def sentence(rng: random.Random, words=WORDS, length: int = 12) -> str:
+    text = " ".join(rng.choice(words) for _ in range(length))
+    return text.capitalize() + "."
+
+
+def load_font(size: int):
+    if FONT_PATH.exists():
+        return ImageFont.truetype(str(FONT_PATH), size)
+    return ImageFont.load_default()
+
+
+def make_scan(lines: int, seed: int = 0, width: int = 1654, height: int = 2339) -> Image.Image:
+    """Страница «скана»: текст на сером фоне, легкий наклон, шум и размытие (A4 при 200 dpi)"""
+    rng = random.Random(seed)
+    img = Image.new("L", (width, height), 235)
+    draw = ImageDraw.Draw(img)
+    font = load_font(28)
+    y = 120
+    for _ in range(lines):
+        draw.text((120, y), sentence(rng, LATIN_WORDS, 9), fill=20, font=font)
+        y += 48
+        if y > height - 120:
+            break
+    img = img.rotate(rng.uniform(-1.5, 1.5), fillcolor=235, resample=Image.Resampling.BICUBIC)
+    noise = Image.effect_noise((width, height), 12)
+    img = Image.blend(img, noise, 0.08).filter(ImageFilter.GaussianBlur(0.6))
+    return img
+
+
+def make_image(path: Path, size: str, seed: int = 0):
+    make_scan(SIZES[size]["lines"], seed).save(path, "PNG")
+
+
+def make_text_pdf(path: Path, size: str, seed: int = 0):
+    """PDF с текстовым слоем"""
+    rng = random.Random(seed)
+    doc = fitz.open()
+    kwargs = {"fontname": "dejavu", "fontfile": str(FONT_PATH)} if FONT_PATH.exists() else {}
+    words = WORDS if kwargs else LATIN_WORDS
+    for _ in range(SIZES[size]["pages"]):
+        page = doc.new_page()
+        text = "\n".join(sentence(rng, words, 8) for _ in range(45))
+        page.insert_text((50, 60), text, fontsize=10, **kwargs)
+    doc.save(str(path))
+    doc.close()
+
+
+def make_scanned_pdf(path: Path, size: str, seed: int = 0):
+    """PDF из изображений страниц без текстового слоя - уходит в OCR"""
+    doc = fitz.open()
+    for page_num in range(SIZES[size]["pages"]):
+        buf = io.BytesIO()
+        make_scan(40, seed * 1000 + page_num).save(buf, "PNG")
+        page = doc.new_page()
+        page.insert_image(page.rect, stream=buf.getvalue())
+    doc.save(str(path), deflate=True)
+    doc.close()
+
+
+def make_docx(path: Path, size: str, seed: int = 0):
+    rng = random.Random(seed)
+    document = Document()
+    paragraphs = SIZES[size]["paragraphs"]
+    for i in range(paragraphs):
+        if i % 25 == 0:
+            document.add_heading(f"Раздел {i // 25 + 1}", level=1)
+        document.add_paragraph(" ".join(sentence(rng) for _ in range(3)))
+    table = document.add_table(rows=min(paragraphs // 5, 200) + 1, cols=4)
+    for row_num, row in enumerate(table.rows):
+        for col_num, cell in enumerate(row.cells):
+            cell.text = f"Заголовок {col_num + 1}" if row_num == 0 else rng.choice(WORDS)
+    document.save(str(path))
+
+
+def make_xlsx(path: Path, size: str, seed: int = 0):
+    rng = random.Random(seed)
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet("Продажи")
+    ws.append(["Дата", "Регион", "Товар", "Количество", "Цена", "Сумма"])
+    start = datetime.date(2024, 1, 1)
+    for i in range(SIZES[size]["rows"]):
+        quantity = rng.randint(1, 100)
+        price = round(rng.uniform(10, 5000), 2)
+        ws.append([
+            start + datetime.timedelta(days=i % 365),
+            rng.choice(("Север", "Юг", "Запад", "Восток")),
+            rng.choice(WORDS),
+            quantity,
+            price,
+            round(quantity * price, 2),
+        ])
+    wb.save(str(path))
+
+
+GENERATORS = {
+    "pdf": (make_text_pdf, ".pdf"),
+    "pdf_scan": (make_scanned_pdf, ".pdf"),
+    "docx": (make_docx, ".docx"),
+    "xlsx": (make_xlsx, ".xlsx"),
+    "image": (make_image, ".png"),
+}
+
+
+def build_corpus(directory, sizes=("small",), kinds=tuple(GENERATORS), variants: int = 1) -> list:
+    """Создание (или переиспользование) файлов корпуса; variants - число разных файлов одного вида"""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    items = []
+    for kind in kinds:
+        make, suffix = GENERATORS[kind]
+        file_type = "pdf" if kind == "pdf_scan" else kind
+        for size in sizes:
+            for variant in range(variants):
+                name = f"{kind}_{size}_{variant}"
+                path = directory / (name + suffix)
+                if not path.exists():
+                    make(path, size, seed=variant)
+                items.append(CorpusItem(name, file_type, size, path, MIME_TYPES[file_type]))
+    return items
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", default="bench_corpus")
+    parser.add_argument("--sizes", nargs="+", default=["small", "medium"], choices=list(SIZES))
+    parser.add_argument("--kinds", nargs="+", default=list(GENERATORS), choices=list(GENERATORS))
+    parser.add_argument("--variants", type=int, default=1)
+    args = parser.parse_args()
+
+    for item in build_corpus(args.out, args.sizes, args.kinds, args.variants):
+        print(f"{item.name:<24} {item.path.stat().st_size / 1024:>10.1f} КБ  {item.path}")
+
+
+if __name__ == "__main__":
+    main()
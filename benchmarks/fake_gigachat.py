@@ -0,0 +1,120 @@
+"""Локальный имитатор GigaChat API для нагрузочных тестов"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeGigaChatHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, payload: dict, status: int = 200):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_stream(self, request: dict):
+        """Ответ в формате server-sent events: первый фрагмент через latency, далее через chunk_delay"""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        def write_event(data: str):
+            payload = f"data: {data}\n\n".encode("utf-8")
+            self.wfile.write(f"{len(payload):X}\r\n".encode() + payload + b"\r\n")
+            self.wfile.flush()
+
+        time.sleep(self.server.latency)
+        words = self.server.answer.split(" ")
+        for i, word in enumerate(words):
+            if i:
+                time.sleep(self.server.chunk_delay)
+            write_event(json.dumps({
+                "choices": [{"delta": {"content": word if i == 0 else " " + word}, "index": 0}],
+                "created": int(time.time()),
+                "model": request.get("model", "GigaChat"),
+                "object": "chat.completion",
+            }))
+        write_event("[DONE]")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def do_GET(self):
+        # Список моделей - им бот прогревает соединение при запуске
+        if self.path.rstrip("/").endswith("/models"):
+            self._send_json({"data": [{"id": "GigaChat", "object": "model", "owned_by": "salutedevices"}],
+                             "object": "list"})
+        else:
+            self._send_json({"message": "not found"}, status=404)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+
+        if self.path.rstrip("/").endswith("/chat/completions") and request.get("stream"):
+            self._send_stream(request)
+        elif self.path.rstrip("/").endswith("/chat/completions"):
+            time.sleep(self.server.latency)
+            answer = self.server.answer
+            self._send_json({
+                "choices": [{
+                    "message": {"role": "assistant", "content": answer},
+                    "index": 0,
+                    "finish_reason": "stop",
+                }],
+                "created": int(time.time()),
+                "model": request.get("model", "GigaChat"),
+                "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+                "object": "chat.completion",
+            })
+        else:
+            self._send_json({"message": "not found"}, status=404)
+
+
+class FakeGigaChatServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.5,
+                 answer: str = "Это тестовый ответ.", chunk_delay: float = 0.05):
+        super().__init__((host, port), FakeGigaChatHandler)
+        self.latency = latency
+        self.answer = answer
+        self.chunk_delay = chunk_delay
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/api/v1"
+
+    def start(self) -> "FakeGigaChatServer":
+        """Запуск сервера в фоновом потоке"""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Имитатор GigaChat API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--latency", type=float, default=0.5, help="задержка ответа, сек")
+    args = parser.parse_args()
+
+    server = FakeGigaChatServer(args.host, args.port, args.latency)
+    print(f"Fake GigaChat: {server.base_url}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""Локальный имитатор Telegram Bot API и генератор синтетических обновлений"""
+import asyncio
+import itertools
+import time
+import uuid
+
+from aiohttp import web
+from telegram import Update
+
+BENCH_TOKEN = "123456:bench"
+
+
+class FakeTelegramServer:
+    """Bot API на aiohttp: getMe, sendMessage, editMessageText, sendChatAction, getFile и скачивание файлов.
+
+    Бот подключается через Config.TELEGRAM_API_URL / TELEGRAM_FILE_URL (base_url и base_file_url).
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.files = {}  # file_id -> содержимое
+        self.sent = []  # (chat_id, метод, текст, время)
+        self._message_ids = itertools.count(1)
+        self._runner = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}/bot"
+
+    @property
+    def base_file_url(self) -> str:
+        return f"http://{self.host}:{self.port}/file/bot"
+
+    def add_file(self, data: bytes) -> tuple:
+        """Регистрация файла; возвращает (file_id, file_unique_id)"""
+        file_id = uuid.uuid4().hex
+        self.files[file_id] = data
+        return file_id, file_id[:16]
+
+    @staticmethod
+    async def _params(request) -> dict:
+        # PTB передает параметры формой; вложенные объекты - строками JSON
+        if request.content_type == "application/json":
+            return await request.json()
+        return dict(await request.post())
+
+    def _message(self, chat_id, text: str) -> dict:
+        return {
+            "message_id": next(self._message_ids),
+            "date": int(time.time()),
+            "chat": {"id": int(chat_id), "type": "private"},
+            "text": text,
+        }
+
+    async def handle_method(self, request):
+        method = request.match_info["method"]
+        params = await self._params(request)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        if method == "getMe":
+            result = {"id": 123456, "is_bot": True, "first_name": "Bench", "username": "bench_bot",
+                      "can_join_groups": True, "can_read_all_group_messages": False,
+                      "supports_inline_queries": False}
+        elif method in ("sendMessage", "editMessageText"):
+            text = params.get("text", "")
+            self.sent.append((int(params["chat_id"]), method, text, time.perf_counter()))
+            result = self._message(params["chat_id"], text)
+        elif method == "sendChatAction":
+            result = True
+        elif method == "getFile":
+            file_id = params["file_id"]
+            data = self.files.get(file_id)
+            if data is None:
+                return web.json_response({"ok": False, "error_code": 400, "description": "Bad Request: invalid file_id"})
+            result = {"file_id": file_id, "file_unique_id": file_id[:16],
+                      "file_size": len(data), "file_path": f"documents/{file_id}"}
+        else:
+            return web.json_response({"ok": False, "error_code": 404, "description": f"Unknown method {method}"})
+        return web.json_response({"ok": True, "result": result})
+
+    async def handle_file(self, request):
+        data = self.files.get(request.match_info["file_id"])
+        if data is None:
+            raise web.HTTPNotFound()
+        return web.Response(body=data, content_type="application/octet-stream")
+
+    async def start(self) -> "FakeTelegramServer":
+        app = web.Application(client_max_size=64 * 1024 * 1024)
+        app.router.add_post("/bot{token}/{method}", self.handle_method)
+        app.router.add_get("/file/bot{token}/documents/{file_id}", self.handle_file)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+class UpdateFactory:
+    """Синтетические обновления: текст, фото и документы от заданного числа чатов"""
+
+    def __init__(self, bot, server: FakeTelegramServer, chats: int = 10):
+        self.bot = bot
+        self.server = server
+        self.chats = chats
+        self._update_ids = itertools.count(1)
+
+    def _update(self, index: int, **message) -> Update:
+        chat_id = 1000 + index % self.chats
+        data = {
+            "update_id": next(self._update_ids),
+            "message": {
+                "message_id": index + 1,
+                "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private"},
+                "from": {"id": chat_id, "is_bot": False, "first_name": f"User{chat_id}"},
+                **message,
+            },
+        }
+        return Update.de_json(data, self.bot)
+
+    def text(self, index: int, question: str = None) -> Update:
+        # Номер в вопросе - чтобы не попадать в кэш ответов
+        return self._update(index, text=question or f"Как закрепить строку {index} в Excel?")
+
+    def photo(self, index: int, data: bytes, width: int = 1654, height: int = 2339,
+              media_group_id: str = None) -> Update:
+        file_id, unique_id = self.server.add_file(data)
+        message = {"photo": [{
+            "file_id": file_id, "file_unique_id": unique_id,
+            "width": width, "height": height, "file_size": len(data),
+        }]}
+        if media_group_id:
+            # В альбоме подпись есть только у первой части
+            message["media_group_id"] = media_group_id
+        else:
+            message["caption"] = "Что здесь написано?"
+        return self._update(index, **message)
+
+    def document(self, index: int, data: bytes, file_name: str, mime_type: str) -> Update:
+        file_id, unique_id = self.server.add_file(data)
+        return self._update(index, document={
+            "file_id": file_id, "file_unique_id": unique_id,
+            "file_name": file_name, "mime_type": mime_type, "file_size": len(data),
+        })
@@ -0,0 +1,53 @@
+"""Общие утилиты бенчмарков: перцентили, пиковая память, запуск сценария в отдельном процессе"""
+import json
+import resource
+import subprocess
+import sys
+
+
+def percentile(values: list, p: float) -> float:
+    """Перцентиль с линейной интерполяцией (p от 0 до 100)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * p / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def peak_rss_mb() -> dict:
+    """Пиковый RSS процесса и самого крупного из завершенных дочерних процессов, МБ"""
+    # ru_maxrss в Linux - в килобайтах
+    return {
+        "rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "children_rss_mb": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024, 1),
+    }
+
+
+def latency_summary(latencies: list, elapsed: float) -> dict:
+    return {
+        "requests": len(latencies),
+        "seconds": round(elapsed, 3),
+        "throughput": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "p50": round(percentile(latencies, 50), 3),
+        "p95": round(percentile(latencies, 95), 3),
+        "p99": round(percentile(latencies, 99), 3),
+    }
+
+
+def run_isolated(module: str, args: list) -> dict:
+    """Запуск `python -m module args --json` отдельным процессом - чтобы пиковая память была своя у каждого сценария"""
+    completed = subprocess.run(
+        [sys.executable, "-m", module, *args, "--json"],
+        stdout=subprocess.PIPE, text=True, check=True
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def print_table(rows: list, columns: list):
+    """Вывод результатов выровненной таблицей"""
+    widths = [max(len(str(column)), *(len(str(row.get(column, ""))) for row in rows)) for column in columns]
+    print("  ".join(str(column).rjust(width) for column, width in zip(columns, widths)))
+    for row in rows:
+        print("  ".join(str(row.get(column, "")).rjust(width) for column, width in zip(columns, widths)))
@@ -1,4 +1,11 @@
+import startup_profile  # первым: отсчет времени запуска и учет импортов остальных модулей
+import asyncio
 import logging
+import math
+import os
+import signal
+import tempfile
+import time
 from telegram import Update
 from telegram.ext import (
     ApplicationBuilder, 
@@ -10,8 +17,16 @@ from telegram.ext import (
 from pathlib import Path
 
 from config import Config
-from file_processor import FileProcessor
+from extraction_cache import ExtractionCache
+from extraction_executor import (
+    ExtractionBusyError, ExtractionExecutor, ExtractionTimeoutError, ExtractionWorkerError
+)
+from file_processor import TRUNCATED_MARK, FileProcessor, is_complete
 from gigachat_client import GigaChatClient
+from media_group import MediaGroupCollector
+import metrics
+from scheduler import LANE_OCR, LANE_TEXT, FairScheduler, RateLimitedError
+from stream_reply import StreamingReply
 
 # Настройка логирования
 logging.basicConfig(
@@ -19,13 +34,61 @@ logging.basicConfig(
     level=logging.INFO
 )
 logger = logging.getLogger(__name__)
+startup_profile.mark("imports")
+
+BUSY_MESSAGE = "⏳ Сейчас обрабатывается слишком много файлов. Попробуйте через минуту."
+TIMEOUT_MESSAGE = "⌛ Файл обрабатывался слишком долго, обработка остановлена. Попробуйте файл поменьше или разделите его на части."
+WORKER_ERROR_MESSAGE = "❌ Не удалось обработать файл: обработчик аварийно завершился. Попробуйте еще раз или пришлите файл в другом формате."
 
 class OfficeAssistantBot:
     def __init__(self):
         self.config = Config()
         self.file_processor = FileProcessor()
         self.gigachat_client = GigaChatClient()
+        self.extractor = ExtractionExecutor()
+        self.extraction_cache = ExtractionCache()
+        self.scheduler = FairScheduler()
+        self.media_groups = MediaGroupCollector()
         self.application = None
+        self._metrics_runner = None
+        self._warm_up_task = None
+        self._register_gauges()
+        startup_profile.mark("init")
+    
+    def _register_gauges(self):
+        """Показатели очередей и кэшей, вычисляемые при запросе /metrics"""
+        def queue_depth():
+            return [({"lane": name}, lane.depth) for name, lane in self.scheduler.lanes.items()]
+        
+        def cache_hit_rate():
+            return [
+                ({"cache": "extraction"}, self.extraction_cache.hit_rate),
+                ({"cache": "response"}, self.gigachat_client.response_cache.hit_rate),
+            ]
+        
+        metrics.REGISTRY.gauge_callback("bot_queue_depth", "Задач в очереди планировщика", queue_depth)
+        metrics.REGISTRY.gauge_callback("bot_cache_hit_rate", "Доля попаданий в кэш", cache_hit_rate)
+        metrics.REGISTRY.gauge_callback(
+            "bot_session_store_bytes", "Память историй диалогов",
+            lambda: [(None, self.gigachat_client.sessions.memory_usage())]
+        )
+        metrics.REGISTRY.gauge_callback(
+            "bot_extraction_pending", "Задач в пуле извлечения",
+            lambda: [(None, self.extractor.pending)]
+        )
+        metrics.REGISTRY.gauge_callback(
+            "bot_startup_seconds", "Длительность этапов запуска",
+            lambda: [({"phase": phase}, seconds) for phase, seconds in startup_profile.phases()]
+        )
+        metrics.REGISTRY.gauge_callback(
+            "bot_startup_import_seconds", "Время импорта пакетов при запуске (STARTUP_PROFILE_IMPORTS)",
+            lambda: [({"package": package}, seconds) for package, seconds in startup_profile.imports()]
+        )
+        if self.gigachat_client.storage is not None:
+            metrics.REGISTRY.gauge_callback(
+                "bot_storage_pending", "Изменений, ожидающих записи в хранилище",
+                lambda: [(None, self.gigachat_client.storage.stats()["pending"])]
+            )
     
     async def start(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Обработчик команды /start"""
@@ -68,11 +131,62 @@ class OfficeAssistantBot:
     
     async def clear_history(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Очистка истории диалога"""
-        self.gigachat_client.clear_history()
+        self.gigachat_client.clear_history(update.effective_chat.id)
         await update.message.reply_text("🗑️ История диалога очищена!")
     
+    async def _answer(self, update: Update, user_message: str, extracted_text: str = None, file_type: str = None):
+        """Ответ GigaChat: потоково правками сообщения или одним сообщением"""
+        chat_id = update.effective_chat.id
+        if not Config.STREAM_REPLIES:
+            with metrics.timed("llm"):
+                response = await self.gigachat_client.asend_message(chat_id, user_message, extracted_text, file_type)
+            with metrics.timed("reply"):
+                await update.message.reply_text(response)
+            return
+        
+        reply = StreamingReply(update.message)
+        start = time.perf_counter()
+        first_token = True
+        try:
+            with metrics.timed("llm"):
+                async for delta in self.gigachat_client.astream_message(chat_id, user_message, extracted_text, file_type):
+                    if first_token:
+                        first_token = False
+                        metrics.STAGE_SECONDS.observe(time.perf_counter() - start, stage="llm_first_token")
+                    await reply.feed(delta)
+            with metrics.timed("reply"):
+                await reply.finish()
+        finally:
+            reply.cancel()
+    
+    async def _schedule(self, update: Update, lane: str, job):
+        """Выполнение обработки через справедливую очередь с лимитом запросов на пользователя"""
+        async def notify_queued(position: int):
+            await update.message.reply_text(f"⏳ Вы в очереди, позиция: {position}")
+        
+        enqueued_at = time.perf_counter()
+        
+        async def traced_job():
+            with metrics.trace(lane, chat_id=update.effective_chat.id) as request_trace:
+                waited = time.perf_counter() - enqueued_at
+                request_trace.add_stage("queue", waited)
+                metrics.STAGE_SECONDS.observe(waited, stage=f"queue_{lane}")
+                return await job()
+        
+        user_id = update.effective_user.id if update.effective_user else update.effective_chat.id
+        try:
+            await self.scheduler.run(lane, update.effective_chat.id, user_id, traced_job, on_queued=notify_queued)
+        except RateLimitedError as e:
+            await update.message.reply_text(
+                f"🐢 Слишком много запросов подряд. Попробуйте через {math.ceil(e.retry_after)} с."
+            )
+        logger.debug(f"Scheduler: {self.scheduler.stats()}")
+    
     async def handle_text(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Обработка текстовых сообщений"""
+        await self._schedule(update, LANE_TEXT, lambda: self._process_text(update))
+    
+    async def _process_text(self, update: Update):
         user_message = update.message.text
         
         # Показываем статус обработки
@@ -80,98 +194,185 @@ class OfficeAssistantBot:
         
         try:
             # Отправляем в GigaChat
-            response = self.gigachat_client.send_message(user_message)
-            await update.message.reply_text(response)
+            await self._answer(update, user_message)
             
         except Exception as e:
             logger.error(f"Text processing error: {e}")
             await update.message.reply_text("❌ Произошла ошибка при обработке запроса. Попробуйте еще раз.")
     
+    async def _download(self, context, attachment, suffix: str):
+        """Скачивание файла: небольшие - в память, крупные - во временный файл с уникальным именем"""
+        with metrics.timed("download"):
+            file = await context.bot.get_file(attachment.file_id)
+            if attachment.file_size and attachment.file_size <= Config.IN_MEMORY_DOWNLOAD_LIMIT:
+                data = bytes(await file.download_as_bytearray())
+                metrics.DOWNLOAD_BYTES.inc(len(data))
+                return data
+            
+            fd, local_path = tempfile.mkstemp(dir=Config.DOWNLOAD_DIR, suffix=suffix)
+            os.close(fd)
+            try:
+                await file.download_to_drive(custom_path=local_path)
+            except Exception:
+                os.unlink(local_path)
+                raise
+            metrics.DOWNLOAD_BYTES.inc(os.path.getsize(local_path))
+            return Path(local_path)
+    
+    async def _extract_text(self, context, attachment, file_type: str, suffix: str = "") -> str:
+        """Скачивание и извлечение текста с кэшированием по содержимому файла"""
+        # Повторная пересылка того же файла - без скачивания; кэш на диске - вне цикла событий
+        extracted_text = await asyncio.to_thread(self.extraction_cache.get_by_file_id, attachment.file_unique_id)
+        if extracted_text is not None:
+            logger.info(f"Extraction cache hit for {attachment.file_unique_id}")
+            return extracted_text
+        
+        source = await self._download(context, attachment, suffix)
+        try:
+            if isinstance(source, Path):
+                digest = await asyncio.to_thread(ExtractionCache.hash_file, source)
+            else:
+                digest = ExtractionCache.hash_bytes(source)
+            
+            extracted_text = await asyncio.to_thread(self.extraction_cache.get_by_hash, digest)
+            if extracted_text is None:
+                # Обработка в пуле процессов; чтение прекращается по достижении MAX_TEXT_LENGTH
+                with metrics.timed(f"extract_{file_type}"):
+                    extracted_text = await self.extractor.run(
+                        f"process_{file_type}", source, Config.MAX_TEXT_LENGTH
+                    )
+                metrics.EXTRACTED_CHARS.inc(len(extracted_text), file_type=file_type)
+                if not is_complete(extracted_text):
+                    # Ошибку или частичный результат не запоминаем: повторная отправка обработает файл заново
+                    return extracted_text
+                await asyncio.to_thread(self.extraction_cache.put, digest, extracted_text)
+            await asyncio.to_thread(self.extraction_cache.link, attachment.file_unique_id, digest)
+            return extracted_text
+        finally:
+            # Удаляем временный файл
+            if isinstance(source, Path):
+                source.unlink(missing_ok=True)
+    
     async def handle_photo(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """Обработка фотографий"""
+        """Обработка фотографий; альбом обрабатывается одной задачей"""
+        media_group_id = update.message.media_group_id
+        if media_group_id:
+            updates = await self.media_groups.collect((update.effective_chat.id, media_group_id), update)
+            if updates is None:
+                return
+            if len(updates) > 1:
+                await self._schedule(updates[0], LANE_OCR, lambda: self._process_album(updates, context))
+                return
+        await self._schedule(update, LANE_OCR, lambda: self._process_photo(update, context))
+    
+    async def _process_photo(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         photo = update.message.photo[-1]
-        file = await context.bot.get_file(photo.file_id)
-        local_path = Path(Config.DOWNLOAD_DIR) / f"photo_{photo.file_id}.jpg"
         
         try:
             await update.message.reply_text("🖼️ Обрабатываю изображение...")
             
-            # Скачиваем файл
-            await file.download_to_drive(custom_path=str(local_path))
-            
             # OCR обработка
-            extracted_text = self.file_processor.process_image(local_path)
+            extracted_text = await self._extract_text(context, photo, "image", ".jpg")
             user_question = update.message.caption or "Что на этом изображении?"
             
             # Отправляем в GigaChat
-            response = self.gigachat_client.send_message(
-                user_question, 
-                extracted_text, 
-                "image"
-            )
-            await update.message.reply_text(response)
+            await self._answer(update, user_question, extracted_text, "image")
             
+        except ExtractionBusyError:
+            await update.message.reply_text(BUSY_MESSAGE)
+        except ExtractionTimeoutError as e:
+            logger.warning(f"Photo extraction timed out: {e}")
+            await update.message.reply_text(TIMEOUT_MESSAGE)
+        except ExtractionWorkerError:
+            logger.exception('Extraction worker crashed')
+            await update.message.reply_text(WORKER_ERROR_MESSAGE)
         except Exception as e:
             logger.exception('Photo processing failed')
             await update.message.reply_text(f"❌ Ошибка при обработке изображения: {e}")
-        finally:
-            # Удаляем временный файл
-            if local_path.exists():
-                local_path.unlink()
     
-    async def handle_document(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """Обработка документов"""
-        doc = update.message.document
-        file = await context.bot.get_file(doc.file_id)
-        local_path = Path(Config.DOWNLOAD_DIR) / f"{doc.file_id}_{doc.file_name}"
+    async def _process_album(self, updates: list, context: ContextTypes.DEFAULT_TYPE):
+        """Альбом: параллельные скачивание и OCR, один запрос к GigaChat и один ответ"""
+        update = updates[0]
         
         try:
-            # Проверка размера файла
-            if doc.file_size and doc.file_size > Config.MAX_FILE_SIZE:
-                await update.message.reply_text("❌ Файл слишком большой. Максимальный размер: 20MB")
-                return
-            
-            # Определяем тип файла
-            file_type = self.file_processor.get_file_type(doc.file_name, doc.mime_type)
+            await update.message.reply_text(f"🖼️ Обрабатываю альбом из {len(updates)} изображений...")
             
-            if file_type == 'unknown':
-                await update.message.reply_text("❌ Поддерживаются только PDF, DOCX, XLSX файлы и изображения")
+            results = await asyncio.gather(
+                *(self._extract_text(context, u.message.photo[-1], "image", ".jpg") for u in updates),
+                return_exceptions=True
+            )
+            if all(isinstance(result, ExtractionBusyError) for result in results):
+                await update.message.reply_text(BUSY_MESSAGE)
+                return
+            if all(isinstance(result, ExtractionTimeoutError) for result in results):
+                await update.message.reply_text(TIMEOUT_MESSAGE)
                 return
             
-            # Скачиваем файл
-            await file.download_to_drive(custom_path=str(local_path))
-            await update.message.reply_text(f"📎 Обрабатываю {file_type.upper()} файл...")
+            # Общий бюджет текста делится между изображениями альбома
+            per_image = max(Config.MAX_TEXT_LENGTH // len(results), 200)
+            parts = []
+            for number, result in enumerate(results, 1):
+                if isinstance(result, ExtractionTimeoutError):
+                    logger.warning(f"Album image {number} timed out: {result}")
+                    result = "⌛ Изображение обрабатывалось слишком долго и пропущено"
+                elif isinstance(result, Exception):
+                    logger.error(f"Album image {number} failed: {result}")
+                    result = f"❌ Не удалось обработать изображение: {result}"
+                elif len(result) > per_image:
+                    result = result[:per_image] + TRUNCATED_MARK
+                parts.append(f"[Изображение {number}]\n{result}")
+            
+            caption = next((u.message.caption for u in updates if u.message.caption), None)
+            user_question = caption or "Что на этих изображениях?"
             
-            # Обработка в зависимости от типа файла
-            extracted_text = ""
-            if file_type == 'pdf':
-                extracted_text = self.file_processor.process_pdf(local_path)
-            elif file_type == 'docx':
-                extracted_text = self.file_processor.process_docx(local_path)
-            elif file_type == 'xlsx':
-                extracted_text = self.file_processor.process_xlsx(local_path)
+            # Отправляем в GigaChat
+            await self._answer(update, user_question, "\n\n".join(parts), "image")
             
-            # Обрезаем текст если слишком длинный
-            if len(extracted_text) > Config.MAX_TEXT_LENGTH:
-                extracted_text = extracted_text[:Config.MAX_TEXT_LENGTH] + "\n\n... (текст обрезан)"
+        except Exception as e:
+            logger.exception('Album processing failed')
+            await update.message.reply_text(f"❌ Ошибка при обработке альбома: {e}")
+    
+    async def handle_document(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Обработка документов"""
+        doc = update.message.document
+        
+        # Проверка размера файла
+        if doc.file_size and doc.file_size > Config.MAX_FILE_SIZE:
+            await update.message.reply_text("❌ Файл слишком большой. Максимальный размер: 20MB")
+            return
+        
+        # Определяем тип файла
+        file_type = self.file_processor.get_file_type(doc.file_name, doc.mime_type)
+        
+        if file_type == 'unknown':
+            await update.message.reply_text("❌ Поддерживаются только PDF, DOCX, XLSX файлы и изображения")
+            return
+        
+        await self._schedule(update, LANE_OCR, lambda: self._process_document(update, context, doc, file_type))
+    
+    async def _process_document(self, update: Update, context: ContextTypes.DEFAULT_TYPE, doc, file_type: str):
+        try:
+            await update.message.reply_text(f"📎 Обрабатываю {file_type.upper()} файл...")
+            extracted_text = await self._extract_text(
+                context, doc, file_type, Path(doc.file_name or "").suffix
+            )
             
             user_question = update.message.caption or f"Проанализируй этот {file_type} файл"
             
             # Отправляем в GigaChat
-            response = self.gigachat_client.send_message(
-                user_question, 
-                extracted_text, 
-                file_type
-            )
-            await update.message.reply_text(response)
+            await self._answer(update, user_question, extracted_text, file_type)
             
+        except ExtractionBusyError:
+            await update.message.reply_text(BUSY_MESSAGE)
+        except ExtractionTimeoutError as e:
+            logger.warning(f"Document extraction timed out: {e}")
+            await update.message.reply_text(TIMEOUT_MESSAGE)
+        except ExtractionWorkerError:
+            logger.exception('Extraction worker crashed')
+            await update.message.reply_text(WORKER_ERROR_MESSAGE)
         except Exception as e:
             logger.exception('Document processing failed')
             await update.message.reply_text(f"❌ Ошибка при обработке документа: {e}")
-        finally:
-            # Удаляем временный файл
-            if local_path.exists():
-                local_path.unlink()
     
     def setup_handlers(self):
         """Настройка обработчиков"""
@@ -182,16 +383,106 @@ class OfficeAssistantBot:
         self.application.add_handler(MessageHandler(filters.Document.ALL, self.handle_document))
         self.application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, self.handle_text))
     
+    async def startup(self, application):
+        """Запуск вспомогательных сервисов после инициализации приложения"""
+        if Config.METRICS_PORT:
+            self._metrics_runner = await metrics.start_metrics_server()
+        startup_profile.mark("ready")
+        logger.info(startup_profile.report())
+        if Config.PREWARM:
+            self._warm_up_task = asyncio.create_task(self._warm_up())
+    
+    async def _warm_up(self):
+        """Фоновый прогрев: бот уже принимает обновления, первые запросы не ждут инициализации"""
+        start = time.perf_counter()
+        results = await asyncio.gather(
+            self.gigachat_client.warm_up(), self.extractor.warm_up(), return_exceptions=True
+        )
+        for error in results:
+            if isinstance(error, Exception):
+                logger.warning(f"Warm-up step failed: {error!r}")
+        logger.info(f"Warm-up finished in {time.perf_counter() - start:.2f}s")
+    
+    async def shutdown(self, application):
+        """Освобождение ресурсов при остановке"""
+        if self._warm_up_task is not None:
+            self._warm_up_task.cancel()
+        if self._metrics_runner is not None:
+            await self._metrics_runner.cleanup()
+        await self.gigachat_client.aclose()
+        await self.scheduler.shutdown()
+        self.extractor.shutdown()
+        metrics.close_traces()
+    
+    def build_application(self, with_updater: bool = True):
+        """Создание приложения с параллельной обработкой обновлений"""
+        builder = (
+            ApplicationBuilder()
+            .token(Config.TELEGRAM_TOKEN)
+            .concurrent_updates(Config.CONCURRENT_UPDATES)
+            .post_init(self.startup)
+            .post_shutdown(self.shutdown)
+        )
+        if Config.TELEGRAM_API_URL:
+            builder = builder.base_url(Config.TELEGRAM_API_URL)
+        if Config.TELEGRAM_FILE_URL:
+            builder = builder.base_file_url(Config.TELEGRAM_FILE_URL)
+        if not with_updater:
+            builder = builder.updater(None)
+        self.application = builder.build()
+        self.setup_handlers()
+        startup_profile.mark("application")
+        return self.application
+    
+    async def run_webhook(self):
+        """Работа через вебхук на локальном aiohttp-сервере"""
+        # aiohttp нужен только в этом режиме
+        from webhook_server import WebhookServer
+        
+        server = WebhookServer(
+            self.application,
+            Config.WEBHOOK_HOST,
+            Config.WEBHOOK_PORT,
+            Config.WEBHOOK_PATH,
+            Config.WEBHOOK_SECRET
+        )
+        stop_event = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop_event.set)
+        
+        async with self.application:
+            await self.application.start()
+            await self.startup(self.application)
+            await server.start()
+            if Config.WEBHOOK_URL:
+                await self.application.bot.set_webhook(
+                    url=Config.WEBHOOK_URL.rstrip("/") + Config.WEBHOOK_PATH,
+                    secret_token=Config.WEBHOOK_SECRET,
+                    allowed_updates=Update.ALL_TYPES
+                )
+            
+            logger.info('🤖 Бот запущен в режиме webhook!')
+            await stop_event.wait()
+            
+            # Сначала перестаем принимать обновления, затем дожидаемся уже принятых
+            logger.info("Stopping: draining in-flight updates")
+            await server.stop()
+            await self.application.stop()
+            await self.shutdown(self.application)
+    
     def run(self):
         """Запуск бота"""
         try:
             Config.validate()
             
-            self.application = ApplicationBuilder().token(Config.TELEGRAM_TOKEN).build()
-            self.setup_handlers()
-            
-            logger.info('🤖 Бот запущен!')
-            self.application.run_polling()
+            if Config.BOT_MODE == "webhook":
+                self.build_application(with_updater=False)
+                asyncio.run(self.run_webhook())
+            else:
+                self.build_application()
+                logger.info('🤖 Бот запущен!')
+                self.application.run_polling()
             
         except Exception as e:
             logger.error(f"Failed to start bot: {e}")
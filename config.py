@@ -7,13 +7,117 @@ class Config:
     TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN")
     GIGA_CHAT_TOKEN = os.getenv("GIGA_CHAT_TOKEN")
     DOWNLOAD_DIR = "downloads"
+    # Адреса Bot API; пусто - api.telegram.org (задаются для локального Bot API сервера и бенчмарков)
+    TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "")
+    TELEGRAM_FILE_URL = os.getenv("TELEGRAM_FILE_URL", "")
+    
+    # Режим работы: polling или webhook
+    BOT_MODE = os.getenv("BOT_MODE", "polling")
+    WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+    WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8080"))
+    WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/telegram")
+    WEBHOOK_URL = os.getenv("WEBHOOK_URL")  # внешний адрес, например https://bot.example.com
+    WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET")
+    CONCURRENT_UPDATES = int(os.getenv("CONCURRENT_UPDATES", "64"))  # обновлений в обработке одновременно
+    
+    # Метрики и трассировка
+    METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+    METRICS_PORT = int(os.getenv("METRICS_PORT", "9100"))  # 0 - не запускать /metrics
+    TRACE_FILE = os.getenv("TRACE_FILE", "")  # JSON-строка на каждый запрос; пусто - выключено
+    # Время импорта по пакетам в отчете о запуске (обертка загрузчиков модулей, для диагностики)
+    STARTUP_PROFILE_IMPORTS = os.getenv("STARTUP_PROFILE_IMPORTS", "false").lower() in ("1", "true", "yes")
+    # Прогрев после запуска в фоне: токен GigaChat, индекс базы знаний, воркеры извлечения
+    PREWARM = os.getenv("PREWARM", "true").lower() in ("1", "true", "yes")
+    
+    # Настройки GigaChat
+    GIGA_CHAT_BASE_URL = os.getenv("GIGA_CHAT_BASE_URL")  # None - адрес по умолчанию
+    GIGA_CHAT_TIMEOUT = float(os.getenv("GIGA_CHAT_TIMEOUT", "60"))  # секунд на один запрос
+    GIGA_CHAT_MAX_CONCURRENCY = int(os.getenv("GIGA_CHAT_MAX_CONCURRENCY", "8"))
+    GIGA_CHAT_MAX_RETRIES = int(os.getenv("GIGA_CHAT_MAX_RETRIES", "3"))
+    GIGA_CHAT_RETRY_BACKOFF = float(os.getenv("GIGA_CHAT_RETRY_BACKOFF", "1.0"))  # базовая пауза, сек
+    
+    # Потоковый вывод ответов правками сообщения
+    STREAM_REPLIES = os.getenv("STREAM_REPLIES", "true").lower() in ("1", "true", "yes")
+    STREAM_EDIT_INTERVAL = float(os.getenv("STREAM_EDIT_INTERVAL", "1.0"))  # секунд между правками
+    STREAM_EDITS_PER_SECOND = float(os.getenv("STREAM_EDITS_PER_SECOND", "20"))  # правок в секунду на весь бот
+    
+    # Хранилище историй и кэша ответов (sqlite, WAL); пусто - только в памяти.
+    # Содержимое присланных файлов в базу не попадает, истории удаляются через SESSION_TTL
+    STORAGE_DB = os.getenv("STORAGE_DB", "data/bot.sqlite3")
+    STORAGE_FLUSH_INTERVAL = float(os.getenv("STORAGE_FLUSH_INTERVAL", "0.5"))  # секунд между записями пакета
+    STORAGE_BATCH_SIZE = int(os.getenv("STORAGE_BATCH_SIZE", "500"))  # изменений, после которых запись сразу
+    
+    # История диалогов
+    HISTORY_MAX_MESSAGES = 10
+    SESSION_STORE_MAX_BYTES = int(os.getenv("SESSION_STORE_MAX_BYTES", str(64 * 1024 * 1024)))  # 64MB
+    SESSION_TTL = float(os.getenv("SESSION_TTL", str(6 * 60 * 60)))  # 6 часов без активности
+    
+    # Сборка промпта
+    PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "6000"))
+    PROMPT_VERBATIM_MESSAGES = int(os.getenv("PROMPT_VERBATIM_MESSAGES", "2"))  # последние сообщения без сжатия
+    
+    # Кэш ответов на частые вопросы
+    RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "1000"))
+    RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", str(7 * 24 * 60 * 60)))  # неделя
+    
+    # База знаний: Markdown-инструкции и BM25-индекс по ним
+    KNOWLEDGE_DIR = os.getenv("KNOWLEDGE_DIR", "knowledge")
+    KNOWLEDGE_INDEX_PATH = os.getenv("KNOWLEDGE_INDEX_PATH", "cache/knowledge_index.json")
+    KNOWLEDGE_REFRESH_INTERVAL = float(os.getenv("KNOWLEDGE_REFRESH_INTERVAL", "60"))  # секунд между проверками папки
+    KNOWLEDGE_TOP_K = int(os.getenv("KNOWLEDGE_TOP_K", "3"))  # фрагментов в промпте
+    KNOWLEDGE_MIN_SCORE = float(os.getenv("KNOWLEDGE_MIN_SCORE", "1.0"))  # BM25 ниже - фрагмент не подходит
+    KNOWLEDGE_MIN_COVERAGE = float(os.getenv("KNOWLEDGE_MIN_COVERAGE", "0.25"))  # минимальная доля веса запроса в разделе
+    KNOWLEDGE_SNIPPET_CHARS = int(os.getenv("KNOWLEDGE_SNIPPET_CHARS", "800"))
+    # Ответ прямо из базы знаний без обращения к GigaChat
+    KNOWLEDGE_DIRECT_ANSWERS = os.getenv("KNOWLEDGE_DIRECT_ANSWERS", "false").lower() in ("1", "true", "yes")
+    KNOWLEDGE_DIRECT_CONFIDENCE = float(os.getenv("KNOWLEDGE_DIRECT_CONFIDENCE", "0.9"))  # доля веса запроса в разделе
+    KNOWLEDGE_DIRECT_MARGIN = float(os.getenv("KNOWLEDGE_DIRECT_MARGIN", "1.5"))  # отрыв от второго результата
+    
+    # Планировщик: параллельных задач по типам и лимиты на пользователя
+    SCHEDULER_TEXT_WORKERS = int(os.getenv("SCHEDULER_TEXT_WORKERS", "8"))
+    SCHEDULER_OCR_WORKERS = int(os.getenv("SCHEDULER_OCR_WORKERS", "4"))
+    RATE_LIMIT_TEXT_PER_MINUTE = float(os.getenv("RATE_LIMIT_TEXT_PER_MINUTE", "20"))
+    RATE_LIMIT_TEXT_BURST = int(os.getenv("RATE_LIMIT_TEXT_BURST", "5"))
+    RATE_LIMIT_OCR_PER_MINUTE = float(os.getenv("RATE_LIMIT_OCR_PER_MINUTE", "6"))
+    RATE_LIMIT_OCR_BURST = int(os.getenv("RATE_LIMIT_OCR_BURST", "3"))
+    
+    # Пул процессов для OCR и разбора документов
+    EXTRACTION_WORKERS = int(os.getenv("EXTRACTION_WORKERS", "0"))  # 0 - по числу ядер
+    EXTRACTION_QUEUE_SIZE = int(os.getenv("EXTRACTION_QUEUE_SIZE", "32"))
+    EXTRACTION_TIMEOUT = float(os.getenv("EXTRACTION_TIMEOUT", "120"))  # секунд на один файл
+    
+    # Кэш извлеченного текста
+    EXTRACTION_CACHE_DIR = os.getenv("EXTRACTION_CACHE_DIR", "cache/extraction")
+    EXTRACTION_CACHE_MAX_BYTES = int(os.getenv("EXTRACTION_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))  # 256MB
     
     # Настройки OCR
     TESSERACT_LANG = "rus+eng"
+    # Подготовка изображений к OCR
+    # Пропуск изображений без текста выключен: включать после проверки на своих снимках (benchmarks.bench_ocr)
+    OCR_SKIP_NO_TEXT = os.getenv("OCR_SKIP_NO_TEXT", "false").lower() in ("1", "true", "yes")
+    OCR_MIN_LOCAL_CONTRAST = int(os.getenv("OCR_MIN_LOCAL_CONTRAST", "40"))  # перепад яркости штриха и фона вокруг
+    OCR_MIN_INK_PIXELS = int(os.getenv("OCR_MIN_INK_PIXELS", "10"))  # пикселей штрихов на копии 1000px
+    OCR_MAX_SKEW = float(os.getenv("OCR_MAX_SKEW", "5"))  # градусов; 0 - без выравнивания
+    OCR_TARGET_LINE_HEIGHT = int(os.getenv("OCR_TARGET_LINE_HEIGHT", "32"))  # высота полосы строки текста, пикселей
+    OCR_MAX_SIDE = int(os.getenv("OCR_MAX_SIDE", "4000"))
+    OCR_BINARIZE = os.getenv("OCR_BINARIZE", "true").lower() in ("1", "true", "yes")
+    OCR_DETECT_LANGUAGE = os.getenv("OCR_DETECT_LANGUAGE", "true").lower() in ("1", "true", "yes")
+    OCR_MIN_SCRIPT_CONFIDENCE = float(os.getenv("OCR_MIN_SCRIPT_CONFIDENCE", "2"))
+    PDF_OCR_DPI = int(os.getenv("PDF_OCR_DPI", "200"))
+    PDF_OCR_THREADS = int(os.getenv("PDF_OCR_THREADS", "2"))  # параллельных tesseract на один PDF
+    OCR_PAGE_TIMEOUT = float(os.getenv("OCR_PAGE_TIMEOUT", "30"))  # секунд tesseract на изображение или страницу; 0 - без лимита
+    
+    # XLSX: листы длиннее XLSX_FULL_ROWS строк передаются сводкой
+    XLSX_FULL_ROWS = int(os.getenv("XLSX_FULL_ROWS", "200"))
+    XLSX_SAMPLE_ROWS = int(os.getenv("XLSX_SAMPLE_ROWS", "5"))
+    
+    # Альбомы: части одного media_group_id собираются в одну задачу
+    MEDIA_GROUP_WINDOW = float(os.getenv("MEDIA_GROUP_WINDOW", "1.0"))  # секунд ожидания следующей части
     
     # Ограничения
     MAX_FILE_SIZE = 20 * 1024 * 1024  # 20MB
     MAX_TEXT_LENGTH = 4000
+    IN_MEMORY_DOWNLOAD_LIMIT = int(os.getenv("IN_MEMORY_DOWNLOAD_LIMIT", str(5 * 1024 * 1024)))  # крупнее - на диск
     
     @classmethod
     def validate(cls):
@@ -21,3 +125,10 @@ class Config:
             raise ValueError("TELEGRAM_TOKEN not set in environment")
         if not cls.GIGA_CHAT_TOKEN:
             raise ValueError("GIGA_CHAT_TOKEN not set in environment")
+        # Без секрета любой, кто знает адрес, может присылать боту поддельные обновления
+        if cls.BOT_MODE == "webhook" and not cls.WEBHOOK_SECRET:
+            raise ValueError("WEBHOOK_SECRET must be set in webhook mode")
+        # Части альбома собираются, пока первая ждет остальные; при последовательной обработке
+        # каждая часть дождалась бы окна в одиночку и получила отдельный ответ
+        if cls.CONCURRENT_UPDATES < 2:
+            raise ValueError("CONCURRENT_UPDATES must be at least 2 to collect photo albums")
@@ -0,0 +1,253 @@
+import posixpath
+import re
+import zipfile
+from xml.etree import ElementTree
+from xml.parsers import expat
+
+# Основное пространство имен WordprocessingML: Transitional и Strict
+WORD_NAMESPACES = frozenset((
+    "http://schemas.openxmlformats.org/wordprocessingml/2006/main",
+    "http://purl.oclc.org/ooxml/wordprocessingml/main",
+))
+
+# Содержимое mc:Fallback дублирует mc:Choice (надписи для старых версий Word)
+_MC_FALLBACK = "{http://schemas.openxmlformats.org/markup-compatibility/2006}Fallback"
+
+DEFAULT_DOCUMENT_PART = "word/document.xml"
+
+MAX_HEADING_LEVEL = 6
+_HEADING_NAME_RE = re.compile(r"^(?:heading|заголовок)\s*(\d)$", re.IGNORECASE)
+
+# Символы внутри фрагмента текста (w:r)
+_RUN_CHARS = {"tab": "\t", "br": "\n", "cr": "\n", "noBreakHyphen": "-"}
+
+
+def _split_tag(tag: str) -> tuple:
+    """'{ns}local' -> (ns, local)"""
+    ns, _, local = tag[1:].partition("}")
+    return ns, local
+
+
+def _val(elem, ns: str):
+    return elem.get(f"{{{ns}}}val")
+
+
+def document_part(archive: zipfile.ZipFile) -> str:
+    """Путь основной части документа из _rels/.rels (обычно word/document.xml)"""
+    try:
+        rels = ElementTree.fromstring(archive.read("_rels/.rels"))
+    except KeyError:
+        return DEFAULT_DOCUMENT_PART
+    for rel in rels:
+        if rel.get("Type", "").endswith("/officeDocument") and rel.get("Target"):
+            return rel.get("Target").lstrip("/")
+    return DEFAULT_DOCUMENT_PART
+
+
+def _style_format(name: str, outline, list_item: bool) -> tuple:
+    """(уровень заголовка 0..MAX_HEADING_LEVEL, пункт списка) по имени и свойствам стиля"""
+    match = _HEADING_NAME_RE.match(name)
+    if name.lower() == "title":
+        level = 1
+    elif match:
+        level = int(match.group(1))
+    elif outline and outline.isdigit():
+        level = int(outline) + 1
+    else:
+        level = 0
+    return (level if level <= MAX_HEADING_LEVEL else 0), list_item
+
+
+def paragraph_styles(archive: zipfile.ZipFile, part: str) -> dict:
+    """Стили абзацев из styles.xml: styleId -> (уровень заголовка, пункт списка).
+
+    styles.xml бывает в сотни КБ (скрытые стили шаблона), поэтому разбор - обработчиками
+    expat без построения дерева: нужны лишь несколько элементов.
+    """
+    try:
+        data = archive.read(posixpath.join(posixpath.dirname(part), "styles.xml"))
+    except KeyError:
+        return {}
+    # Полные имена нужных элементов -> (локальное имя, пространство имен): один поиск в словаре на элемент
+    tags = {f"{ns} {local}": (local, ns) for ns in WORD_NAMESPACES
+            for local in ("style", "name", "outlineLvl", "numPr")}
+    styles = {}
+    current = None  # [styleId, имя, outlineLvl, numPr] читаемого стиля абзаца
+
+    def finish():
+        style_format = _style_format(*current[1:])
+        if any(style_format):
+            styles[current[0]] = style_format
+
+    # Только обработчик начала элементов: стиль завершается началом следующего или концом файла
+    def start(tag, attrs):
+        nonlocal current
+        known = tags.get(tag)
+        if known is None:
+            return
+        local, ns = known
+        if local == "style":
+            if current is not None:
+                finish()
+            is_paragraph = attrs.get(f"{ns} type") == "paragraph"
+            current = [attrs.get(f"{ns} styleId"), "", None, False] if is_paragraph else None
+        elif current is None:
+            return
+        elif local == "name":
+            current[1] = attrs.get(f"{ns} val", "").strip()
+        elif local == "outlineLvl":
+            current[2] = attrs.get(f"{ns} val")
+        else:
+            current[3] = True
+
+    parser = expat.ParserCreate(namespace_separator=" ")
+    parser.StartElementHandler = start
+    parser.Parse(data, True)
+    if current is not None:
+        finish()
+    return styles
+
+
+class _Paragraph:
+    __slots__ = ("parts", "level", "list_item")
+
+    def __init__(self):
+        self.parts = []
+        self.level = 0
+        self.list_item = False
+
+    def format(self) -> str:
+        text = "".join(self.parts).strip()
+        if not text:
+            return ""
+        if self.level:
+            return f"{'#' * self.level} {text}"
+        if self.list_item:
+            return f"• {text}"
+        return text
+
+
+def iter_blocks(stream, styles: dict = None):
+    """Абзацы, заголовки и строки таблиц document.xml в порядке документа.
+
+    Разбор потоковый (iterparse): обработанные элементы сразу удаляются из дерева.
+    Объединенные ячейки выводятся один раз: gridSpan в XML и так одна ячейка,
+    продолжения vMerge/hMerge пропускаются. Вложенные таблицы попадают в текст
+    ячейки внешней таблицы (ячейки через "; ").
+    """
+    styles = styles or {}
+    paragraphs = []  # стек абзацев: у надписей абзацы вложены в абзац
+    tables = []  # ячейки текущей строки на каждом уровне вложенности таблиц
+    cells = []  # стек ячеек: [тексты абзацев, продолжение объединения]
+    runs = properties = 0  # глубина внутри w:r и w:pPr
+    skip = 0
+    depth = 0
+    body = None
+    table_count = 0
+    table_started = False
+
+    for event, elem in ElementTree.iterparse(stream, events=("start", "end")):
+        tag = elem.tag
+        if event == "start":
+            depth += 1
+        else:
+            depth -= 1
+        if tag == _MC_FALLBACK:
+            skip += 1 if event == "start" else -1
+            continue
+        if skip:
+            continue
+        ns, local = _split_tag(tag)
+        if ns not in WORD_NAMESPACES:
+            continue
+
+        if event == "start":
+            if local == "p":
+                paragraphs.append(_Paragraph())
+            elif local == "r":
+                runs += 1
+            elif local == "pPr":
+                properties += 1
+            elif local == "tbl":
+                tables.append([])
+                if len(tables) == 1:
+                    table_count += 1
+                    table_started = False
+            elif local == "tr" and tables:
+                tables[-1] = []
+            elif local == "tc":
+                cells.append([[], False])
+            elif local == "body":
+                body = elem
+            continue
+
+        if local == "t":
+            if paragraphs and elem.text:
+                paragraphs[-1].parts.append(elem.text)
+        elif local in _RUN_CHARS:
+            if runs and not properties and paragraphs:
+                paragraphs[-1].parts.append(_RUN_CHARS[local])
+        elif local == "r":
+            runs -= 1
+        elif local == "pPr":
+            properties -= 1
+        elif local == "pStyle":
+            style = styles.get(_val(elem, ns))
+            if paragraphs and style:
+                paragraphs[-1].level, paragraphs[-1].list_item = style
+        elif local == "outlineLvl":
+            value = _val(elem, ns) or ""
+            if paragraphs and value.isdigit() and int(value) < MAX_HEADING_LEVEL:
+                paragraphs[-1].level = int(value) + 1
+        elif local == "numPr":
+            if paragraphs:
+                paragraphs[-1].list_item = True
+        elif local == "vMerge":
+            # Начало объединения - val="restart", продолжение - без val или "continue"
+            if cells and _val(elem, ns) != "restart":
+                cells[-1][1] = True
+        elif local == "hMerge":
+            if cells and _val(elem, ns) == "continue":
+                cells[-1][1] = True
+        elif local == "p":
+            text = paragraphs.pop().format() if paragraphs else ""
+            elem.clear()
+            if text and cells:
+                cells[-1][0].append(text)
+            elif text:
+                yield text
+        elif local == "tc":
+            if cells:
+                texts, continued = cells.pop()
+                if texts and not continued and tables:
+                    tables[-1].append(" ".join(texts))
+        elif local == "tr":
+            row = tables[-1] if tables else None
+            elem.clear()
+            if row:
+                if len(tables) > 1 and cells:
+                    cells[-1][0].append("; ".join(row))
+                else:
+                    line = " | ".join(row)
+                    if not table_started:
+                        table_started = True
+                        yield f"\n📊 Таблица {table_count}:"
+                    yield line
+        elif local == "tbl":
+            if tables:
+                tables.pop()
+            if not tables and table_started:
+                yield ""
+
+        # Обработанные элементы верхнего уровня тела документа больше не нужны
+        if depth == 2 and body is not None:
+            body.clear()
+
+
+def iter_docx(source):
+    """Содержимое DOCX (путь или файловый объект) в порядке документа"""
+    with zipfile.ZipFile(source) as archive:
+        part = document_part(archive)
+        styles = paragraph_styles(archive, part)
+        with archive.open(part) as stream:
+            yield from iter_blocks(stream, styles)
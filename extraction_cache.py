@@ -0,0 +1,145 @@
+import hashlib
+import logging
+import os
+import threading
+from pathlib import Path
+from config import Config
+from file_processor import is_complete
+
+logger = logging.getLogger(__name__)
+
+# Увеличивается при изменении формата извлеченного текста, чтобы не отдавать устаревшие записи
+CACHE_VERSION = "8"
+
+
+class ExtractionCache:
+    """Дисковый кэш извлеченного текста по хэшу содержимого и file_unique_id Telegram.
+
+    Методы работают с диском и вызываются из потоков (asyncio.to_thread).
+    """
+
+    def __init__(self, cache_dir: str = None, max_bytes: int = None):
+        root = Path(cache_dir or Config.EXTRACTION_CACHE_DIR) / f"v{CACHE_VERSION}"
+        self.text_dir = root / "text"
+        self.ids_dir = root / "ids"
+        self.text_dir.mkdir(parents=True, exist_ok=True)
+        self.ids_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes or Config.EXTRACTION_CACHE_MAX_BYTES
+        self._total_size = sum(p.stat().st_size for p in self.text_dir.glob("*.txt"))
+        self._lock = threading.Lock()
+
+        self.hits_by_id = 0
+        self.hits_by_hash = 0
+        self.misses = 0
+
+    @staticmethod
+    def hash_file(file_path: Path) -> str:
+        """SHA-256 содержимого файла"""
+        digest = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    @staticmethod
+    def hash_bytes(data: bytes) -> str:
+        """SHA-256 содержимого, загруженного в память"""
+        return hashlib.sha256(data).hexdigest()
+
+    def _text_path(self, digest: str) -> Path:
+        return self.text_dir / f"{digest}.txt"
+
+    def _read(self, digest: str):
+        path = self._text_path(digest)
+        try:
+            text = path.read_text(encoding="utf-8")
+        except FileNotFoundError:
+            return None
+        os.utime(path)  # mtime - время последнего обращения для вытеснения
+        return text
+
+    def get_by_file_id(self, file_unique_id: str):
+        """Поиск по file_unique_id - без скачивания файла"""
+        try:
+            digest = (self.ids_dir / file_unique_id).read_text()
+        except FileNotFoundError:
+            return None
+        text = self._read(digest)
+        if text is None:
+            (self.ids_dir / file_unique_id).unlink(missing_ok=True)
+            return None
+        with self._lock:
+            self.hits_by_id += 1
+        return text
+
+    def get_by_hash(self, digest: str):
+        """Поиск по хэшу уже скачанного файла"""
+        text = self._read(digest)
+        with self._lock:
+            if text is None:
+                self.misses += 1
+            else:
+                self.hits_by_hash += 1
+        return text
+
+    def put(self, digest: str, text: str):
+        """Сохранение извлеченного текста; ошибки и частичные результаты не кэшируются"""
+        if not is_complete(text):
+            return
+        path = self._text_path(digest)
+        with self._lock:
+            if path.exists():
+                return
+            data = text.encode("utf-8")
+            tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+            tmp_path.write_bytes(data)
+            tmp_path.replace(path)
+            self._total_size += len(data)
+            if self._total_size > self.max_bytes:
+                self._evict()
+
+    def link(self, file_unique_id: str, digest: str):
+        """Связь file_unique_id с хэшем содержимого"""
+        (self.ids_dir / file_unique_id).write_text(digest)
+
+    def _evict(self):
+        """Удаление давно не использованных записей до 90% лимита и ссылок на них (под self._lock)"""
+        entries = sorted(
+            ((p.stat().st_mtime, p.stat().st_size, p) for p in self.text_dir.glob("*.txt")),
+            key=lambda entry: entry[0]
+        )
+        self._total_size = sum(size for _, size, _ in entries)
+        target = self.max_bytes * 0.9
+        kept = {path.stem for _, _, path in entries}
+        for _, size, path in entries:
+            if self._total_size <= target:
+                break
+            path.unlink(missing_ok=True)
+            kept.discard(path.stem)
+            self._total_size -= size
+
+        # Ссылки file_unique_id на удаленные тексты больше не нужны
+        removed_links = 0
+        for link in self.ids_dir.iterdir():
+            try:
+                if link.read_text() not in kept:
+                    link.unlink()
+                    removed_links += 1
+            except FileNotFoundError:
+                pass
+        logger.info(f"Extraction cache evicted to {self._total_size} bytes, {removed_links} links removed")
+
+    @property
+    def hit_rate(self) -> float:
+        hits = self.hits_by_id + self.hits_by_hash
+        total = hits + self.misses
+        return hits / total if total else 0.0
+
+    def stats(self) -> dict:
+        return {
+            "hits_by_id": self.hits_by_id,
+            "hits_by_hash": self.hits_by_hash,
+            "misses": self.misses,
+            "hit_rate": round(self.hit_rate, 3),
+            "bytes": self._total_size,
+        }
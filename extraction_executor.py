@@ -0,0 +1,135 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from config import Config
+import file_processor
+from file_processor import FileProcessor
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Экземпляр FileProcessor внутри процесса-воркера
+_processor = None
+
+
+class ExtractionBusyError(Exception):
+    """Очередь извлечения заполнена"""
+
+
+class ExtractionTimeoutError(Exception):
+    """Извлечение не уложилось в отведенное время"""
+
+
+class ExtractionWorkerError(Exception):
+    """Процесс-воркер аварийно завершился (нехватка памяти, сбой в PyMuPDF или tesseract)"""
+
+
+class _JobTimeout(BaseException):
+    """Прерывание задачи в воркере; BaseException, чтобы не попасть в except Exception методов FileProcessor"""
+
+
+def _on_alarm(signum, frame):
+    raise _JobTimeout()
+
+
+def _ping():
+    """Пустая задача: пул запускает воркер, выполняя его initializer"""
+
+
+def _run_job(method: str, args: tuple, timeout: float):
+    """Выполнение метода FileProcessor в процессе-воркере"""
+    global _processor
+    if _processor is None:
+        _processor = FileProcessor()
+
+    # Таймаут внутри воркера прерывает саму задачу, а не только ожидание результата
+    use_alarm = timeout and hasattr(signal, "setitimer")
+    if use_alarm:
+        signal.signal(signal.SIGALRM, _on_alarm)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        result = getattr(_processor, method)(*args)
+        # Метрики воркера возвращаются вместе с результатом и суммируются в основном процессе
+        return result, metrics.REGISTRY.drain()
+    finally:
+        if use_alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+
+
+class ExtractionExecutor:
+    """Пул процессов для OCR и разбора документов"""
+
+    def __init__(self, max_workers: int = None, max_pending: int = None, timeout: float = None):
+        self.max_workers = max_workers or Config.EXTRACTION_WORKERS or os.cpu_count() or 1
+        self.max_pending = max_pending or Config.EXTRACTION_QUEUE_SIZE
+        self.timeout = timeout or Config.EXTRACTION_TIMEOUT
+        self._pool = None
+        self._pending = 0
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # С прогревом воркер импортирует библиотеки разбора при запуске, а не на первом файле
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=file_processor.warm_up if Config.PREWARM else None
+            )
+        return self._pool
+
+    async def warm_up(self):
+        """Запуск всех воркеров до первых файлов"""
+        pool = self._get_pool()
+        # Пул запускает новый процесс на каждую задачу, пока нет свободных воркеров
+        await asyncio.gather(*(asyncio.wrap_future(pool.submit(_ping)) for _ in range(self.max_workers)))
+        logger.info(f"Extraction pool warmed up: {self.max_workers} workers")
+
+    @property
+    def pending(self) -> int:
+        """Количество задач в очереди и в работе"""
+        return self._pending
+
+    async def run(self, method: str, *args, timeout: float = None):
+        """Выполнение FileProcessor.<method>(*args) в пуле без блокировки цикла событий"""
+        if self._pending >= self.max_pending:
+            raise ExtractionBusyError(f"Extraction queue is full ({self._pending} jobs)")
+
+        timeout = timeout or self.timeout
+        pool = self._get_pool()
+        self._pending += 1
+        try:
+            future = pool.submit(_run_job, method, args, timeout)
+            try:
+                # Небольшой запас: время ожидания в очереди + таймаут внутри воркера
+                result, snapshot = await asyncio.wait_for(asyncio.wrap_future(future), timeout * 2)
+                metrics.REGISTRY.merge(snapshot)
+                return result
+            except (asyncio.TimeoutError, _JobTimeout):
+                future.cancel()
+                raise ExtractionTimeoutError(f"{method} did not finish in {timeout:.0f}s")
+            except asyncio.CancelledError:
+                # Задача, еще не взятая воркером, снимается с очереди
+                future.cancel()
+                raise
+        except BrokenProcessPool as e:
+            self._discard_pool(pool)
+            raise ExtractionWorkerError(f"{method}: extraction worker crashed") from e
+        finally:
+            self._pending -= 1
+
+    def _discard_pool(self, pool: ProcessPoolExecutor):
+        """Сломанный пул (воркер убит или упал) заменяется новым при следующем вызове run"""
+        pool.shutdown(wait=False, cancel_futures=True)
+        # Пул мог быть уже пересоздан другой задачей, получившей ту же ошибку
+        if self._pool is pool:
+            logger.error("Extraction worker died, restarting the pool")
+            self._pool = None
+
+    def shutdown(self, wait: bool = False):
+        """Остановка пула с отменой задач из очереди"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait, cancel_futures=True)
+            self._pool = None
@@ -1,129 +1,279 @@
+import importlib
+import io
 import logging
+import sys
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from PIL import Image
-import pytesseract
-import fitz  # PyMuPDF
-from docx import Document
-import openpyxl
-from pdf2image import convert_from_path
 from config import Config
+import docx_reader
+import metrics
+from sheet_summary import SheetSummary, format_row
 
 logger = logging.getLogger(__name__)
 
+TRUNCATED_MARK = "\n\n... (текст обрезан)"
+# Дописывается, если часть страниц не распознана (сбой или пропуск OCR); такой результат не кэшируется
+INCOMPLETE_MARK = "\n\n⚠️ Часть страниц не распознана"
+# Изображение без признаков текста (OCR_SKIP_NO_TEXT): проверка может ошибиться, поэтому тоже не кэшируется
+OCR_SKIPPED_TEXT = "📷 Текст на изображении не найден"
+
+
+def is_complete(text: str) -> bool:
+    """Можно ли сохранить результат в кэш: не ошибка, не пропуск OCR и не частично распознанный документ"""
+    return not text.startswith("❌") and text != OCR_SKIPPED_TEXT and not text.endswith(INCOMPLETE_MARK)
+
+# Библиотеки разбора по типам файлов. Импортируются при первом использовании:
+# текстовым запросам они не нужны, а их импорт - основная часть холодного старта
+BACKENDS = {
+    "image": ("PIL.Image", "pytesseract", "ocr_preprocess"),
+    "pdf": ("fitz", "PIL.Image", "pytesseract", "ocr_preprocess"),
+    "xlsx": ("openpyxl",),
+}
+
+
+def _backend(name: str):
+    """Модуль библиотеки разбора; первый импорт учитывается в метриках как этап import.
+
+    import_module, а не sys.modules: потоки OCR не должны получить модуль, который
+    еще импортируется в соседнем потоке.
+    """
+    if name in sys.modules:
+        return importlib.import_module(name)
+    with metrics.timed("import"):
+        return importlib.import_module(name)
+
+
+def warm_up(file_types=None):
+    """Импорт библиотек заранее (для прогрева после старта); по умолчанию - для всех типов"""
+    for file_type in file_types or BACKENDS:
+        for name in BACKENDS.get(file_type, ()):
+            _backend(name)
+
+def _as_file(source):
+    """Путь к файлу или содержимое в памяти -> аргумент для Image.open / zipfile / openpyxl"""
+    if isinstance(source, (bytes, bytearray)):
+        return io.BytesIO(source)
+    return str(source)
+
+
 class FileProcessor:
     def __init__(self):
         self.download_dir = Path(Config.DOWNLOAD_DIR)
         self.download_dir.mkdir(exist_ok=True)
     
-    def process_image(self, file_path: Path) -> str:
+    def _collect(self, chunks, max_chars: int = None) -> str:
+        """Сбор фрагментов из генератора; при заданном бюджете чтение прекращается, как только он набран"""
+        parts = []
+        size = 0
+        try:
+            for chunk in chunks:
+                parts.append(chunk)
+                size += len(chunk) + 1
+                if max_chars and size > max_chars:
+                    return "\n".join(parts).strip()[:max_chars] + TRUNCATED_MARK
+        finally:
+            chunks.close()
+        return "\n".join(parts).strip()
+    
+    def process_image(self, file_path: Path, max_chars: int = None) -> str:
         """OCR обработка изображений"""
         try:
-            img = Image.open(file_path)
-            if img.mode != 'RGB':
-                img = img.convert('RGB')
+            with _backend("PIL.Image").open(_as_file(file_path)) as img:
+                with metrics.timed("ocr_preprocess"):
+                    prepared = _backend("ocr_preprocess").prepare(img)
+            if prepared is None:
+                metrics.OCR_SKIPPED.inc()
+                return OCR_SKIPPED_TEXT
             
-            # Оптимизация размера для OCR
-            if max(img.size) > 3000:
-                img.thumbnail((2500, 2500), Image.Resampling.LANCZOS)
-            
-            text = pytesseract.image_to_string(img, lang=Config.TESSERACT_LANG)
-            return text.strip() if text else "📷 Текст на изображении не распознан"
+            with metrics.timed("tesseract"):
+                text = self._tesseract(prepared)
+            if max_chars and len(text) > max_chars:
+                text = text[:max_chars] + TRUNCATED_MARK
+            return text if text else "📷 Текст на изображении не распознан"
             
         except Exception as e:
             logger.error(f"Image OCR error: {e}")
             return f"❌ Ошибка распознавания изображения: {e}"
     
-    def process_pdf(self, file_path: Path) -> str:
-        """Обработка PDF файлов"""
+    def _render_page(self, page):
+        """Растеризация страницы PDF средствами PyMuPDF в изображение PIL"""
+        with metrics.timed("pdf_render"):
+            pix = page.get_pixmap(dpi=Config.PDF_OCR_DPI, colorspace=_backend("fitz").csGRAY)
+            return _backend("PIL.Image").frombytes("L", (pix.width, pix.height), pix.samples)
+    
+    @staticmethod
+    def _tesseract(prepared) -> str:
+        # По таймауту pytesseract завершает процесс tesseract, а не оставляет его работать
+        return _backend("pytesseract").image_to_string(
+            prepared.image, lang=prepared.lang, timeout=Config.OCR_PAGE_TIMEOUT
+        ).strip()
+    
+    def _ocr_image(self, img, stop=None):
+        """Распознавание страницы; None - OCR пропущен (OCR_SKIP_NO_TEXT)"""
+        try:
+            # Язык для страниц документа не определяем: OSD на каждую страницу дороже выигрыша
+            with metrics.timed("ocr_preprocess"):
+                prepared = _backend("ocr_preprocess").prepare(img, detect_language=False)
+            if prepared is None:
+                metrics.OCR_SKIPPED.inc()
+                return None
+            if stop is not None and stop.is_set():
+                return ""
+            with metrics.timed("tesseract"):
+                text = self._tesseract(prepared)
+            metrics.PAGES_OCR.inc()
+            return text
+        finally:
+            img.close()
+    
+    def _iter_pdf_pages(self, doc):
+        """Страницы PDF по порядку: (номер, текст, распознан ли OCR).
+        
+        Страницы без текстового слоя рендерятся по одной и распознаются
+        параллельно; одновременно в памяти не больше PDF_OCR_THREADS * 2 изображений.
+        При остановке (бюджет набран, таймаут задачи) распознавание уже запущенных
+        страниц дожидается завершения: воркер берет следующую задачу без лишних потоков.
+        """
+        pool = ThreadPoolExecutor(max_workers=Config.PDF_OCR_THREADS)
+        stop = threading.Event()
+        window = deque()
+        in_flight = 0
         try:
-            doc = fitz.open(str(file_path))
-            full_text = []
-            ocr_pages = []
-            
-            # Извлечение текста из PDF
             for page_num in range(doc.page_count):
-                page = doc.load_page(page_num)
-                text = page.get_text().strip()
+                with metrics.timed("pdf_text"):
+                    page = doc.load_page(page_num)
+                    text = page.get_text().strip()
                 if text:
-                    full_text.append(f"📄 Страница {page_num + 1}:\n{text}")
+                    window.append((page_num, text, None))
                 else:
-                    ocr_pages.append(page_num)
-            
-            # OCR для страниц без текста
-            if ocr_pages:
-                full_text.append("🔍 Страницы требующие OCR: " + ", ".join(map(str, [p+1 for p in ocr_pages])))
-                try:
-                    images = convert_from_path(
-                        str(file_path), 
-                        first_page=min(ocr_pages)+1, 
-                        last_page=max(ocr_pages)+1
-                    )
-                    for i, page_num in enumerate(ocr_pages):
-                        if i < len(images):
-                            txt = pytesseract.image_to_string(images[i], lang=Config.TESSERACT_LANG)
-                            if txt.strip():
-                                full_text.append(f"📄 Страница {page_num + 1} (OCR):\n{txt}")
-                except Exception as ocr_error:
-                    logger.error(f"PDF OCR failed: {ocr_error}")
+                    window.append((page_num, None, pool.submit(self._ocr_image, self._render_page(page), stop)))
+                    in_flight += 1
+                
+                # Отдаем готовые страницы; при заполненном окне ждем самую раннюю
+                while window and (window[0][2] is None or window[0][2].done()
+                                  or in_flight >= Config.PDF_OCR_THREADS * 2):
+                    page_num, text, future = window.popleft()
+                    if future is not None:
+                        in_flight -= 1
+                        text = self._page_ocr_result(page_num, future)
+                    yield page_num, text, future is not None
             
+            while window:
+                page_num, text, future = window.popleft()
+                if future is not None:
+                    text = self._page_ocr_result(page_num, future)
+                yield page_num, text, future is not None
+        finally:
+            # Страницы из очереди отменяются, начатые - не доходят до tesseract или ограничены OCR_PAGE_TIMEOUT
+            stop.set()
+            pool.shutdown(wait=True, cancel_futures=True)
+    
+    def _page_ocr_result(self, page_num: int, future):
+        """Текст распознанной страницы; None - распознать не удалось или OCR пропущен"""
+        try:
+            return future.result()
+        except Exception as ocr_error:
+            logger.error(f"PDF OCR failed on page {page_num + 1}: {ocr_error}")
+            return None
+    
+    def iter_pdf(self, file_path: Path, failed: list = None):
+        """Текст PDF постранично; OCR выполняется только для запрошенных страниц.
+        
+        Номера страниц, которые не удалось распознать, добавляются в failed.
+        """
+        fitz = _backend("fitz")  # PyMuPDF
+        if isinstance(file_path, (bytes, bytearray)):
+            doc = fitz.open(stream=file_path, filetype="pdf")
+        else:
+            doc = fitz.open(str(file_path))
+        pages = self._iter_pdf_pages(doc)
+        try:
+            for page_num, text, is_ocr in pages:
+                if text is None and failed is not None:
+                    failed.append(page_num + 1)
+                if text:
+                    label = " (OCR)" if is_ocr else ""
+                    yield f"📄 Страница {page_num + 1}{label}:\n{text}\n"
+        finally:
+            pages.close()
             doc.close()
-            return "\n\n".join(full_text) if full_text else "📄 В PDF не найден текст"
+    
+    def process_pdf(self, file_path: Path, max_chars: int = None) -> str:
+        """Обработка PDF файлов"""
+        try:
+            failed = []
+            text = self._collect(self.iter_pdf(file_path, failed), max_chars)
+            text = text if text else "📄 В PDF не найден текст"
+            if failed:
+                text += INCOMPLETE_MARK
+            return text
             
         except Exception as e:
             logger.error(f"PDF processing error: {e}")
             return f"❌ Ошибка обработки PDF: {e}"
     
-    def process_docx(self, file_path: Path) -> str:
+    def iter_docx(self, file_path: Path):
+        """Абзацы, заголовки и строки таблиц DOCX в порядке документа (потоковый разбор XML)"""
+        blocks = docx_reader.iter_docx(_as_file(file_path))
+        try:
+            for i, block in enumerate(blocks):
+                if i == 0:
+                    yield "📝 Текст документа:"
+                yield block
+        finally:
+            blocks.close()
+    
+    def process_docx(self, file_path: Path, max_chars: int = None) -> str:
         """Обработка DOCX файлов"""
         try:
-            doc = Document(str(file_path))
-            paragraphs = []
-            
-            for para in doc.paragraphs:
-                if para.text.strip():
-                    paragraphs.append(para.text)
-            
-            # Обработка таблиц
-            tables_text = []
-            for table in doc.tables:
-                for row in table.rows:
-                    row_text = " | ".join(cell.text.strip() for cell in row.cells if cell.text.strip())
-                    if row_text:
-                        tables_text.append(row_text)
-            
-            result = []
-            if paragraphs:
-                result.append("📝 Текст документа:\n" + "\n".join(paragraphs))
-            if tables_text:
-                result.append("📊 Таблицы:\n" + "\n".join(tables_text))
-            
-            return "\n\n".join(result) if result else "📝 Документ пуст"
+            text = self._collect(self.iter_docx(file_path), max_chars)
+            return text if text else "📝 Документ пуст"
             
         except Exception as e:
             logger.error(f"DOCX processing error: {e}")
             return f"❌ Ошибка обработки DOCX: {e}"
     
-    def process_xlsx(self, file_path: Path) -> str:
-        """Обработка XLSX файлов"""
+    def iter_xlsx(self, file_path: Path):
+        """Листы XLSX в потоковом режиме: небольшие целиком, большие - сводкой"""
+        # read_only: строки читаются из XML по мере обхода, без объектов ячеек в памяти
+        wb = _backend("openpyxl").load_workbook(_as_file(file_path), read_only=True, data_only=True)
         try:
-            wb = openpyxl.load_workbook(str(file_path), data_only=True)
-            all_sheets_data = []
-            
-            for sheet_name in wb.sheetnames:
-                ws = wb[sheet_name]
-                sheet_data = []
-                
-                # Читаем данные построчно
-                for row in ws.iter_rows(values_only=True):
-                    row_data = [str(cell) if cell is not None else "" for cell in row]
-                    if any(cell.strip() for cell in row_data if cell):
-                        sheet_data.append("\t".join(row_data))
-                
-                if sheet_data:
-                    all_sheets_data.append(f"📊 Лист: {sheet_name}\n" + "\n".join(sheet_data))
-            
+            for ws in wb.worksheets:
+                yield from self._iter_sheet(ws)
+        finally:
             wb.close()
-            return "\n\n" + "="*50 + "\n\n".join(all_sheets_data) if all_sheets_data else "📊 Файл не содержит данных"
+    
+    def _iter_sheet(self, ws):
+        head_rows = []
+        summary = None
+        
+        for row in ws.iter_rows(values_only=True):
+            if not any(cell is not None and str(cell).strip() for cell in row):
+                continue
+            if summary is not None:
+                summary.add(row)
+            elif len(head_rows) < Config.XLSX_FULL_ROWS:
+                head_rows.append(row)
+            else:
+                # Лист большой - дальше копим только статистику
+                summary = SheetSummary(ws.title, head_rows, Config.XLSX_SAMPLE_ROWS)
+                head_rows = None
+                summary.add(row)
+        
+        if summary is not None:
+            yield from summary.lines()
+        elif head_rows:
+            yield f"\n📊 Лист: {ws.title}"
+            for row in head_rows:
+                yield format_row(row)
+    
+    def process_xlsx(self, file_path: Path, max_chars: int = None) -> str:
+        """Обработка XLSX файлов"""
+        try:
+            text = self._collect(self.iter_xlsx(file_path), max_chars)
+            return text if text else "📊 Файл не содержит данных"
             
         except Exception as e:
             logger.error(f"XLSX processing error: {e}")
@@ -132,6 +282,7 @@ class FileProcessor:
     def get_file_type(self, filename: str, mime_type: str) -> str:
         """Определение типа файла"""
         file_ext = Path(filename).suffix.lower() if filename else ""
+        mime_type = mime_type or ""
         
         if mime_type.startswith('image/') or file_ext in ['.jpg', '.jpeg', '.png', '.bmp']:
             return 'image'
@@ -1,54 +1,256 @@
+import asyncio
 import logging
+import random
+import httpx
 from gigachat import GigaChat
+from gigachat.exceptions import AuthenticationError, ResponseError
 from gigachat.models import Chat, Messages, MessagesRole
 from config import Config
+from knowledge_base import KnowledgeBase
+import metrics
+from prompt_builder import PromptBuilder
 from prompts import MICROSOFT_OFFICE_PROMPT, format_user_prompt
+from response_cache import ResponseCache
+from session_store import ROLE_ASSISTANT, ROLE_USER, SessionStore
+from storage import Storage
 
 logger = logging.getLogger(__name__)
 
+ERROR_RESPONSE = "🤖 Извините, произошла ошибка при обработке вашего запроса. Пожалуйста, попробуйте еще раз."
+STREAM_INTERRUPTED = "\n\n⚠️ Ответ прерван из-за ошибки. Пожалуйста, попробуйте еще раз."
+
+# Коды ответа, при которых имеет смысл повторить запрос
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+def _is_retryable(error: Exception) -> bool:
+    """Можно ли повторить запрос после этой ошибки"""
+    if isinstance(error, AuthenticationError):
+        return False
+    if isinstance(error, ResponseError):
+        status_code = error.args[1] if len(error.args) > 1 else None
+        return status_code in RETRYABLE_STATUS_CODES
+    return isinstance(error, (asyncio.TimeoutError, httpx.TransportError))
+
+
 class GigaChatClient:
-    def __init__(self):
-        self.client = GigaChat(
+    def __init__(self, client: GigaChat = None, sessions: SessionStore = None,
+                 response_cache: ResponseCache = None, knowledge_base: KnowledgeBase = None,
+                 storage: Storage = None):
+        # Клиент создается при первом запросе (или прогреве), токен он получает сам при первом вызове API
+        self._client = client
+        # Общее хранилище историй и кэша ответов; без STORAGE_DB - только в памяти
+        self.storage = storage or (Storage() if Config.STORAGE_DB else None)
+        self.sessions = sessions or SessionStore(storage=self.storage)
+        self.response_cache = response_cache or ResponseCache(storage=self.storage)
+        self.knowledge_base = knowledge_base or KnowledgeBase()
+        self.prompt_builder = PromptBuilder()
+        self._semaphore = None
+
+    @property
+    def client(self) -> GigaChat:
+        if self._client is None:
+            self._client = self._create_client()
+        return self._client
+
+    @client.setter
+    def client(self, client: GigaChat):
+        self._client = client
+
+    @staticmethod
+    def _create_client() -> GigaChat:
+        """Создание клиента GigaChat с общим пулом HTTP-соединений"""
+        kwargs = {}
+        if Config.GIGA_CHAT_BASE_URL:
+            kwargs["base_url"] = Config.GIGA_CHAT_BASE_URL
+        return GigaChat(
             credentials=Config.GIGA_CHAT_TOKEN,
-            verify_ssl_certs=False
+            verify_ssl_certs=False,
+            timeout=Config.GIGA_CHAT_TIMEOUT,
+            **kwargs
         )
-        self.conversation_history = []
-    
-    def send_message(self, user_message: str, extracted_text: str = None, file_type: str = None) -> str:
-        """Отправка сообщения в GigaChat"""
+
+    def _build_messages(self, history: list, user_prompt: str) -> list:
+        """Системный промпт, история диалога чата (в пределах бюджета токенов) и текущее сообщение"""
+        history, tokens = self.prompt_builder.build(MICROSOFT_OFFICE_PROMPT, history, user_prompt)
+        metrics.PROMPT_TOKENS.observe(tokens)
+        messages = [
+            Messages(role=MessagesRole.SYSTEM, content=MICROSOFT_OFFICE_PROMPT)
+        ]
+        messages.extend(
+            Messages(role=role, content=content)
+            for role, content in history
+        )
+        messages.append(Messages(role=MessagesRole.USER, content=user_prompt))
+        return messages
+
+    def _remember(self, chat_id, user_prompt: str, assistant_response: str):
+        """Обновление истории диалога (ограничение размера - в SessionStore)"""
+        self.sessions.append(chat_id, ROLE_USER, user_prompt)
+        self.sessions.append(chat_id, ROLE_ASSISTANT, assistant_response)
+        logger.debug(f"Session store: {self.sessions.memory_usage()} bytes")
+
+    def send_message(self, chat_id, user_message: str, extracted_text: str = None, file_type: str = None) -> str:
+        """Отправка сообщения в GigaChat (блокирующий вызов)"""
         try:
-            # Форматируем пользовательский промпт
-            user_prompt = format_user_prompt(user_message, extracted_text, file_type)
-            
-            # Создаем список сообщений
-            messages = [
-                Messages(role=MessagesRole.SYSTEM, content=MICROSOFT_OFFICE_PROMPT)
-            ]
-            
-            # Добавляем историю диалога
-            messages.extend(self.conversation_history)
-            
-            # Добавляем текущее сообщение
-            messages.append(Messages(role=MessagesRole.USER, content=user_prompt))
-            
-            # Отправляем запрос
+            user_prompt, messages, cacheable, ready = self._prepare(chat_id, user_message, extracted_text, file_type)
+            if ready is not None:
+                return ready
+
             response = self.client.chat(Chat(messages=messages))
             assistant_response = response.choices[0].message.content
-            
-            # Обновляем историю (ограничиваем размер)
-            self.conversation_history.append(Messages(role=MessagesRole.USER, content=user_prompt))
-            self.conversation_history.append(Messages(role=MessagesRole.ASSISTANT, content=assistant_response))
-            
-            # Ограничиваем историю последними 10 сообщениями
-            if len(self.conversation_history) > 10:
-                self.conversation_history = self.conversation_history[-10:]
-            
+
+            self._remember(chat_id, user_prompt, assistant_response)
+            if cacheable:
+                self.response_cache.put(user_message, assistant_response)
             return assistant_response
-            
+
         except Exception as e:
             logger.error(f"GigaChat error: {e}")
-            return "🤖 Извините, произошла ошибка при обработке вашего запроса. Пожалуйста, попробуйте еще раз."
-    
-    def clear_history(self):
-        """Очистка истории диалога"""
-        self.conversation_history = []
+            metrics.ERRORS.inc(stage="gigachat", type=type(e).__name__)
+            return ERROR_RESPONSE
+
+    async def asend_message(self, chat_id, user_message: str, extracted_text: str = None, file_type: str = None) -> str:
+        """Асинхронная отправка сообщения в GigaChat, не блокирует цикл событий"""
+        try:
+            user_prompt, messages, cacheable, ready = self._prepare(chat_id, user_message, extracted_text, file_type)
+            if ready is not None:
+                return ready
+
+            response = await self._achat_with_retry(Chat(messages=messages))
+            assistant_response = response.choices[0].message.content
+
+            self._remember(chat_id, user_prompt, assistant_response)
+            if cacheable:
+                self.response_cache.put(user_message, assistant_response)
+            return assistant_response
+
+        except Exception as e:
+            logger.error(f"GigaChat error: {e}")
+            metrics.ERRORS.inc(stage="gigachat", type=type(e).__name__)
+            return ERROR_RESPONSE
+
+    async def astream_message(self, chat_id, user_message: str, extracted_text: str = None, file_type: str = None):
+        """Потоковая отправка сообщения: асинхронный генератор фрагментов ответа"""
+        user_prompt, messages, cacheable, ready = self._prepare(chat_id, user_message, extracted_text, file_type)
+        if ready is not None:
+            yield ready
+            return
+
+        parts = []
+        try:
+            async for delta in self._astream_with_retry(Chat(messages=messages)):
+                parts.append(delta)
+                yield delta
+        except Exception as e:
+            logger.error(f"GigaChat stream error: {e}")
+            metrics.ERRORS.inc(stage="gigachat", type=type(e).__name__)
+            # Оборванный ответ не сохраняется в историю и кэш, пользователь видит, что он неполный
+            yield STREAM_INTERRUPTED if parts else ERROR_RESPONSE
+            return
+
+        assistant_response = "".join(parts)
+        self._remember(chat_id, user_prompt, assistant_response)
+        if cacheable:
+            self.response_cache.put(user_message, assistant_response)
+
+    def _prepare(self, chat_id, user_message: str, extracted_text: str = None, file_type: str = None):
+        """Промпт для истории, сообщения для модели, можно ли кэшировать ответ и готовый ответ, если он есть.
+
+        Готовый ответ берется из кэша (первый вопрос диалога без вложений) или из базы знаний
+        и попадает в историю как обычный. Справка из базы знаний в историю не сохраняется.
+        """
+        user_prompt = format_user_prompt(user_message, extracted_text, file_type)
+        history = self.sessions.get_history(chat_id)
+        cacheable = not extracted_text and not history
+
+        ready = self.response_cache.get(user_message) if cacheable else None
+        if ready is not None:
+            logger.info(f"Response cache hit ({self.response_cache.stats()})")
+            self._remember(chat_id, user_prompt, ready)
+            return user_prompt, None, cacheable, ready
+
+        with metrics.timed("knowledge"):
+            hits = self.knowledge_base.search(user_message)
+        if hits and not extracted_text and Config.KNOWLEDGE_DIRECT_ANSWERS:
+            ready = self.knowledge_base.direct_answer(hits)
+            if ready is not None:
+                logger.info(f"Answered from knowledge base: {hits[0].source} ({hits[0].title})")
+                self._remember(chat_id, user_prompt, ready)
+                return user_prompt, None, cacheable, ready
+
+        snippets = [self.knowledge_base.snippet(hit) for hit in hits]
+        llm_prompt = format_user_prompt(user_message, extracted_text, file_type, snippets)
+        return user_prompt, self._build_messages(history, llm_prompt), cacheable, None
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(Config.GIGA_CHAT_MAX_CONCURRENCY)
+        return self._semaphore
+
+    async def _backoff(self, attempt: int, error: Exception):
+        delay = Config.GIGA_CHAT_RETRY_BACKOFF * (2 ** attempt) * (0.5 + random.random())
+        logger.warning(f"GigaChat request failed ({error!r}), retry {attempt + 1} in {delay:.1f}s")
+        await asyncio.sleep(delay)
+
+    async def _achat_with_retry(self, chat: Chat):
+        """Запрос с ограничением параллелизма, таймаутом и экспоненциальной паузой между попытками"""
+        attempt = 0
+        while True:
+            try:
+                async with self._get_semaphore():
+                    return await asyncio.wait_for(
+                        self.client.achat(chat),
+                        timeout=Config.GIGA_CHAT_TIMEOUT
+                    )
+            except Exception as e:
+                if attempt >= Config.GIGA_CHAT_MAX_RETRIES or not _is_retryable(e):
+                    raise
+                await self._backoff(attempt, e)
+                attempt += 1
+
+    async def _astream_with_retry(self, chat: Chat):
+        """Потоковый запрос; повтор возможен только до получения первого фрагмента"""
+        attempt = 0
+        while True:
+            started = False
+            try:
+                async with self._get_semaphore():
+                    stream = self.client.astream(chat)
+                    try:
+                        while True:
+                            try:
+                                # Таймаут - на ожидание каждого следующего фрагмента
+                                chunk = await asyncio.wait_for(stream.__anext__(), timeout=Config.GIGA_CHAT_TIMEOUT)
+                            except StopAsyncIteration:
+                                return
+                            if chunk.choices and chunk.choices[0].delta.content:
+                                started = True
+                                yield chunk.choices[0].delta.content
+                    finally:
+                        await stream.aclose()
+            except Exception as e:
+                if started or attempt >= Config.GIGA_CHAT_MAX_RETRIES or not _is_retryable(e):
+                    raise
+                await self._backoff(attempt, e)
+                attempt += 1
+
+    async def warm_up(self):
+        """Загрузка индекса базы знаний, получение токена и соединение с GigaChat до первого вопроса"""
+        await asyncio.to_thread(self.knowledge_base.load)
+        try:
+            # Любой запрос к API получает токен и открывает соединение из общего пула
+            await asyncio.wait_for(self.client.aget_models(), timeout=Config.GIGA_CHAT_TIMEOUT)
+        except Exception as e:
+            logger.warning(f"GigaChat warm-up failed, will retry on first request: {e!r}")
+
+    async def aclose(self):
+        """Закрытие пула HTTP-соединений и запись отложенных изменений хранилища"""
+        if self._client is not None:
+            await self._client.aclose()
+        if self.storage is not None:
+            await asyncio.to_thread(self.storage.close)
+
+    def clear_history(self, chat_id):
+        """Очистка истории диалога одного чата"""
+        self.sessions.clear(chat_id)
@@ -0,0 +1,281 @@
+import functools
+import heapq
+import json
+import logging
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter, namedtuple
+from pathlib import Path
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Увеличивается при изменении токенизатора или формата файла индекса
+INDEX_VERSION = 2
+
+# Параметры BM25
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_WORD_RE = re.compile(r"[a-zа-я0-9]+")
+_HEADING_RE = re.compile(r"^(#{1,3})\s+(.+?)\s*#*\s*$")
+
+STOPWORDS = frozenset("""
+и в во не что он на я с со как а то все она так его но да ты к у же вы за бы по только ее мне было вот
+от меня еще нет о из ему теперь когда даже ну ли если уже или ни быть был него до вас нибудь опять уж вам
+ведь там потом себя ничего ей может они тут где есть надо ней для мы тебя их чем была сам чтоб без будто
+чего раз тоже себе под будет ж тогда кто этот того потому этого какой совсем ним здесь этом один почти мой
+тем чтобы нее сейчас были куда зачем всех никогда можно при наконец два об другой хоть после над больше тот
+через эти нас про всего них какая много разве три эту моя впрочем хорошо свою этой перед иногда лучше чуть
+том нельзя такой им более всегда конечно всю между это как почему помоги помогите пожалуйста подскажи
+подскажите скажи скажите нужно хочу привет работает работают работать сделать делать
+the a an to of in on for is are how do i and or with what why can my
+""".split())
+
+# Окончания для легкого стемминга
+_RU_ENDINGS = frozenset("""
+иями ями ами иях ием иям ией ого его ему ому ыми ими ать ять ить еть уть ешь ете ишь ите ает яет ует
+ют ут ат ят ет ит ла ло ли ия ья ие ье ии ий ый ой ей ая яя ое ее ые ую юю ою ею ом ем ам ям ах ях ов ев
+ью а я о е и ы у ю ь й
+""".split())
+_RU_REFLEXIVE = ("ся", "сь")
+_EN_ENDINGS = frozenset(("ing", "ed", "es", "s"))
+
+MIN_STEM = 3
+
+
+@functools.lru_cache(maxsize=100000)
+def stem(word: str) -> str:
+    """Легкий стемминг: возвратная частица и одно окончание, основа не короче MIN_STEM"""
+    if word.isascii():
+        endings = _EN_ENDINGS
+    else:
+        endings = _RU_ENDINGS
+        if word.endswith(_RU_REFLEXIVE) and len(word) - 2 >= MIN_STEM:
+            word = word[:-2]
+    # Сначала самое длинное окончание
+    for size in (4, 3, 2, 1):
+        if len(word) - size >= MIN_STEM and word[-size:] in endings:
+            return word[:-size]
+    return word
+
+
+def tokenize(text: str) -> list:
+    """Термы текста: нижний регистр, ё -> е, без стоп-слов, после стемминга"""
+    words = _WORD_RE.findall(text.lower().replace("ё", "е"))
+    return [stem(word) for word in words if word not in STOPWORDS]
+
+
+def split_sections(markdown: str, default_title: str) -> list:
+    """Разбиение Markdown на разделы по заголовкам: [(заголовок, текст), ...]"""
+    sections = []
+    doc_title = default_title
+    title = default_title
+    lines = []
+
+    def flush():
+        text = "\n".join(lines).strip()
+        if text:
+            sections.append((title, text))
+
+    for line in markdown.splitlines():
+        match = _HEADING_RE.match(line)
+        if not match:
+            lines.append(line)
+            continue
+        flush()
+        lines = []
+        level, heading = len(match.group(1)), match.group(2)
+        if level == 1:
+            doc_title = title = heading
+        else:
+            title = f"{doc_title}. {heading}"
+    flush()
+    return sections
+
+
+Hit = namedtuple("Hit", "score coverage title text source")
+
+
+class KnowledgeBase:
+    """BM25-поиск по разделам Markdown-инструкций из KNOWLEDGE_DIR.
+
+    Индекс хранится на диске и при изменении файлов обновляется по одному файлу:
+    заново разбираются только новые и измененные (по mtime и размеру).
+    Проверка папки идет в фоновом потоке, поиск до ее окончания использует прежний индекс.
+    """
+
+    def __init__(self, knowledge_dir: str = None, index_path: str = None):
+        self.knowledge_dir = Path(knowledge_dir or Config.KNOWLEDGE_DIR)
+        self.index_path = Path(index_path or Config.KNOWLEDGE_INDEX_PATH)
+        self._files = {}  # относительный путь -> {"mtime", "size", "sections"}
+        # (разделы (заголовок, текст, источник, длина), терм -> [(номер раздела, частота)], средняя длина);
+        # заменяется целиком, чтобы поиск не видел наполовину построенный индекс
+        self._index = ([], {}, 0.0)
+        self._checked_at = None
+        self._refresh_lock = threading.Lock()
+
+    def _load_index(self) -> dict:
+        try:
+            data = json.loads(self.index_path.read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError):
+            return {}
+        if data.get("version") != INDEX_VERSION:
+            return {}
+        return data.get("files", {})
+
+    def _save_index(self):
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.index_path.with_suffix(".tmp")
+        tmp_path.write_text(
+            json.dumps({"version": INDEX_VERSION, "files": self._files}, ensure_ascii=False),
+            encoding="utf-8"
+        )
+        os.replace(tmp_path, self.index_path)
+
+    @staticmethod
+    def _parse(path: Path) -> list:
+        sections = []
+        for title, text in split_sections(path.read_text(encoding="utf-8"), path.stem):
+            # Слова заголовка весят вдвое больше слов текста
+            terms = Counter(tokenize(title) * 2 + tokenize(text))
+            sections.append({"title": title, "text": text, "length": sum(terms.values()), "terms": terms})
+        return sections
+
+    def refresh(self):
+        """Синхронизация индекса с папкой: разбор новых и измененных файлов, удаление пропавших"""
+        files = self._load_index() if self._checked_at is None else dict(self._files)
+
+        current = {}
+        for path in sorted(self.knowledge_dir.glob("**/*.md")):
+            stat = path.stat()
+            current[path.relative_to(self.knowledge_dir).as_posix()] = (path, stat.st_mtime, stat.st_size)
+
+        changed = [name for name in files if name not in current]
+        for name in changed:
+            del files[name]
+        for name, (path, mtime, size) in current.items():
+            entry = files.get(name)
+            if entry is not None and entry["mtime"] == mtime and entry["size"] == size:
+                continue
+            try:
+                files[name] = {"mtime": mtime, "size": size, "sections": self._parse(path)}
+            except (OSError, UnicodeDecodeError) as e:
+                logger.error(f"Knowledge file {name} skipped: {e}")
+                continue
+            changed.append(name)
+
+        if changed or self._checked_at is None:
+            self._files = files
+            self._index = self._build_postings(files)
+        if changed:
+            self._save_index()
+            logger.info(f"Knowledge index updated: {len(changed)} files changed, {len(self._index[0])} sections")
+        self._checked_at = time.monotonic()
+
+    @staticmethod
+    def _build_postings(files: dict) -> tuple:
+        sections = []
+        postings = {}
+        for name, entry in files.items():
+            for section in entry["sections"]:
+                index = len(sections)
+                sections.append((section["title"], section["text"], name, section["length"]))
+                for term, count in section["terms"].items():
+                    postings.setdefault(term, []).append((index, count))
+        total = sum(section[3] for section in sections)
+        return sections, postings, (total / len(sections) if sections else 0.0)
+
+    def _stale(self) -> bool:
+        return self._checked_at is None or time.monotonic() - self._checked_at >= Config.KNOWLEDGE_REFRESH_INTERVAL
+
+    def _check(self):
+        if not self._stale():
+            return
+        if self.knowledge_dir.is_dir():
+            self.refresh()
+        else:
+            self._checked_at = time.monotonic()
+
+    def _check_in_background(self):
+        try:
+            self._check()
+        except Exception as e:
+            logger.error(f"Knowledge index refresh failed: {e}")
+        finally:
+            self._refresh_lock.release()
+
+    def _ensure_fresh(self):
+        """Проверка папки в фоновом потоке, если подошел срок и проверка еще не идет"""
+        if self._stale() and self._refresh_lock.acquire(blocking=False):
+            threading.Thread(target=self._check_in_background, name="knowledge-refresh", daemon=True).start()
+
+    def load(self):
+        """Загрузка индекса заранее, чтобы первый запрос не остался без справки.
+
+        Блокирующий вызов: из цикла событий - через asyncio.to_thread.
+        """
+        with self._refresh_lock:
+            self._check()
+
+    def search(self, query: str, top_k: int = None) -> list:
+        """Лучшие разделы по BM25; coverage - доля веса (idf) термов запроса, найденных в разделе"""
+        self._ensure_fresh()
+        sections, postings_by_term, avg_length = self._index
+        terms = set(tokenize(query))
+        if not terms or not sections:
+            return []
+
+        count = len(sections)
+        scores = {}
+        matched = {}
+        idf_total = 0.0
+        for term in terms:
+            postings = postings_by_term.get(term)
+            df = len(postings) if postings else 0
+            idf = math.log(1 + (count - df + 0.5) / (df + 0.5))
+            idf_total += idf
+            for index, tf in postings or ():
+                length = sections[index][3]
+                norm = tf + BM25_K1 * (1 - BM25_B + BM25_B * length / avg_length)
+                scores[index] = scores.get(index, 0.0) + idf * tf * (BM25_K1 + 1) / norm
+                matched[index] = matched.get(index, 0.0) + idf
+
+        # Раздел, совпавший лишь малой частью запроса (одним общим словом), не подходит
+        min_matched = idf_total * Config.KNOWLEDGE_MIN_COVERAGE
+        candidates = (
+            (index, score) for index, score in scores.items()
+            if score >= Config.KNOWLEDGE_MIN_SCORE and matched[index] >= min_matched
+        )
+        top_k = top_k or Config.KNOWLEDGE_TOP_K
+        best = heapq.nlargest(top_k, candidates, key=lambda item: item[1])
+        return [Hit(score, matched[index] / idf_total, *sections[index][:3]) for index, score in best]
+
+    @staticmethod
+    def snippet(hit: Hit, max_chars: int = None) -> str:
+        """Фрагмент раздела для промпта, обрезанный по границе абзаца"""
+        max_chars = max_chars or Config.KNOWLEDGE_SNIPPET_CHARS
+        text = hit.text
+        if len(text) > max_chars:
+            cut = text.rfind("\n", 0, max_chars)
+            text = text[:cut if cut > max_chars // 2 else max_chars].rstrip() + " …"
+        return f"{hit.title}\n{text}"
+
+    @staticmethod
+    def direct_answer(hits: list):
+        """Готовый ответ, если лучший раздел покрывает запрос и заметно опережает следующий"""
+        if not hits:
+            return None
+        best = hits[0]
+        if best.coverage < Config.KNOWLEDGE_DIRECT_CONFIDENCE:
+            return None
+        if len(hits) > 1 and best.score < hits[1].score * Config.KNOWLEDGE_DIRECT_MARGIN:
+            return None
+        return f"{best.title}\n\n{best.text}\n\n📚 Ответ из базы знаний"
+
+    def stats(self) -> dict:
+        sections, postings, _ = self._index
+        return {"files": len(self._files), "sections": len(sections), "terms": len(postings)}
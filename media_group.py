@@ -0,0 +1,37 @@
+import asyncio
+import logging
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Больше 10 вложений в одном альбоме Telegram не присылает
+MAX_GROUP_SIZE = 10
+
+
+class MediaGroupCollector:
+    """Сбор сообщений одного альбома (media_group_id), которые Telegram присылает отдельными обновлениями"""
+
+    def __init__(self, window: float = None):
+        self.window = window or Config.MEDIA_GROUP_WINDOW
+        self._groups = {}  # ключ альбома -> список обновлений
+
+    async def collect(self, key, update):
+        """Первый вызов для альбома ждет, пока части перестанут приходить, и возвращает их все;
+        остальные вызовы возвращают None - их обновления уже переданы первому.
+        """
+        group = self._groups.get(key)
+        if group is not None:
+            group.append(update)
+            return None
+
+        group = self._groups[key] = [update]
+        try:
+            # Окно продлевается, пока приходят новые части
+            size = 0
+            while len(group) != size and len(group) < MAX_GROUP_SIZE:
+                size = len(group)
+                await asyncio.sleep(self.window)
+        finally:
+            del self._groups[key]
+        logger.info(f"Media group {key} collected: {len(group)} items")
+        return group
@@ -0,0 +1,306 @@
+import contextvars
+import json
+import logging
+import queue
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{str(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labels: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(labels.get(name, "") for name in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} counter"
+        for key, value in sorted(self._values.items()):
+            yield f"{self.name}{_format_labels(self.labels, key)} {value}"
+
+    def drain(self) -> dict:
+        with self._lock:
+            values, self._values = self._values, {}
+        return values
+
+    def merge(self, values: dict):
+        with self._lock:
+            for key, value in values.items():
+                self._values[key] = self._values.get(key, 0) + value
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labels: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = buckets
+        self._values = {}  # key -> [счетчики по корзинам..., сумма, количество]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(labels.get(name, "") for name in self.labels)
+        with self._lock:
+            data = self._values.get(key)
+            if data is None:
+                data = self._values[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    data[i] += 1
+                    break
+            data[-2] += value
+            data[-1] += 1
+
+    def render(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} histogram"
+        for key, data in sorted(self._values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, data):
+                cumulative += count
+                le = f'le="{bound}"'
+                yield f"{self.name}_bucket{_format_labels(self.labels, key, le)} {cumulative}"
+            le = 'le="+Inf"'
+            yield f"{self.name}_bucket{_format_labels(self.labels, key, le)} {data[-1]}"
+            yield f"{self.name}_sum{_format_labels(self.labels, key)} {data[-2]}"
+            yield f"{self.name}_count{_format_labels(self.labels, key)} {data[-1]}"
+
+    def drain(self) -> dict:
+        with self._lock:
+            values, self._values = self._values, {}
+        return values
+
+    def merge(self, values: dict):
+        with self._lock:
+            for key, data in values.items():
+                current = self._values.get(key)
+                if current is None:
+                    self._values[key] = list(data)
+                else:
+                    for i, value in enumerate(data):
+                        current[i] += value
+
+
+class Registry:
+    """Набор метрик с выводом в текстовом формате Prometheus"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._gauges = []
+
+    def counter(self, name: str, documentation: str, labels: tuple = ()) -> Counter:
+        return self._metrics.setdefault(name, Counter(name, documentation, labels))
+
+    def histogram(self, name: str, documentation: str, labels: tuple = (), buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+        return self._metrics.setdefault(name, Histogram(name, documentation, labels, buckets))
+
+    def gauge_callback(self, name: str, documentation: str, callback):
+        """Метрика, вычисляемая при каждом запросе: callback() -> [(labels_dict или None, value), ...]"""
+        self._gauges.append((name, documentation, callback))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        for name, documentation, callback in self._gauges:
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} gauge")
+            try:
+                for labels, value in callback():
+                    labels = labels or {}
+                    lines.append(f"{name}{_format_labels(tuple(labels), tuple(labels.values()))} {value}")
+            except Exception as e:
+                logger.error(f"Gauge {name} failed: {e}")
+        return "\n".join(lines) + "\n"
+
+    def drain(self) -> dict:
+        """Снимок накопленных значений со сбросом - для передачи из процесса-воркера"""
+        return {name: metric.drain() for name, metric in self._metrics.items()}
+
+    def merge(self, snapshot: dict):
+        for name, values in snapshot.items():
+            metric = self._metrics.get(name)
+            if metric is not None and values:
+                metric.merge(values)
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "bot_stage_duration_seconds", "Длительность этапов обработки запроса", ("stage",)
+)
+ERRORS = REGISTRY.counter("bot_errors_total", "Ошибки по этапам и типам", ("stage", "type"))
+REQUESTS = REGISTRY.counter("bot_requests_total", "Обработанные запросы по типам", ("kind",))
+DOWNLOAD_BYTES = REGISTRY.counter("bot_download_bytes_total", "Скачано байт из Telegram")
+PAGES_OCR = REGISTRY.counter("bot_pages_ocr_total", "Страниц PDF, распознанных OCR")
+OCR_SKIPPED = REGISTRY.counter("bot_ocr_skipped_total", "Изображений и страниц без текста, пропущенных до OCR")
+EXTRACTED_CHARS = REGISTRY.counter("bot_extracted_chars_total", "Извлечено символов", ("file_type",))
+PROMPT_TOKENS = REGISTRY.histogram(
+    "bot_prompt_tokens", "Оценка размера промпта в токенах", (),
+    (250, 500, 1000, 2000, 4000, 8000, 16000, 32000)
+)
+
+
+class Trace:
+    """Журнал этапов одного запроса"""
+
+    def __init__(self, kind: str, **attrs):
+        self.id = uuid.uuid4().hex[:16]
+        self.kind = kind
+        self.attrs = attrs
+        self.start = time.time()
+        self.stages = []
+
+    def add_stage(self, stage: str, duration: float):
+        self.stages.append({"stage": stage, "seconds": round(duration, 4)})
+
+    def to_json(self, error: str = None) -> str:
+        return json.dumps({
+            "trace_id": self.id,
+            "kind": self.kind,
+            "start": self.start,
+            "seconds": round(time.time() - self.start, 4),
+            "stages": self.stages,
+            "error": error,
+            **self.attrs,
+        }, ensure_ascii=False)
+
+
+_current_trace = contextvars.ContextVar("current_trace", default=None)
+
+
+class _TraceWriter:
+    """Запись трассировок в TRACE_FILE фоновым потоком: цикл событий не ждет диска"""
+
+    def __init__(self):
+        self._queue = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def write(self, path: str, line: str):
+        self._queue.put((path, line))
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._writer_loop, name="trace-writer", daemon=True)
+                    self._thread.start()
+
+    def _writer_loop(self):
+        while True:
+            item = self._queue.get()
+            # Все накопившиеся строки - одной записью на файл
+            batch = {}
+            while item is not None:
+                batch.setdefault(item[0], []).append(item[1])
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            for path, lines in batch.items():
+                try:
+                    with open(path, "a", encoding="utf-8") as f:
+                        f.write("".join(lines))
+                except OSError as e:
+                    logger.error(f"Trace write failed, {len(lines)} records lost: {e}")
+            if item is None:
+                return
+
+    def close(self):
+        """Запись оставшихся трассировок и остановка потока"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join()
+
+
+_trace_writer = _TraceWriter()
+
+
+@contextmanager
+def timed(stage: str):
+    """Замер длительности этапа: гистограмма, счетчик ошибок и запись в трассировку запроса"""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        ERRORS.inc(stage=stage, type=type(e).__name__)
+        raise
+    finally:
+        duration = time.perf_counter() - start
+        STAGE_SECONDS.observe(duration, stage=stage)
+        current = _current_trace.get()
+        if current is not None:
+            current.add_stage(stage, duration)
+
+
+@contextmanager
+def trace(kind: str, **attrs):
+    """Трассировка запроса; при заданном TRACE_FILE пишется строкой JSON"""
+    REQUESTS.inc(kind=kind)
+    current = Trace(kind, **attrs)
+    token = _current_trace.set(current)
+    error = None
+    try:
+        yield current
+    except Exception as e:
+        error = type(e).__name__
+        raise
+    finally:
+        _current_trace.reset(token)
+        if Config.TRACE_FILE:
+            _trace_writer.write(Config.TRACE_FILE, current.to_json(error) + "\n")
+
+
+def current_trace():
+    return _current_trace.get()
+
+
+def close_traces():
+    """Дожидается записи трассировок (при остановке бота)"""
+    _trace_writer.close()
+
+
+async def start_metrics_server(host: str = None, port: int = None):
+    """Локальный HTTP-сервер с эндпоинтом /metrics; None, если порт занят"""
+    from aiohttp import web
+
+    async def handle_metrics(request):
+        return web.Response(text=REGISTRY.render(), content_type="text/plain", charset="utf-8")
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle_metrics)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    host = host or Config.METRICS_HOST
+    port = port or Config.METRICS_PORT
+    try:
+        await web.TCPSite(runner, host, port).start()
+    except OSError as e:
+        # Метрики не стоят отказа бота запускаться
+        logger.warning(f"Metrics server not started on {host}:{port}: {e}")
+        await runner.cleanup()
+        return None
+    logger.info(f"Metrics available at http://{host}:{port}/metrics")
+    return runner
@@ -0,0 +1,201 @@
+import logging
+import statistics
+from collections import namedtuple
+from PIL import Image, ImageChops, ImageFilter
+import pytesseract
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Размер копии для быстрого анализа: порог, наличие текста, наклон
+ANALYSIS_SIZE = 1000
+
+# Окрестность (на копии для анализа), по которой оценивается локальный фон при проверке наличия текста
+LOCAL_BACKGROUND_RADIUS = 8
+
+# Поиск наклона: грубый шаг по всему диапазону, затем уточнение вокруг лучшего угла
+SKEW_COARSE_STEP = 1.0
+SKEW_FINE_STEP = 0.25
+
+# Масштаб в этих пределах не меняется - пересчет не окупается
+SCALE_TOLERANCE = (0.8, 1.25)
+
+PreparedImage = namedtuple("PreparedImage", "image lang scale angle")
+
+
+def to_grayscale(img: Image.Image) -> Image.Image:
+    """Оттенки серого; прозрачный фон заменяется белым"""
+    if img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info):
+        rgba = img.convert("RGBA")
+        background = Image.new("RGBA", rgba.size, (255, 255, 255, 255))
+        img = Image.alpha_composite(background, rgba)
+    return img.convert("L")
+
+
+def otsu_threshold(histogram: list) -> tuple:
+    """Порог Оцу по гистограмме и разделимость классов (0..1): у текста на фоне - близко к 1"""
+    total = sum(histogram)
+    if not total:
+        return 127, 0.0
+    sum_all = sum(i * count for i, count in enumerate(histogram))
+    mean_all = sum_all / total
+    variance_all = sum(count * (i - mean_all) ** 2 for i, count in enumerate(histogram)) / total
+    if not variance_all:
+        return 127, 0.0
+
+    best_threshold, best_variance = 127, 0.0
+    weight_low = 0
+    sum_low = 0
+    for i, count in enumerate(histogram):
+        weight_low += count
+        if weight_low == 0:
+            continue
+        weight_high = total - weight_low
+        if weight_high == 0:
+            break
+        sum_low += i * count
+        mean_low = sum_low / weight_low
+        mean_high = (sum_all - sum_low) / weight_high
+        variance = weight_low * weight_high * (mean_low - mean_high) ** 2 / total ** 2
+        if variance > best_variance:
+            best_threshold, best_variance = i, variance
+    return best_threshold, best_variance / variance_all
+
+
+def ink_mask(gray: Image.Image, threshold: int, dark_text: bool) -> Image.Image:
+    """Маска текста: 255 - «чернила», 0 - фон"""
+    if dark_text:
+        return gray.point(lambda value: 255 if value <= threshold else 0)
+    return gray.point(lambda value: 255 if value > threshold else 0)
+
+
+def row_profile(mask: Image.Image) -> list:
+    """Доля «чернил» в каждой строке пикселей (0..255) - сжатием до ширины 1"""
+    return list(mask.resize((1, mask.height), Image.Resampling.BOX).getdata())
+
+
+def line_heights(profile: list) -> list:
+    """Высоты строк текста - непрерывных полос строк пикселей с «чернилами».
+
+    Порог отсчитывается от фонового уровня, чтобы вертикальные линии таблиц
+    и рамок не сливали все строки в одну полосу.
+    """
+    if not profile:
+        return []
+    ordered = sorted(profile)
+    baseline = ordered[len(ordered) // 10]
+    min_ink = max(baseline + (ordered[-1] - baseline) * 0.05, 3)
+    heights = []
+    run = 0
+    for value in profile + [0]:
+        if value > min_ink:
+            run += 1
+        elif run:
+            if run >= 2:
+                heights.append(run)
+            run = 0
+    return heights
+
+
+def _profile_score(mask: Image.Image, angle: float) -> float:
+    rotated = mask.rotate(angle, resample=Image.Resampling.NEAREST, expand=False) if angle else mask
+    profile = row_profile(rotated)
+    return statistics.pvariance(profile) if len(profile) > 1 else 0.0
+
+
+def estimate_skew(mask: Image.Image, max_angle: float = None) -> float:
+    """Угол наклона строк: при правильном повороте профиль строк самый контрастный (максимум дисперсии)"""
+    max_angle = Config.OCR_MAX_SKEW if max_angle is None else max_angle
+    if max_angle <= 0:
+        return 0.0
+    steps = int(max_angle / SKEW_COARSE_STEP)
+    candidates = [step * SKEW_COARSE_STEP for step in range(-steps, steps + 1)]
+    best = max(candidates, key=lambda angle: _profile_score(mask, angle))
+    fine = [best + step * SKEW_FINE_STEP for step in range(-3, 4) if step]
+    return max([best] + fine, key=lambda angle: _profile_score(mask, angle))
+
+
+def looks_like_text(gray: Image.Image) -> bool:
+    """Консервативная проверка наличия текста на уменьшенной копии.
+
+    Порог локальный: штрихом считается пиксель, который отличается от среднего
+    по окрестности не меньше чем на OCR_MIN_LOCAL_CONTRAST, поэтому неравномерное
+    освещение и градиентный фон не мешают. Нужно OCR_MIN_INK_PIXELS таких
+    пикселей, а не доля площади: одной короткой строки на большом снимке достаточно.
+    Отсеиваются только однотонные и плавные изображения без мелких деталей.
+    """
+    background = gray.filter(ImageFilter.BoxBlur(LOCAL_BACKGROUND_RADIUS))
+    histogram = ImageChops.difference(gray, background).histogram()
+    return sum(histogram[Config.OCR_MIN_LOCAL_CONTRAST:]) >= Config.OCR_MIN_INK_PIXELS
+
+
+def choose_language(img: Image.Image) -> str:
+    """Язык распознавания по письменности (OSD); при неудаче - TESSERACT_LANG"""
+    try:
+        small = img.copy()
+        small.thumbnail((ANALYSIS_SIZE, ANALYSIS_SIZE))
+        osd = pytesseract.image_to_osd(small, output_type=pytesseract.Output.DICT)
+    except Exception as e:
+        logger.debug(f"OSD failed, using {Config.TESSERACT_LANG}: {e}")
+        return Config.TESSERACT_LANG
+    if osd.get("script_conf", 0) < Config.OCR_MIN_SCRIPT_CONFIDENCE:
+        return Config.TESSERACT_LANG
+    # Кириллица почти всегда перемешана с английскими терминами - оставляем оба языка
+    return "eng" if osd.get("script") == "Latin" else Config.TESSERACT_LANG
+
+
+def prepare(img: Image.Image, detect_language: bool = True):
+    """Подготовка изображения к OCR; None - текста на изображении нет.
+
+    Порядок: серый цвет, проверка наличия текста (OCR_SKIP_NO_TEXT) и порог Оцу
+    на уменьшенной копии, выравнивание наклона, обрезка по области текста, масштаб под целевую
+    высоту строки, бинаризация (темный текст на белом).
+    """
+    gray = to_grayscale(img)
+    small = gray.copy()
+    small.thumbnail((ANALYSIS_SIZE, ANALYSIS_SIZE))
+    if Config.OCR_SKIP_NO_TEXT and not looks_like_text(small):
+        return None
+
+    threshold, _ = otsu_threshold(small.histogram())
+    # Текст - меньший из двух классов: светлый текст на темном фоне тоже поддерживается
+    dark_text = sum(small.histogram()[:threshold + 1]) <= small.width * small.height / 2
+    mask = ink_mask(small, threshold, dark_text)
+
+    background = 255 if dark_text else 0
+    angle = estimate_skew(mask)
+    if abs(angle) >= SKEW_FINE_STEP:
+        gray = gray.rotate(angle, resample=Image.Resampling.BICUBIC, expand=True, fillcolor=background)
+
+    # Обрезка по области текста с полями
+    full_mask = ink_mask(gray, threshold, dark_text)
+    bbox = full_mask.getbbox()
+    if bbox:
+        margin = max(10, min(gray.size) // 50)
+        bbox = (max(bbox[0] - margin, 0), max(bbox[1] - margin, 0),
+                min(bbox[2] + margin, gray.width), min(bbox[3] + margin, gray.height))
+        gray = gray.crop(bbox)
+        full_mask = full_mask.crop(bbox)
+
+    # Масштаб по медианной высоте строки
+    scale = 1.0
+    heights = [h for h in line_heights(row_profile(full_mask)) if 4 <= h <= gray.height / 3]
+    if heights:
+        scale = Config.OCR_TARGET_LINE_HEIGHT / statistics.median(heights)
+    largest = max(gray.size) * scale
+    if largest > Config.OCR_MAX_SIDE:
+        scale = Config.OCR_MAX_SIDE / max(gray.size)
+    if not SCALE_TOLERANCE[0] <= scale <= SCALE_TOLERANCE[1]:
+        scale = min(max(scale, 0.25), 4.0)
+        size = (max(int(gray.width * scale), 1), max(int(gray.height * scale), 1))
+        gray = gray.resize(size, Image.Resampling.LANCZOS if scale < 1 else Image.Resampling.BICUBIC)
+    else:
+        scale = 1.0
+
+    if Config.OCR_BINARIZE:
+        gray = gray.point(lambda value: 0 if (value <= threshold) == dark_text else 255)
+    elif not dark_text:
+        gray = gray.point(lambda value: 255 - value)
+
+    lang = choose_language(gray) if detect_language and Config.OCR_DETECT_LANGUAGE else Config.TESSERACT_LANG
+    return PreparedImage(gray, lang, scale, angle)
@@ -0,0 +1,62 @@
+import logging
+import re
+from config import Config
+from prompts import compact_user_prompt
+from session_store import ROLE_USER
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+# Служебные токены разметки на каждое сообщение
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Быстрая локальная оценка числа токенов: слово - примерно токен на 4 символа, знак - токен"""
+    tokens = 0
+    for match in _TOKEN_RE.finditer(text):
+        tokens += (len(match.group()) + 3) // 4
+    return tokens + MESSAGE_OVERHEAD_TOKENS
+
+
+class PromptBuilder:
+    """Сборка промпта в пределах бюджета токенов со сжатием старой истории"""
+
+    def __init__(self, token_budget: int = None, verbatim_messages: int = None):
+        self.token_budget = token_budget or Config.PROMPT_TOKEN_BUDGET
+        self.verbatim_messages = Config.PROMPT_VERBATIM_MESSAGES if verbatim_messages is None else verbatim_messages
+
+    def _compact(self, role: str, content: str) -> str:
+        return compact_user_prompt(content) if role == ROLE_USER else content
+
+    def build(self, system_prompt: str, history: list, user_prompt: str):
+        """Список (role, content) для истории и оценка размера всего промпта в токенах"""
+        fixed_tokens = estimate_tokens(system_prompt) + estimate_tokens(user_prompt)
+
+        # Последние сообщения - дословно, у более старых вложения заменяются ссылками
+        split = max(len(history) - self.verbatim_messages, 0)
+        messages = [(role, self._compact(role, content)) for role, content in history[:split]]
+        messages.extend(history[split:])
+        sizes = [estimate_tokens(content) for _, content in messages]
+
+        # Не уложились - сжимаем и дословную часть
+        if fixed_tokens + sum(sizes) > self.token_budget:
+            for i in range(split, len(messages)):
+                role, content = messages[i]
+                messages[i] = (role, self._compact(role, content))
+                sizes[i] = estimate_tokens(messages[i][1])
+
+        # Все еще не уложились - отбрасываем самые старые пары вопрос-ответ
+        start = 0
+        while start < len(messages) and fixed_tokens + sum(sizes[start:]) > self.token_budget:
+            start += 2
+        messages = messages[start:]
+        total_tokens = fixed_tokens + sum(sizes[start:])
+
+        raw_tokens = fixed_tokens + sum(estimate_tokens(content) for _, content in history)
+        logger.info(
+            f"Prompt: {len(messages) + 2} messages, ~{total_tokens} tokens "
+            f"(uncompacted ~{raw_tokens}, budget {self.token_budget})"
+        )
+        return messages, total_tokens
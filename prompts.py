@@ -1,3 +1,5 @@
+import re
+
 
 MICROSOFT_OFFICE_PROMPT = """
 Ты — бот-ассистент преподавателя, уоторый расскзывет о возможностях Microsoft Office студентам менеджерам. Твоя цель — помочь ответить на конкретный вопрос по проблеме котоаря возникла у студента. 
@@ -97,12 +99,35 @@ MICROSOFT_OFFICE_PROMPT = """
 Не помогай с вредоносными запросами!
 """
 
-def format_user_prompt(user_message: str, extracted_text: str = None, file_type: str = None) -> str:
+ATTACHMENT_RE = re.compile(r"\n\nПользователь прикрепил (\S+) файл\. Содержимое:\n(.*)\Z", re.DOTALL)
+
+def format_user_prompt(user_message: str, extracted_text: str = None, file_type: str = None,
+                       snippets: list = None) -> str:
     base_prompt = f"Пользователь спрашивает: {user_message}"
     
+    # Справка из базы знаний - до вложения, которое должно оставаться в конце промпта
+    if snippets:
+        base_prompt += "\n\nСправка из базы знаний (используй, если относится к вопросу):"
+        for number, snippet in enumerate(snippets, 1):
+            base_prompt += f"\n[{number}] {snippet}"
+    
     if extracted_text and file_type:
         base_prompt += f"\n\nПользователь прикрепил {file_type} файл. Содержимое:\n{extracted_text}"
     
     return base_prompt
 
+def compact_user_prompt(user_prompt: str, preview_chars: int = 150) -> str:
+    """Замена содержимого вложения короткой ссылкой на него (для старых сообщений истории)"""
+    match = ATTACHMENT_RE.search(user_prompt)
+    if not match:
+        return user_prompt
+    
+    file_type, content = match.groups()
+    preview = " ".join(content[:preview_chars].split())
+    return (
+        user_prompt[:match.start()]
+        + f"\n\nПользователь прикрепил {file_type} файл "
+        + f"(содержимое {len(content)} симв. опущено, начало: «{preview}…»)"
+    )
+
 
@@ -0,0 +1,92 @@
+import hashlib
+import logging
+import re
+import time
+from collections import OrderedDict
+from config import Config
+from prompts import MICROSOFT_OFFICE_PROMPT
+
+logger = logging.getLogger(__name__)
+
+# Ответы, полученные с другим системным промптом, не переиспользуются
+PROMPT_HASH = hashlib.sha256(MICROSOFT_OFFICE_PROMPT.encode("utf-8")).hexdigest()[:16]
+
+# Версия нормализации: при изменении правил старые ключи из storage не совпадут
+KEY_VERSION = "2"
+
+# Символы формул и ссылок не отбрасываются: "=A1/B1" и "=A1*B1" - разные вопросы
+_PUNCTUATION_RE = re.compile(r"[^\w\s=+\-*/;:,()<>$!]+")
+_TRAILING_RE = re.compile(r"[\s?!.…]+$")
+_SPACES_RE = re.compile(r"\s+")
+
+
+def normalize_question(question: str) -> str:
+    """Приведение вопроса к каноническому виду: регистр, ё, пунктуация в конце и между словами, пробелы"""
+    text = question.lower().replace("ё", "е")
+    text = _TRAILING_RE.sub("", text)
+    text = _PUNCTUATION_RE.sub(" ", text)
+    return _SPACES_RE.sub(" ", text).strip()
+
+
+class ResponseCache:
+    """Кэш ответов на первые вопросы диалога без вложений (LRU + TTL, опционально в storage.Storage)"""
+
+    def __init__(self, max_entries: int = None, ttl: float = None, storage=None):
+        self.max_entries = max_entries or Config.RESPONSE_CACHE_SIZE
+        self.ttl = ttl or Config.RESPONSE_CACHE_TTL
+        self.storage = storage
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(question: str) -> str:
+        normalized = normalize_question(question)
+        return hashlib.sha256(f"{KEY_VERSION}\n{PROMPT_HASH}\n{normalized}".encode("utf-8")).hexdigest()
+
+    def get(self, question: str):
+        """Ответ из кэша или None"""
+        key = self.make_key(question)
+        now = time.time()
+
+        entry = self._entries.get(key)
+        if entry is None and self.storage is not None:
+            entry = self.storage.get_response(key)
+            if entry is not None:
+                self._store(key, entry)
+
+        if entry is None or entry[1] < now:
+            if entry is not None:
+                self._entries.pop(key, None)
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, question: str, answer: str):
+        key = self.make_key(question)
+        entry = (answer, time.time() + self.ttl)
+        self._store(key, entry)
+        if self.storage is not None:
+            self.storage.put_response(key, *entry)
+
+    def _store(self, key: str, entry: tuple):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hit_rate, 3),
+            "entries": len(self._entries),
+        }
@@ -0,0 +1,207 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+LANE_TEXT = "text"
+LANE_OCR = "ocr"
+
+
+class RateLimitedError(Exception):
+    """Пользователь превысил лимит запросов"""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Rate limited, retry after {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Классическое ведро токенов: capacity запросов подряд, далее rate в секунду"""
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def take(self) -> float:
+        """Списывает токен; возвращает 0 или время ожидания следующего токена"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class Lane:
+    """Очередь одного класса задач с круговым обходом чатов.
+
+    Задачи одного чата выполняются строго по очереди: чат, у которого задача уже
+    выполняется (в любой очереди планировщика - active общий), при обходе пропускается.
+    Иначе два быстрых сообщения читали бы одну и ту же историю, а ответы на них
+    записывались бы в историю в порядке завершения.
+    """
+
+    def __init__(self, name: str, workers: int, active: set = None):
+        self.name = name
+        self.workers = workers
+        self.queues = OrderedDict()  # chat_id -> deque задач, порядок - очередь обхода
+        self.active = active if active is not None else set()  # чаты с выполняющейся задачей
+        self.depth = 0
+        self.running = 0
+        self.wakeup = asyncio.Condition()
+        self.tasks = []
+        # Метрики
+        self.completed = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def position(self, chat_id) -> int:
+        """Сколько задач будет выполнено раньше новой задачи этого чата при круговом обходе"""
+        own = len(self.queues.get(chat_id, ()))
+        return own + sum(min(len(q), own + 1) for key, q in self.queues.items() if key != chat_id)
+
+    def ready(self) -> bool:
+        """Есть ли задача чата, у которого сейчас ничего не выполняется"""
+        return any(chat_id not in self.active for chat_id in self.queues)
+
+    def pop(self):
+        """Следующая задача: первый свободный чат в обходе отдает одну задачу и уходит в конец.
+
+        Возвращает (chat_id, задача); чат остается занятым до FairScheduler._release.
+        """
+        chat_id = next(chat_id for chat_id in self.queues if chat_id not in self.active)
+        queue = self.queues[chat_id]
+        job = queue.popleft()
+        if queue:
+            self.queues.move_to_end(chat_id)
+        else:
+            del self.queues[chat_id]
+        self.depth -= 1
+        self.active.add(chat_id)
+        return chat_id, job
+
+
+class FairScheduler:
+    """Планировщик задач LLM и OCR: лимиты на пользователя и справедливая очередь между чатами"""
+
+    def __init__(self, text_workers: int = None, ocr_workers: int = None):
+        # Занятые чаты общие для всех очередей: вопрос не обгоняет документ из того же чата
+        self.active = set()
+        self.lanes = {
+            LANE_TEXT: Lane(LANE_TEXT, text_workers or Config.SCHEDULER_TEXT_WORKERS, self.active),
+            LANE_OCR: Lane(LANE_OCR, ocr_workers or Config.SCHEDULER_OCR_WORKERS, self.active),
+        }
+        self._buckets = {}
+        self.rejected = 0
+
+    def _bucket(self, user_id, lane: str) -> TokenBucket:
+        key = (user_id, lane)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) > 10000:
+                self._prune_buckets()
+            if lane == LANE_OCR:
+                bucket = TokenBucket(Config.RATE_LIMIT_OCR_PER_MINUTE / 60, Config.RATE_LIMIT_OCR_BURST)
+            else:
+                bucket = TokenBucket(Config.RATE_LIMIT_TEXT_PER_MINUTE / 60, Config.RATE_LIMIT_TEXT_BURST)
+            self._buckets[key] = bucket
+        return bucket
+
+    def _prune_buckets(self):
+        """Удаление ведер, которые уже полностью восстановились"""
+        now = time.monotonic()
+        for key, bucket in list(self._buckets.items()):
+            if bucket.tokens + (now - bucket.updated) * bucket.rate >= bucket.capacity:
+                del self._buckets[key]
+
+    def _start(self, lane: Lane):
+        if not lane.tasks:
+            lane.tasks = [asyncio.create_task(self._worker(lane)) for _ in range(lane.workers)]
+
+    async def _release(self, chat_id):
+        """Чат снова свободен: его следующая задача может быть в любой очереди"""
+        self.active.discard(chat_id)
+        for lane in self.lanes.values():
+            async with lane.wakeup:
+                lane.wakeup.notify()
+
+    async def _worker(self, lane: Lane):
+        while True:
+            async with lane.wakeup:
+                await lane.wakeup.wait_for(lane.ready)
+                chat_id, (factory, future, enqueued_at) = lane.pop()
+
+            try:
+                waited = time.monotonic() - enqueued_at
+                lane.wait_total += waited
+                lane.wait_max = max(lane.wait_max, waited)
+                if future.cancelled():
+                    continue
+                lane.running += 1
+                try:
+                    result = await factory()
+                    if not future.cancelled():
+                        future.set_result(result)
+                except asyncio.CancelledError:
+                    future.cancel()
+                    raise
+                except Exception as e:
+                    if not future.cancelled():
+                        future.set_exception(e)
+                finally:
+                    lane.running -= 1
+                    lane.completed += 1
+            finally:
+                await self._release(chat_id)
+
+    async def run(self, lane_name: str, chat_id, user_id, factory, on_queued=None):
+        """Выполнение factory() в очереди lane_name.
+
+        on_queued(position) вызывается, если перед задачей в очереди уже есть другие.
+        """
+        lane = self.lanes[lane_name]
+        retry_after = self._bucket(user_id, lane_name).take()
+        if retry_after:
+            self.rejected += 1
+            raise RateLimitedError(retry_after)
+
+        self._start(lane)
+        position = lane.position(chat_id)
+        busy = lane.running + lane.depth >= lane.workers
+        future = asyncio.get_running_loop().create_future()
+
+        async with lane.wakeup:
+            lane.queues.setdefault(chat_id, deque()).append((factory, future, time.monotonic()))
+            lane.depth += 1
+            lane.wakeup.notify()
+
+        if busy and on_queued is not None:
+            await on_queued(position + 1)
+        return await future
+
+    def stats(self) -> dict:
+        return {
+            name: {
+                "depth": lane.depth,
+                "running": lane.running,
+                "chats": len(lane.queues),
+                "completed": lane.completed,
+                "avg_wait": round(lane.wait_total / lane.completed, 3) if lane.completed else 0.0,
+                "max_wait": round(lane.wait_max, 3),
+            }
+            for name, lane in self.lanes.items()
+        } | {"rejected": self.rejected}
+
+    async def shutdown(self):
+        for lane in self.lanes.values():
+            for task in lane.tasks:
+                task.cancel()
+            await asyncio.gather(*lane.tasks, return_exceptions=True)
+            lane.tasks = []
@@ -0,0 +1,162 @@
+import logging
+import sys
+import time
+from collections import OrderedDict, deque
+from config import Config
+from prompts import compact_user_prompt
+
+logger = logging.getLogger(__name__)
+
+# Роли хранятся короткими строками, а не объектами Messages
+ROLE_USER = "user"
+ROLE_ASSISTANT = "assistant"
+
+# Накладные расходы на кортеж (role, content) в deque
+_MESSAGE_OVERHEAD = sys.getsizeof(("", "")) + 8
+
+
+def _message_size(content: str) -> int:
+    return sys.getsizeof(content) + _MESSAGE_OVERHEAD
+
+
+class Session:
+    """История одного чата: последние сообщения в виде кортежей (role, content).
+
+    Сообщения удаляются парами вопрос-ответ: история всегда начинается с вопроса
+    пользователя, на чем основано отбрасывание пар в PromptBuilder.
+    """
+    __slots__ = ("max_messages", "messages", "size", "last_access")
+
+    def __init__(self, max_messages: int):
+        self.max_messages = max_messages
+        self.messages = deque()
+        self.size = 0
+        self.last_access = time.monotonic()
+
+    def append(self, role: str, content: str) -> int:
+        """Добавление сообщения; возвращает изменение размера в байтах"""
+        freed = 0
+        while self.messages and len(self.messages) >= self.max_messages:
+            freed += self.pop_oldest()
+        self.messages.append((role, content))
+        added = _message_size(content)
+        self.size += added
+        return added - freed
+
+    def pop_oldest(self) -> int:
+        """Удаление самой старой пары вопрос-ответ; возвращает освобожденный размер"""
+        freed = 0
+        while self.messages:
+            _, content = self.messages.popleft()
+            freed += _message_size(content)
+            # Удаляем до следующего вопроса пользователя (ответ и потерянные ответы без вопроса)
+            if not self.messages or self.messages[0][0] == ROLE_USER:
+                break
+        self.size -= freed
+        return freed
+
+
+class SessionStore:
+    """Истории диалогов по chat_id с общим лимитом памяти, LRU и TTL вытеснением.
+
+    С хранилищем (storage.Storage) память служит кэшем: история чата подгружается
+    из базы при первом обращении, а изменения сохраняются в фоне. В базу вопросы
+    пользователя попадают без содержимого вложений - только со ссылкой на файл.
+    """
+
+    def __init__(self, max_messages: int = None, max_bytes: int = None, ttl: float = None, storage=None):
+        self.max_messages = max_messages or Config.HISTORY_MAX_MESSAGES
+        self.max_bytes = max_bytes or Config.SESSION_STORE_MAX_BYTES
+        self.ttl = ttl or Config.SESSION_TTL
+        self.storage = storage
+        self._sessions = OrderedDict()
+        self._total_size = 0
+        self.evicted = 0
+        self.loaded = 0
+
+    def _expire(self):
+        """Удаление сессий, неактивных дольше TTL (они в начале OrderedDict)"""
+        deadline = time.monotonic() - self.ttl
+        while self._sessions:
+            chat_id, session = next(iter(self._sessions.items()))
+            if session.last_access > deadline:
+                break
+            self._drop(chat_id)
+
+    def _drop(self, chat_id):
+        session = self._sessions.pop(chat_id)
+        self._total_size -= session.size
+        self.evicted += 1
+
+    def _load(self, chat_id):
+        """История чата из хранилища, если она там есть и не устарела"""
+        stored = self.storage.load_session(chat_id) if self.storage is not None else None
+        if stored is None:
+            return None
+        messages, updated_at = stored
+        if not messages or time.time() - updated_at > self.ttl:
+            return None
+        session = Session(self.max_messages)
+        for role, content in messages:
+            session.append(role, content)
+        self._total_size += session.size
+        self.loaded += 1
+        return session
+
+    def _touch(self, chat_id, create: bool = False):
+        self._expire()
+        session = self._sessions.get(chat_id)
+        if session is None:
+            session = self._load(chat_id)
+            if session is None:
+                if not create:
+                    return None
+                session = Session(self.max_messages)
+            self._sessions[chat_id] = session
+        else:
+            self._sessions.move_to_end(chat_id)
+        session.last_access = time.monotonic()
+        return session
+
+    def get_history(self, chat_id) -> list:
+        """Список (role, content) для чата в хронологическом порядке"""
+        session = self._touch(chat_id)
+        return list(session.messages) if session else []
+
+    def append(self, chat_id, role: str, content: str):
+        """Добавление сообщения с соблюдением лимита памяти"""
+        session = self._touch(chat_id, create=True)
+        self._total_size += session.append(role, content)
+
+        # Вытесняем давно не использованные сессии, затем - старые пары текущей (последняя остается)
+        while self._total_size > self.max_bytes and len(self._sessions) > 1:
+            self._drop(next(iter(self._sessions)))
+        while self._total_size > self.max_bytes and len(session.messages) > 2:
+            self._total_size -= session.pop_oldest()
+        if self.storage is not None:
+            self.storage.save_session(chat_id, [
+                (role, compact_user_prompt(content) if role == ROLE_USER else content)
+                for role, content in session.messages
+            ])
+
+    def clear(self, chat_id):
+        """Очистка истории одного чата"""
+        if chat_id in self._sessions:
+            session = self._sessions.pop(chat_id)
+            self._total_size -= session.size
+        if self.storage is not None:
+            self.storage.delete_session(chat_id)
+
+    def memory_usage(self) -> int:
+        """Оценка памяти, занятой историями, в байтах"""
+        return self._total_size
+
+    def stats(self) -> dict:
+        return {
+            "sessions": len(self._sessions),
+            "messages": sum(len(s.messages) for s in self._sessions.values()),
+            "bytes": self._total_size,
+            "max_bytes": self.max_bytes,
+            "evicted": self.evicted,
+            "loaded": self.loaded,
+        }
@@ -0,0 +1,145 @@
+from collections import deque
+from datetime import date, datetime, time
+
+# Сколько уникальных текстовых значений отслеживать на столбец
+MAX_DISTINCT = 1000
+
+
+def format_cell(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, float):
+        return f"{value:.15g}"
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    return str(value)
+
+
+def format_row(row) -> str:
+    """Строка таблицы через табуляцию без пустых ячеек в конце"""
+    cells = [format_cell(value) for value in row]
+    while cells and not cells[-1].strip():
+        cells.pop()
+    return "\t".join(cells)
+
+
+class ColumnStats:
+    """Потоковая статистика по одному столбцу за O(1) памяти (кроме ограниченного множества значений)"""
+    __slots__ = ("name", "empty", "numbers", "texts", "dates", "bools",
+                 "num_min", "num_max", "num_sum", "date_min", "date_max", "distinct", "example")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.empty = self.numbers = self.texts = self.dates = self.bools = 0
+        self.num_min = self.num_max = None
+        self.num_sum = 0.0
+        self.date_min = self.date_max = None
+        self.distinct = set()
+        self.example = None
+
+    def add(self, value):
+        if value is None or (isinstance(value, str) and not value.strip()):
+            self.empty += 1
+        elif isinstance(value, bool):
+            self.bools += 1
+        elif isinstance(value, (int, float)):
+            self.numbers += 1
+            self.num_sum += value
+            self.num_min = value if self.num_min is None else min(self.num_min, value)
+            self.num_max = value if self.num_max is None else max(self.num_max, value)
+        elif isinstance(value, (datetime, date, time)):
+            self.dates += 1
+            try:
+                self.date_min = value if self.date_min is None else min(self.date_min, value)
+                self.date_max = value if self.date_max is None else max(self.date_max, value)
+            except TypeError:
+                pass  # дата вперемешку со временем - диапазон по первому типу
+        else:
+            self.texts += 1
+            if self.example is None:
+                self.example = str(value)[:50]
+            if len(self.distinct) <= MAX_DISTINCT:
+                self.distinct.add(value)
+
+    def describe(self) -> str:
+        parts = []
+        if self.numbers:
+            mean = self.num_sum / self.numbers
+            parts.append(f"чисел {self.numbers}: мин {format_cell(self.num_min)}, "
+                         f"макс {format_cell(self.num_max)}, среднее {mean:.4g}")
+        if self.dates:
+            parts.append(f"дат {self.dates}: с {format_cell(self.date_min)} по {format_cell(self.date_max)}")
+        if self.texts:
+            distinct = f"{MAX_DISTINCT}+" if len(self.distinct) > MAX_DISTINCT else str(len(self.distinct))
+            parts.append(f"текст {self.texts}: уникальных {distinct}, пример \"{self.example}\"")
+        if self.bools:
+            parts.append(f"логических {self.bools}")
+        if self.empty:
+            parts.append(f"пустых {self.empty}")
+        return f"• {self.name}: " + "; ".join(parts or ["нет данных"])
+
+
+class SheetSummary:
+    """Сводка большого листа: заголовки, размеры, первые и последние строки, статистика столбцов"""
+
+    def __init__(self, name: str, head_rows: list, sample_rows: int):
+        self.name = name
+        self.sample_rows = sample_rows
+        self.header = None
+        self.columns = []
+        self.rows = 0
+        self.width = 0
+        self.head = []
+        self.tail = deque(maxlen=sample_rows)
+
+        first = head_rows[0]
+        if all(isinstance(v, str) for v in first if v is not None):
+            self.header = first
+            head_rows = head_rows[1:]
+        for row in head_rows:
+            self.add(row)
+
+    def _column(self, index: int) -> ColumnStats:
+        while len(self.columns) <= index:
+            i = len(self.columns)
+            name = None
+            if self.header and i < len(self.header) and self.header[i] is not None:
+                name = str(self.header[i]).strip()
+            self.columns.append(ColumnStats(name or f"Столбец {i + 1}"))
+        return self.columns[index]
+
+    def add(self, row):
+        self.rows += 1
+        # Хвостовые пустые ячейки не расширяют лист
+        width = len(row)
+        while width and row[width - 1] is None:
+            width -= 1
+        self.width = max(self.width, width)
+        for i in range(width):
+            self._column(i).add(row[i])
+        if len(self.head) < self.sample_rows:
+            self.head.append(row)
+        else:
+            self.tail.append(row)
+
+    def lines(self):
+        """Текст сводки построчно"""
+        # Столбцы, появившиеся позже, не учитывали пустые значения в ранних строках
+        for column in self.columns:
+            column.empty += self.rows - (column.empty + column.numbers + column.texts
+                                         + column.dates + column.bools)
+
+        yield (f"\n📊 Лист: {self.name} (сводка: {self.rows} строк данных × "
+               f"{self.width} столбцов)")
+        if self.header:
+            yield "Заголовки: " + format_row(self.header)
+        yield f"Первые {len(self.head)} строк:"
+        for row in self.head:
+            yield format_row(row)
+        if self.tail:
+            yield f"Последние {len(self.tail)} строк:"
+            for row in self.tail:
+                yield format_row(row)
+        yield "Столбцы:"
+        for column in self.columns:
+            yield column.describe()
@@ -0,0 +1,114 @@
+import importlib.abc
+import logging
+import sys
+import time
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Сколько самых медленных пакетов показывать в отчете
+TOP_IMPORTS = 10
+
+# Отсчет - от импорта этого модуля: bot.py импортирует его первым
+STARTED = time.perf_counter()
+
+_marks = []  # (этап, время окончания)
+
+
+class _TimedLoader(importlib.abc.Loader):
+    """Обертка загрузчика: время выполнения модуля без вложенных импортов"""
+
+    def __init__(self, loader, profiler):
+        self._loader = loader
+        self._profiler = profiler
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        self._profiler.enter()
+        try:
+            self._loader.exec_module(module)
+        finally:
+            self._profiler.leave(module.__name__)
+
+    def __getattr__(self, name):
+        # get_source, get_resource_reader и прочее - у исходного загрузчика
+        return getattr(self._loader, name)
+
+
+class ImportProfiler(importlib.abc.MetaPathFinder):
+    """Учет времени импорта по пакетам верхнего уровня (аналог python -X importtime)"""
+
+    def __init__(self):
+        self.self_time = {}  # модуль -> собственное время импорта, сек
+        self._stack = []  # [начало, время вложенных импортов]
+
+    def find_spec(self, fullname, path=None, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                break
+        else:
+            return None
+        if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+            spec.loader = _TimedLoader(spec.loader, self)
+        return spec
+
+    def enter(self):
+        self._stack.append([time.perf_counter(), 0.0])
+
+    def leave(self, name: str):
+        start, nested = self._stack.pop()
+        total = time.perf_counter() - start
+        self.self_time[name] = total - nested
+        if self._stack:
+            self._stack[-1][1] += total
+
+    def by_package(self) -> list:
+        """[(пакет, секунды)] по убыванию"""
+        packages = {}
+        for name, seconds in self.self_time.items():
+            package = name.partition(".")[0]
+            packages[package] = packages.get(package, 0.0) + seconds
+        return sorted(packages.items(), key=lambda item: item[1], reverse=True)
+
+
+profiler = None
+if Config.STARTUP_PROFILE_IMPORTS:
+    profiler = ImportProfiler()
+    sys.meta_path.insert(0, profiler)
+
+
+def mark(phase: str):
+    """Окончание этапа запуска: imports, init, application, ready"""
+    _marks.append((phase, time.perf_counter()))
+    if phase == "ready" and profiler in sys.meta_path:
+        # Дальше импорты - ленивые, их время учитывается в метриках этапа import
+        sys.meta_path.remove(profiler)
+
+
+def phases() -> list:
+    """[(этап, длительность)] в порядке выполнения; total - от начала до последнего этапа"""
+    result = []
+    previous = STARTED
+    for phase, moment in _marks:
+        result.append((phase, moment - previous))
+        previous = moment
+    if _marks:
+        result.append(("total", _marks[-1][1] - STARTED))
+    return result
+
+
+def imports(top: int = TOP_IMPORTS) -> list:
+    return profiler.by_package()[:top] if profiler is not None else []
+
+
+def report() -> str:
+    text = "Startup: " + ", ".join(f"{phase} {seconds:.2f}s" for phase, seconds in phases())
+    slowest = imports()
+    if slowest:
+        text += "; slowest imports: " + ", ".join(f"{name} {seconds:.3f}s" for name, seconds in slowest)
+    return text
@@ -0,0 +1,182 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Удаление устаревших записей - не чаще раза в CLEANUP_INTERVAL секунд
+CLEANUP_INTERVAL = 3600
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS sessions "
+    "(chat_id PRIMARY KEY, messages TEXT NOT NULL, updated_at REAL NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS sessions_updated_at ON sessions (updated_at)",
+    "CREATE TABLE IF NOT EXISTS responses "
+    "(key TEXT PRIMARY KEY, answer TEXT NOT NULL, expires_at REAL NOT NULL)",
+)
+
+_SESSION = "session"
+_RESPONSE = "response"
+
+
+class Storage:
+    """Хранилище историй диалогов и кэша ответов в sqlite (WAL) с отложенной пакетной записью.
+
+    Запись только ставится в очередь: фоновый поток раз в STORAGE_FLUSH_INTERVAL секунд
+    (или при накоплении STORAGE_BATCH_SIZE изменений) сохраняет их одной транзакцией.
+    Повторные изменения одной записи до сброса схлопываются. Чтение сначала смотрит
+    в очередь, затем в базу, поэтому всегда видит последнее записанное значение.
+    """
+
+    def __init__(self, db_path: str = None, flush_interval: float = None, batch_size: int = None):
+        self.db_path = db_path or Config.STORAGE_DB
+        self.flush_interval = flush_interval or Config.STORAGE_FLUSH_INTERVAL
+        self.batch_size = batch_size or Config.STORAGE_BATCH_SIZE
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+
+        # Соединение для чтения - в потоке бота, для записи - в фоновом потоке
+        self._reader = self._connect()
+        with self._reader:
+            for statement in _SCHEMA:
+                self._reader.execute(statement)
+
+        self._pending = {}  # (вид, ключ) -> значение или None для удаления
+        self._writing = {}  # пакет, который сейчас записывается
+        self._lock = threading.Lock()
+        self._flushed = threading.Condition(self._lock)
+        self._wakeup = threading.Event()
+        self._closed = False
+        self.flushes = 0
+        self.written = 0
+        self._thread = threading.Thread(target=self._writer_loop, name="storage-writer", daemon=True)
+        self._thread.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.db_path, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        # В режиме WAL NORMAL не теряет целостность, fsync - только на контрольных точках
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    def _enqueue(self, kind: str, key, value):
+        with self._lock:
+            self._pending[(kind, key)] = value
+            full = len(self._pending) >= self.batch_size
+        if full:
+            self._wakeup.set()
+
+    def _queued(self, kind: str, key):
+        """(найдено, значение) из еще не записанных изменений"""
+        with self._lock:
+            for batch in (self._pending, self._writing):
+                if (kind, key) in batch:
+                    return True, batch[(kind, key)]
+        return False, None
+
+    def load_session(self, chat_id):
+        """(сообщения, время обновления) или None"""
+        found, value = self._queued(_SESSION, chat_id)
+        if not found:
+            value = self._reader.execute(
+                "SELECT messages, updated_at FROM sessions WHERE chat_id = ?", (chat_id,)
+            ).fetchone()
+        if value is None:
+            return None
+        messages, updated_at = value
+        return [tuple(message) for message in json.loads(messages)], updated_at
+
+    def save_session(self, chat_id, messages):
+        self._enqueue(_SESSION, chat_id, (json.dumps(list(messages), ensure_ascii=False), time.time()))
+
+    def delete_session(self, chat_id):
+        self._enqueue(_SESSION, chat_id, None)
+
+    def get_response(self, key: str):
+        """(ответ, срок годности) или None"""
+        found, value = self._queued(_RESPONSE, key)
+        if found:
+            return value
+        return self._reader.execute(
+            "SELECT answer, expires_at FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+
+    def put_response(self, key: str, answer: str, expires_at: float):
+        self._enqueue(_RESPONSE, key, (answer, expires_at))
+
+    def _write(self, connection: sqlite3.Connection, batch: dict):
+        with connection:
+            for (kind, key), value in batch.items():
+                if kind == _SESSION:
+                    if value is None:
+                        connection.execute("DELETE FROM sessions WHERE chat_id = ?", (key,))
+                    else:
+                        connection.execute(
+                            "INSERT OR REPLACE INTO sessions (chat_id, messages, updated_at) VALUES (?, ?, ?)",
+                            (key, *value)
+                        )
+                else:
+                    connection.execute(
+                        "INSERT OR REPLACE INTO responses (key, answer, expires_at) VALUES (?, ?, ?)",
+                        (key, *value)
+                    )
+
+    def _cleanup(self, connection: sqlite3.Connection):
+        now = time.time()
+        with connection:
+            sessions = connection.execute(
+                "DELETE FROM sessions WHERE updated_at < ?", (now - Config.SESSION_TTL,)
+            ).rowcount
+            responses = connection.execute("DELETE FROM responses WHERE expires_at < ?", (now,)).rowcount
+        if sessions or responses:
+            logger.info(f"Storage cleanup: {sessions} sessions, {responses} cached responses expired")
+
+    def _writer_loop(self):
+        connection = self._connect()
+        last_cleanup = 0.0
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            with self._lock:
+                self._writing, self._pending = self._pending, {}
+                closing = self._closed
+            try:
+                if self._writing:
+                    self._write(connection, self._writing)
+                    self.flushes += 1
+                    self.written += len(self._writing)
+                if time.monotonic() - last_cleanup >= CLEANUP_INTERVAL:
+                    self._cleanup(connection)
+                    last_cleanup = time.monotonic()
+            except sqlite3.Error as e:
+                logger.error(f"Storage write failed, {len(self._writing)} changes lost: {e}")
+            with self._lock:
+                self._writing = {}
+                self._flushed.notify_all()
+            if closing:
+                break
+        connection.close()
+
+    def flush(self, timeout: float = None):
+        """Ожидание записи всех накопленных изменений"""
+        self._wakeup.set()
+        with self._lock:
+            self._flushed.wait_for(lambda: not self._pending and not self._writing, timeout)
+
+    def close(self):
+        """Запись оставшихся изменений и закрытие базы"""
+        if self._closed:
+            return
+        with self._lock:
+            self._closed = True
+        self._wakeup.set()
+        self._thread.join()
+        self._reader.close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            pending = len(self._pending) + len(self._writing)
+        return {"pending": pending, "flushes": self.flushes, "written": self.written}
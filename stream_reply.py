@@ -0,0 +1,128 @@
+import asyncio
+import logging
+import time
+from telegram import Message
+from telegram.error import BadRequest, RetryAfter
+from config import Config
+from scheduler import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+TELEGRAM_MESSAGE_LIMIT = 4096
+
+# Общий лимит правок всех потоковых ответов: Telegram ограничивает частоту запросов бота целиком
+EDIT_LIMITER = TokenBucket(Config.STREAM_EDITS_PER_SECOND, Config.STREAM_EDITS_PER_SECOND)
+
+
+def _split_point(text: str, limit: int) -> int:
+    """Место разрыва не дальше limit: по абзацу, строке или пробелу"""
+    for separator in ("\n\n", "\n", " "):
+        index = text.rfind(separator, 0, limit)
+        if index > limit // 2:
+            return index + len(separator)
+    return limit
+
+
+class StreamingReply:
+    """Ответ, который дописывается правками одного сообщения по мере генерации.
+
+    Правки не чаще одной в STREAM_EDIT_INTERVAL секунд и в пределах общего для бота
+    лимита EDIT_LIMITER; текст длиннее лимита Telegram продолжается в следующих сообщениях.
+    Правки отправляет фоновая задача: feed не ждет Telegram, поэтому поток GigaChat
+    читается без задержек (и не держит семафор запросов) даже во время пауз RetryAfter.
+    """
+
+    def __init__(self, message: Message, edit_interval: float = None, limit: int = TELEGRAM_MESSAGE_LIMIT,
+                 limiter: TokenBucket = None):
+        self.message = message
+        self.edit_interval = edit_interval or Config.STREAM_EDIT_INTERVAL
+        self.limit = limit
+        self.limiter = limiter or EDIT_LIMITER
+        self._text = ""
+        self._shown = ""
+        self._current = None
+        self._last_edit = 0.0
+        self._changed = asyncio.Event()
+        self._task = None
+        self._flushing = False
+        self._closing = False
+
+    async def feed(self, delta: str):
+        self._text += delta
+        self._changed.set()
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def finish(self):
+        """Остановка фоновых правок и вывод всего текста"""
+        self._closing = True
+        if self._task is not None:
+            self._changed.set()
+            # Отправку правки не прерываем: иначе часть ответа может уйти дважды
+            if not self._flushing:
+                self._task.cancel()
+            await asyncio.wait([self._task])
+            if not self._task.cancelled():
+                self._task.result()
+        await self._flush(final=True)
+
+    def cancel(self):
+        """Остановка фоновых правок без вывода (ответ прерван)"""
+        if self._task is not None:
+            self._task.cancel()
+
+    async def _run(self):
+        while not self._closing:
+            await self._changed.wait()
+            self._changed.clear()
+            if self._closing:
+                break
+            self._flushing = True
+            try:
+                await self._flush(final=False)
+            finally:
+                self._flushing = False
+            if not self._closing:
+                # Первый фрагмент показываем сразу, дальше - с ограничением частоты
+                await asyncio.sleep(max(0.0, self._last_edit + self.edit_interval - time.monotonic()))
+
+    async def _flush(self, final: bool):
+        while len(self._text) > self.limit:
+            split = _split_point(self._text, self.limit)
+            await self._show(self._text[:split].rstrip(), final=True)
+            # Продолжение - новым сообщением
+            self._text = self._text[split:].lstrip()
+            self._current = None
+            self._shown = ""
+        await self._show(self._text, final=final)
+
+    async def _show(self, text: str, final: bool):
+        if not text.strip() or text == self._shown:
+            return
+        wait = self.limiter.take()
+        if wait and not final:
+            # Промежуточная правка при исчерпанном общем лимите пропускается
+            return
+        while wait:
+            await asyncio.sleep(wait)
+            wait = self.limiter.take()
+        while True:
+            try:
+                if self._current is None:
+                    self._current = await self.message.reply_text(text)
+                else:
+                    await self._current.edit_text(text)
+                break
+            except RetryAfter as e:
+                # Промежуточную правку можно пропустить, финальную - только отложить
+                if not final:
+                    self.edit_interval = max(self.edit_interval, float(e.retry_after))
+                    self._last_edit = time.monotonic()
+                    return
+                await asyncio.sleep(e.retry_after)
+            except BadRequest as e:
+                if "not modified" not in str(e).lower():
+                    raise
+                break
+        self._shown = text
+        self._last_edit = time.monotonic()
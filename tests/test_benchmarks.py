@@ -0,0 +1,34 @@
+from benchmarks.corpus import build_corpus
+from benchmarks.report import latency_summary, percentile
+from config import Config
+from file_processor import FileProcessor
+
+
+def test_percentile_interpolates_between_samples():
+    values = [4, 1, 3, 2]
+    assert percentile(values, 0) == 1
+    assert percentile(values, 50) == 2.5
+    assert percentile(values, 100) == 4
+    assert percentile([], 95) == 0.0
+
+
+def test_latency_summary():
+    summary = latency_summary([0.1] * 9 + [1.0], elapsed=2.0)
+    assert summary["requests"] == 10
+    assert summary["throughput"] == 5.0
+    assert summary["p50"] == 0.1
+    assert summary["p99"] > summary["p95"] > summary["p50"]
+
+
+def test_corpus_files_are_readable(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "DOWNLOAD_DIR", str(tmp_path / "downloads"))
+    processor = FileProcessor()
+
+    items = build_corpus(tmp_path / "corpus", kinds=("pdf", "docx", "xlsx"))
+    assert [item.file_type for item in items] == ["pdf", "docx", "xlsx"]
+    for item in items:
+        text = getattr(processor, f"process_{item.file_type}")(item.path)
+        assert not text.startswith("❌")
+        assert len(text) > 100
+    # Существующие файлы переиспользуются
+    assert build_corpus(tmp_path / "corpus", kinds=("pdf",))[0].path.stat().st_mtime == items[0].path.stat().st_mtime
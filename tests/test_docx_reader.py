@@ -0,0 +1,97 @@
+import io
+
+import docx
+
+from docx_reader import iter_docx
+
+
+def _build(fill) -> io.BytesIO:
+    document = docx.Document()
+    fill(document)
+    buffer = io.BytesIO()
+    document.save(buffer)
+    buffer.seek(0)
+    return buffer
+
+
+def _read(fill) -> list:
+    return list(iter_docx(_build(fill)))
+
+
+def test_paragraphs_and_tables_in_document_order():
+    def fill(document):
+        document.add_paragraph("До таблицы")
+        table = document.add_table(rows=2, cols=2)
+        table.cell(0, 0).text, table.cell(0, 1).text = "Имя", "Сумма"
+        table.cell(1, 0).text, table.cell(1, 1).text = "Иванов", "100"
+        document.add_paragraph("После таблицы")
+        document.add_table(rows=1, cols=1).cell(0, 0).text = "Вторая"
+
+    assert _read(fill) == [
+        "До таблицы",
+        "\n📊 Таблица 1:",
+        "Имя | Сумма",
+        "Иванов | 100",
+        "",
+        "После таблицы",
+        "\n📊 Таблица 2:",
+        "Вторая",
+        "",
+    ]
+
+
+def test_merged_cells_are_output_once():
+    def fill(document):
+        table = document.add_table(rows=3, cols=3)
+        for row in range(3):
+            for col in range(3):
+                table.cell(row, col).text = f"{row}{col}"
+        # Вертикальное объединение (vMerge) и горизонтальное (gridSpan)
+        table.cell(0, 0).merge(table.cell(2, 0))
+        table.cell(0, 1).merge(table.cell(0, 2))
+
+    rows = _read(fill)[1:-1]
+    assert len(rows) == 3
+    assert rows[0].count("|") == 1
+    assert "00" in rows[0] and "01" in rows[0] and "02" in rows[0]
+    # Продолжения вертикального объединения пропущены
+    assert rows[1] == "11 | 12"
+    assert rows[2] == "21 | 22"
+
+
+def test_headings_and_list_items():
+    def fill(document):
+        document.add_heading("Отчет", level=0)
+        document.add_heading("Раздел", level=1)
+        document.add_heading("Подраздел", level=2)
+        document.add_paragraph("Обычный текст")
+        document.add_paragraph("Первый пункт", style="List Bullet")
+        document.add_paragraph("Второй пункт", style="List Number")
+
+    assert _read(fill) == [
+        "# Отчет",
+        "# Раздел",
+        "## Подраздел",
+        "Обычный текст",
+        "• Первый пункт",
+        "• Второй пункт",
+    ]
+
+
+def test_nested_table_is_part_of_outer_cell():
+    def fill(document):
+        outer = document.add_table(rows=1, cols=2)
+        outer.cell(0, 0).text = "Внешняя"
+        cell = outer.cell(0, 1)
+        cell.text = "Заголовок"
+        inner = cell.add_table(rows=2, cols=2)
+        inner.cell(0, 0).text, inner.cell(0, 1).text = "a", "b"
+        inner.cell(1, 0).text, inner.cell(1, 1).text = "c", "d"
+        document.add_paragraph("Конец")
+
+    assert _read(fill) == [
+        "\n📊 Таблица 1:",
+        "Внешняя | Заголовок a; b c; d",
+        "",
+        "Конец",
+    ]
@@ -0,0 +1,150 @@
+import asyncio
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from bot import TIMEOUT_MESSAGE, OfficeAssistantBot
+from config import Config
+from extraction_cache import ExtractionCache
+from extraction_executor import ExtractionTimeoutError
+from file_processor import INCOMPLETE_MARK
+
+
+class FakeFile:
+    def __init__(self, data: bytes, fail: bool = False):
+        self.data = data
+        self.fail = fail
+        self.saved_to = None
+
+    async def download_as_bytearray(self):
+        return bytearray(self.data)
+
+    async def download_to_drive(self, custom_path):
+        self.saved_to = Path(custom_path)
+        self.saved_to.write_bytes(self.data[:10])
+        if self.fail:
+            raise ConnectionError("connection reset")
+        self.saved_to.write_bytes(self.data)
+
+
+class FakeExtractor:
+    def __init__(self, fail: bool = False, result: str = None, error: Exception = None):
+        self.fail = fail
+        self.result = result
+        self.error = error
+        self.sources = []
+
+    async def run(self, method, source, max_chars):
+        self.sources.append(source)
+        if self.error is not None:
+            raise self.error
+        if self.fail:
+            raise RuntimeError("worker crashed")
+        if self.result is not None:
+            return self.result
+        if isinstance(source, Path):
+            return f"{method}: {source.stat().st_size} bytes on disk"
+        return f"{method}: {len(source)} bytes in memory"
+
+
+@pytest.fixture
+def downloads(tmp_path, monkeypatch):
+    path = tmp_path / "downloads"
+    path.mkdir()
+    monkeypatch.setattr(Config, "DOWNLOAD_DIR", str(path))
+    monkeypatch.setattr(Config, "IN_MEMORY_DOWNLOAD_LIMIT", 100)
+    return path
+
+
+def _bot(tmp_path, extractor):
+    bot = OfficeAssistantBot.__new__(OfficeAssistantBot)
+    bot.extractor = extractor
+    bot.extraction_cache = ExtractionCache(str(tmp_path / "cache"))
+    return bot
+
+
+def _context(file):
+    async def get_file(file_id):
+        return file
+    return SimpleNamespace(bot=SimpleNamespace(get_file=get_file))
+
+
+def _attachment(size: int):
+    return SimpleNamespace(file_id="file", file_unique_id=f"unique-{size}", file_size=size)
+
+
+def test_small_file_is_kept_in_memory(tmp_path, downloads):
+    extractor = FakeExtractor()
+    bot = _bot(tmp_path, extractor)
+    file = FakeFile(b"x" * 50)
+
+    text = asyncio.run(bot._extract_text(_context(file), _attachment(50), "pdf", ".pdf"))
+    assert text == "process_pdf: 50 bytes in memory"
+    assert file.saved_to is None
+    assert list(downloads.iterdir()) == []
+
+
+def test_large_file_is_spooled_and_removed(tmp_path, downloads):
+    extractor = FakeExtractor()
+    bot = _bot(tmp_path, extractor)
+    file = FakeFile(b"x" * 500)
+
+    text = asyncio.run(bot._extract_text(_context(file), _attachment(500), "pdf", ".pdf"))
+    assert text == "process_pdf: 500 bytes on disk"
+    assert extractor.sources[0].parent == downloads
+    assert extractor.sources[0].suffix == ".pdf"
+    assert list(downloads.iterdir()) == []
+
+
+def test_temp_file_removed_when_download_fails(tmp_path, downloads):
+    bot = _bot(tmp_path, FakeExtractor())
+    file = FakeFile(b"x" * 500, fail=True)
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(bot._extract_text(_context(file), _attachment(500), "pdf", ".pdf"))
+    assert file.saved_to is not None
+    assert list(downloads.iterdir()) == []
+
+
+def test_temp_file_removed_when_extraction_fails(tmp_path, downloads):
+    bot = _bot(tmp_path, FakeExtractor(fail=True))
+    file = FakeFile(b"x" * 500)
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(bot._extract_text(_context(file), _attachment(500), "pdf", ".pdf"))
+    assert list(downloads.iterdir()) == []
+
+
+def test_partial_extraction_is_not_cached(tmp_path, downloads):
+    partial = "📄 Страница 1:\nтекст" + INCOMPLETE_MARK
+    extractor = FakeExtractor(result=partial)
+    bot = _bot(tmp_path, extractor)
+
+    for _ in range(2):
+        text = asyncio.run(bot._extract_text(_context(FakeFile(b"x" * 50)), _attachment(50), "pdf", ".pdf"))
+        assert text == partial
+    # Повторная отправка обрабатывается заново, ссылка по file_unique_id не создается
+    assert len(extractor.sources) == 2
+    assert bot.extraction_cache.get_by_file_id("unique-50") is None
+
+
+def test_extraction_timeout_is_reported_to_user(tmp_path, downloads):
+    bot = _bot(tmp_path, FakeExtractor(error=ExtractionTimeoutError("process_pdf did not finish in 120s")))
+    answered = []
+
+    async def answer(*args):
+        answered.append(args)
+    bot._answer = answer
+
+    replies = []
+
+    async def reply_text(text):
+        replies.append(text)
+    update = SimpleNamespace(message=SimpleNamespace(caption=None, reply_text=reply_text))
+    doc = SimpleNamespace(file_id="file", file_unique_id="unique-doc", file_size=50, file_name="report.pdf")
+
+    asyncio.run(bot._process_document(update, _context(FakeFile(b"x" * 50)), doc, "pdf"))
+    assert replies[-1] == TIMEOUT_MESSAGE
+    assert answered == []
+    assert list(downloads.iterdir()) == []
@@ -0,0 +1,63 @@
+import os
+
+import pytest
+
+from extraction_cache import ExtractionCache
+from file_processor import INCOMPLETE_MARK
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ExtractionCache(str(tmp_path / "cache"), max_bytes=10**6)
+
+
+def test_text_is_found_by_hash_and_file_id(cache, tmp_path):
+    source = tmp_path / "report.pdf"
+    source.write_bytes(b"%PDF-1.4 report")
+    digest = ExtractionCache.hash_file(source)
+
+    assert cache.get_by_hash(digest) is None
+    cache.put(digest, "📄 Страница 1:\nтекст")
+    cache.link("unique-1", digest)
+
+    assert cache.get_by_hash(digest) == "📄 Страница 1:\nтекст"
+    assert cache.get_by_file_id("unique-1") == "📄 Страница 1:\nтекст"
+    assert cache.get_by_file_id("unique-2") is None
+    assert cache.stats()["hits_by_id"] == 1
+    assert cache.stats()["hits_by_hash"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_errors_and_partial_results_are_not_cached(cache):
+    cache.put("digest", "❌ Ошибка обработки PDF: broken")
+    cache.put("partial", "📄 Страница 1:\nтекст" + INCOMPLETE_MARK)
+    assert cache.get_by_hash("digest") is None
+    assert cache.get_by_hash("partial") is None
+
+
+def test_cache_survives_restart(cache, tmp_path):
+    cache.put("digest", "текст")
+    cache.link("unique", "digest")
+    reopened = ExtractionCache(str(tmp_path / "cache"), max_bytes=10**6)
+    assert reopened.get_by_file_id("unique") == "текст"
+    assert reopened.stats()["bytes"] == cache.stats()["bytes"]
+
+
+def test_least_recently_used_texts_are_evicted(tmp_path):
+    cache = ExtractionCache(str(tmp_path / "cache"), max_bytes=3000)
+    for number in range(3):
+        cache.put(f"d{number}", "x" * 900)
+        os.utime(cache._text_path(f"d{number}"), (number, number))
+    cache.link("old", "d0")
+    # Обращение обновляет время: d1 теперь самая свежая запись
+    assert cache.get_by_hash("d1")
+
+    cache.link("fresh", "d1")
+
+    cache.put("d3", "x" * 900)
+    # Ссылка на вытесненный текст удаляется вместе с ним
+    assert not (cache.ids_dir / "old").exists()
+    assert (cache.ids_dir / "fresh").exists()
+    assert cache.get_by_hash("d0") is None
+    assert cache.get_by_hash("d1") and cache.get_by_hash("d3")
+    assert cache.stats()["bytes"] <= 3000
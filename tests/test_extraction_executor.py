@@ -0,0 +1,75 @@
+import asyncio
+import os
+import signal
+
+import pytest
+
+from extraction_executor import (
+    ExtractionBusyError, ExtractionExecutor, ExtractionTimeoutError, ExtractionWorkerError
+)
+
+
+def test_job_runs_in_worker_process():
+    async def scenario():
+        executor = ExtractionExecutor(max_workers=1)
+        try:
+            results = await asyncio.gather(
+                executor.run("get_file_type", "report.pdf", ""),
+                executor.run("get_file_type", "table.xlsx", ""),
+            )
+            assert executor.pending == 0
+            return results
+        finally:
+            executor.shutdown()
+
+    assert asyncio.run(scenario()) == ["pdf", "xlsx"]
+
+
+def test_full_queue_is_rejected():
+    async def scenario():
+        executor = ExtractionExecutor(max_workers=1, max_pending=1)
+        try:
+            first = asyncio.create_task(executor.run("get_file_type", "report.pdf", ""))
+            await asyncio.sleep(0)
+            with pytest.raises(ExtractionBusyError):
+                await executor.run("get_file_type", "table.xlsx", "")
+            assert await first == "pdf"
+        finally:
+            executor.shutdown()
+
+    asyncio.run(scenario())
+
+
+def test_slow_job_times_out():
+    async def scenario():
+        executor = ExtractionExecutor(max_workers=1)
+        try:
+            # Запуск процесса-воркера заведомо дольше 10 мс
+            with pytest.raises(ExtractionTimeoutError):
+                await executor.run("get_file_type", "report.pdf", "", timeout=0.005)
+            assert executor.pending == 0
+            assert await executor.run("get_file_type", "report.pdf", "") == "pdf"
+        finally:
+            executor.shutdown()
+
+    asyncio.run(scenario())
+
+
+def test_pool_is_recreated_after_worker_crash():
+    async def scenario():
+        executor = ExtractionExecutor(max_workers=1)
+        try:
+            assert await executor.run("get_file_type", "report.pdf", "") == "pdf"
+            for pid in list(executor._pool._processes):
+                os.kill(pid, signal.SIGKILL)
+            await asyncio.sleep(0.5)
+
+            with pytest.raises(ExtractionWorkerError):
+                await executor.run("get_file_type", "report.pdf", "")
+            # Следующая задача - уже в новом пуле
+            assert await executor.run("get_file_type", "table.xlsx", "") == "xlsx"
+            assert executor.pending == 0
+        finally:
+            executor.shutdown(wait=True)
+
+    asyncio.run(scenario())
@@ -0,0 +1,163 @@
+import threading
+import time
+
+import pytest
+
+import file_processor
+from config import Config
+from file_processor import INCOMPLETE_MARK, OCR_SKIPPED_TEXT, TRUNCATED_MARK, FileProcessor, is_complete
+
+
+class FakePage:
+    def get_text(self) -> str:
+        return ""
+
+
+class FakeDocument:
+    """PDF из страниц без текстового слоя: все уходят в OCR"""
+
+    def __init__(self, page_count: int):
+        self.page_count = page_count
+
+    def load_page(self, page_num: int) -> FakePage:
+        return FakePage()
+
+
+@pytest.fixture
+def processor(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "DOWNLOAD_DIR", str(tmp_path / "downloads"))
+    monkeypatch.setattr(Config, "PDF_OCR_THREADS", 2)
+    return FileProcessor()
+
+
+def _pdf(tmp_path, pages: list):
+    """PDF, где None - страница без текстового слоя (скан)"""
+    fitz = pytest.importorskip("fitz")
+    doc = fitz.open()
+    for text in pages:
+        page = doc.new_page()
+        if text:
+            page.insert_text((72, 72), text)
+    path = tmp_path / "document.pdf"
+    doc.save(str(path))
+    doc.close()
+    return path
+
+
+def test_pdf_pages_keep_order_with_parallel_ocr(processor, tmp_path, monkeypatch):
+    path = _pdf(tmp_path, ["Text layer one", None, None, "Text layer four", None, None])
+
+    def fake_ocr(page_num, *args):
+        # Ранние страницы распознаются дольше поздних
+        time.sleep(0.05 * (6 - page_num))
+        if page_num == 4:
+            raise RuntimeError("tesseract failed")
+        return f"scan {page_num + 1}"
+
+    monkeypatch.setattr(processor, "_render_page", lambda page: page.number)
+    monkeypatch.setattr(processor, "_ocr_image", fake_ocr)
+
+    text = processor.process_pdf(path)
+    # Страница 5 не распознана: результат помечен как неполный
+    assert text.endswith(INCOMPLETE_MARK)
+    assert text[:-len(INCOMPLETE_MARK)].split("\n\n") == [
+        "📄 Страница 1:\nText layer one",
+        "📄 Страница 2 (OCR):\nscan 2",
+        "📄 Страница 3 (OCR):\nscan 3",
+        "📄 Страница 4:\nText layer four",
+        "📄 Страница 6 (OCR):\nscan 6",
+    ]
+
+
+def test_pdf_reading_stops_once_budget_is_reached(processor, tmp_path, monkeypatch):
+    path = _pdf(tmp_path, [None] * 20)
+    rendered = []
+
+    def fake_render(page):
+        rendered.append(page.number)
+        return page.number
+
+    monkeypatch.setattr(processor, "_render_page", fake_render)
+    monkeypatch.setattr(processor, "_ocr_image", lambda page_num, *args: "scanned text " * 5)
+
+    text = processor.process_pdf(path, max_chars=40)
+    assert text.endswith(TRUNCATED_MARK)
+    assert text.startswith("📄 Страница 1 (OCR):")
+    # Дальше окна параллельного OCR страницы не рендерятся
+    assert len(rendered) <= Config.PDF_OCR_THREADS * 2 + 1
+
+
+def test_stopping_pdf_waits_for_running_ocr(processor, monkeypatch):
+    running = []
+    finished = []
+
+    def slow_ocr(img, stop=None):
+        running.append(img)
+        time.sleep(0.2)
+        finished.append(img)
+        return f"page {img}"
+
+    monkeypatch.setattr(processor, "_render_page", lambda page: id(page))
+    monkeypatch.setattr(processor, "_ocr_image", slow_ocr)
+    threads_before = threading.active_count()
+
+    pages = processor._iter_pdf_pages(FakeDocument(20))
+    page_num, text, is_ocr = next(pages)
+    assert (page_num, is_ocr) == (0, True)
+    pages.close()
+
+    # Начатые распознавания завершены, остальные страницы не запускались
+    assert len(finished) == len(running) < 20
+    assert threading.active_count() == threads_before
+
+
+def test_ocr_is_skipped_after_stop(processor, monkeypatch):
+    calls = []
+    monkeypatch.setattr(file_processor, "_backend", lambda name: calls.append(name) or _Prepare())
+    stop = threading.Event()
+    stop.set()
+    assert processor._ocr_image(_Image(), stop) == ""
+    assert calls == ["ocr_preprocess"]
+
+
+class _Image:
+    def close(self):
+        pass
+
+
+class _Prepare:
+    @staticmethod
+    def prepare(img, detect_language=True):
+        return object()
+
+
+def test_tesseract_call_is_bounded_by_page_timeout(monkeypatch):
+    calls = []
+
+    class FakeTesseract:
+        @staticmethod
+        def image_to_string(image, lang, timeout):
+            calls.append((image, lang, timeout))
+            return " text \n"
+
+    monkeypatch.setattr(Config, "OCR_PAGE_TIMEOUT", 7)
+    monkeypatch.setattr(file_processor, "_backend", lambda name: FakeTesseract)
+    prepared = type("Prepared", (), {"image": "img", "lang": "rus"})
+    assert FileProcessor._tesseract(prepared) == "text"
+    assert calls == [("img", "rus", 7)]
+
+
+def test_skipped_ocr_is_not_cacheable(processor, tmp_path, monkeypatch):
+    pytest.importorskip("PIL")
+    from PIL import Image
+
+    monkeypatch.setattr(Config, "OCR_SKIP_NO_TEXT", True)
+    path = tmp_path / "blank.png"
+    Image.new("L", (800, 600), 200).save(path)
+    assert processor.process_image(path) == OCR_SKIPPED_TEXT
+    assert not is_complete(OCR_SKIPPED_TEXT)
+
+    # Пропущенная страница скана делает результат PDF неполным
+    pdf = processor.process_pdf(_pdf(tmp_path, ["Text layer one", None]))
+    assert pdf.endswith(INCOMPLETE_MARK)
+    assert not is_complete(pdf)
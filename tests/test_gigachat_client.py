@@ -0,0 +1,127 @@
+import asyncio
+
+import httpx
+import pytest
+from types import SimpleNamespace
+
+from gigachat.exceptions import AuthenticationError, ResponseError
+
+from config import Config
+from gigachat_client import STREAM_INTERRUPTED, GigaChatClient
+from response_cache import ResponseCache
+from session_store import SessionStore
+
+
+class FakeGigaChat:
+    """Клиент GigaChat: ошибки из очереди failures, затем ответ; считает одновременные запросы"""
+
+    def __init__(self, failures: list = (), delay: float = 0.0):
+        self.failures = list(failures)
+        self.delay = delay
+        self.calls = 0
+        self.active = 0
+        self.max_active = 0
+
+    async def achat(self, chat):
+        self.calls += 1
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            if self.delay:
+                await asyncio.sleep(self.delay)
+            if self.failures:
+                raise self.failures.pop(0)
+            return "ответ"
+        finally:
+            self.active -= 1
+
+
+@pytest.fixture(autouse=True)
+def memory_only(monkeypatch):
+    monkeypatch.setattr(Config, "STORAGE_DB", "")
+
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch):
+    monkeypatch.setattr(Config, "GIGA_CHAT_RETRY_BACKOFF", 0)
+    monkeypatch.setattr(Config, "GIGA_CHAT_MAX_RETRIES", 2)
+    monkeypatch.setattr(Config, "GIGA_CHAT_TIMEOUT", 1)
+
+
+def _request(fake: FakeGigaChat):
+    return asyncio.run(GigaChatClient(client=fake)._achat_with_retry(None))
+
+
+def test_transient_errors_are_retried():
+    fake = FakeGigaChat([httpx.ConnectError("reset"), ResponseError("url", 503, b"", {})])
+    assert _request(fake) == "ответ"
+    assert fake.calls == 3
+
+
+def test_retries_are_limited():
+    fake = FakeGigaChat([httpx.ReadTimeout("slow")] * 3)
+    with pytest.raises(httpx.ReadTimeout):
+        _request(fake)
+    assert fake.calls == 3
+
+
+@pytest.mark.parametrize("error", [AuthenticationError("url", 401, b"", {}), ResponseError("url", 400, b"", {})])
+def test_permanent_errors_are_not_retried(error):
+    fake = FakeGigaChat([error])
+    with pytest.raises(type(error)):
+        _request(fake)
+    assert fake.calls == 1
+
+
+def test_slow_request_times_out_and_is_retried(monkeypatch):
+    monkeypatch.setattr(Config, "GIGA_CHAT_TIMEOUT", 0.05)
+    monkeypatch.setattr(Config, "GIGA_CHAT_MAX_RETRIES", 1)
+    fake = FakeGigaChat(delay=0.2)
+    with pytest.raises(asyncio.TimeoutError):
+        _request(fake)
+    assert fake.calls == 2
+
+
+def test_concurrency_is_bounded(monkeypatch):
+    monkeypatch.setattr(Config, "GIGA_CHAT_MAX_CONCURRENCY", 2)
+    fake = FakeGigaChat(delay=0.02)
+
+    async def scenario():
+        client = GigaChatClient(client=fake)
+        return await asyncio.gather(*(client._achat_with_retry(None) for _ in range(6)))
+
+    assert asyncio.run(scenario()) == ["ответ"] * 6
+    assert fake.max_active == 2
+
+
+class BrokenStream:
+    """Поток GigaChat, который обрывается после нескольких фрагментов"""
+
+    def __init__(self, deltas: list):
+        self.deltas = list(deltas)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self.deltas:
+            raise httpx.ReadError("connection reset")
+        delta = SimpleNamespace(content=self.deltas.pop(0))
+        return SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+
+    async def aclose(self):
+        pass
+
+
+def test_interrupted_stream_is_flagged_and_not_remembered():
+    fake = SimpleNamespace(astream=lambda chat: BrokenStream(["Откройте ", "вкладку"]))
+    knowledge_base = SimpleNamespace(search=lambda question: [])
+    client = GigaChatClient(client=fake, sessions=SessionStore(), response_cache=ResponseCache(),
+                            knowledge_base=knowledge_base)
+
+    async def scenario():
+        return [delta async for delta in client.astream_message(1, "Как закрепить строку?")]
+
+    assert asyncio.run(scenario()) == ["Откройте ", "вкладку", STREAM_INTERRUPTED]
+    assert client.sessions.get_history(1) == []
+    assert client.response_cache.get("Как закрепить строку?") is None
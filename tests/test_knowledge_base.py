@@ -0,0 +1,108 @@
+import os
+import threading
+import time
+
+import pytest
+
+from config import Config
+from knowledge_base import KnowledgeBase, tokenize
+
+KNOWLEDGE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "knowledge")
+
+
+@pytest.fixture
+def knowledge(tmp_path):
+    kb = KnowledgeBase(KNOWLEDGE_DIR, tmp_path / "index.json")
+    kb.load()
+    return kb
+
+
+def _titles(hits: list) -> list:
+    return [hit.title for hit in hits]
+
+
+def test_tokenize_folds_case_and_strips_endings():
+    assert tokenize("Таблицы и формулы, ёлка") == ["таблиц", "формул", "елк"]
+
+
+def test_best_section_comes_first(knowledge):
+    hits = knowledge.search("Почему ВПР возвращает Н/Д")
+    assert hits[0].title == "ПРОСМОТРX и ВПР в Excel. Почему ВПР возвращает #Н/Д"
+    assert hits[0].coverage == 1.0
+    assert _titles(knowledge.search("Как обновить оглавление в Word"))[0].endswith("Как обновить оглавление")
+
+
+def test_direct_answer_needs_clear_winner(knowledge):
+    answer = KnowledgeBase.direct_answer(knowledge.search("Почему ВПР возвращает Н/Д"))
+    assert answer.startswith("ПРОСМОТРX и ВПР в Excel. Почему ВПР возвращает #Н/Д")
+    # Два раздела про оглавление почти равны - готового ответа нет
+    assert KnowledgeBase.direct_answer(knowledge.search("оглавление")) is None
+
+
+def test_index_is_updated_per_file(tmp_path, monkeypatch):
+    folder = tmp_path / "knowledge"
+    folder.mkdir()
+    (folder / "excel.md").write_text("# Сводные таблицы\n\nСводная таблица собирает итоги.", encoding="utf-8")
+    (folder / "word.md").write_text("# Колонтитулы\n\nКолонтитулы задаются на вкладке Вставка.", encoding="utf-8")
+    index_path = tmp_path / "index.json"
+    KnowledgeBase(folder, index_path).refresh()
+
+    parsed = []
+    parse = KnowledgeBase._parse
+    monkeypatch.setattr(KnowledgeBase, "_parse", staticmethod(lambda path: parsed.append(path.name) or parse(path)))
+    (folder / "word.md").write_text("# Колонтитулы\n\nКолонтитулы и нумерация страниц.", encoding="utf-8")
+
+    # После перезапуска индекс читается с диска, заново разбирается только измененный файл
+    kb = KnowledgeBase(folder, index_path)
+    kb.refresh()
+    assert parsed == ["word.md"]
+    assert kb.stats()["files"] == 2
+
+
+def test_single_common_word_does_not_match(knowledge):
+    hits = knowledge.search("Почему не работает XLOOKUP")
+    assert hits
+    assert all("XLOOKUP" in title for title in _titles(hits))
+
+
+def test_low_coverage_sections_are_dropped(knowledge):
+    assert all(hit.coverage >= Config.KNOWLEDGE_MIN_COVERAGE for hit in knowledge.search("Сумма в Word таблице"))
+    assert _titles(knowledge.search("Как сделать оглавление в Word"))[0].startswith("Оглавление в Word")
+
+
+def test_refresh_runs_in_background_and_keeps_old_index(tmp_path, monkeypatch):
+    # В базе из одного-двух разделов у BM25 низкий idf
+    monkeypatch.setattr(Config, "KNOWLEDGE_MIN_SCORE", 0)
+    folder = tmp_path / "knowledge"
+    folder.mkdir()
+    (folder / "excel.md").write_text("# Сводные таблицы\n\nСводная таблица собирает итоги.", encoding="utf-8")
+    kb = KnowledgeBase(folder, tmp_path / "index.json")
+    kb.load()
+    assert _titles(kb.search("сводная таблица")) == ["Сводные таблицы"]
+
+    parsing = threading.Event()
+    release = threading.Event()
+    parse = KnowledgeBase._parse
+
+    def slow_parse(path):
+        parsing.set()
+        release.wait(5)
+        return parse(path)
+
+    monkeypatch.setattr(KnowledgeBase, "_parse", staticmethod(slow_parse))
+    monkeypatch.setattr(Config, "KNOWLEDGE_REFRESH_INTERVAL", 0)
+    (folder / "word.md").write_text("# Колонтитулы\n\nКолонтитулы задаются на вкладке Вставка.", encoding="utf-8")
+
+    # Поиск не ждет разбора нового файла и отвечает по прежнему индексу
+    start = time.monotonic()
+    assert _titles(kb.search("сводная таблица")) == ["Сводные таблицы"]
+    assert kb.search("колонтитулы") == []
+    assert time.monotonic() - start < 1
+    assert parsing.wait(5)
+
+    release.set()
+    deadline = time.monotonic() + 5
+    while not kb.search("колонтитулы") and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert _titles(kb.search("колонтитулы")) == ["Колонтитулы"]
+    assert kb.stats()["files"] == 2
@@ -0,0 +1,128 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from bot import OfficeAssistantBot
+from config import Config
+from extraction_cache import ExtractionCache
+from media_group import MediaGroupCollector
+from scheduler import FairScheduler
+
+
+def test_parts_within_window_are_collected_once():
+    async def scenario():
+        collector = MediaGroupCollector(window=0.05)
+
+        async def late(update, delay):
+            await asyncio.sleep(delay)
+            return await collector.collect("album", update)
+
+        return await asyncio.gather(collector.collect("album", 1), late(2, 0.01), late(3, 0.07))
+
+    # Третья часть пришла во втором окне - окно продлилось
+    assert asyncio.run(scenario()) == [[1, 2, 3], None, None]
+
+
+def test_lone_part_is_flushed_after_window():
+    async def scenario():
+        collector = MediaGroupCollector(window=0.02)
+        first = await collector.collect("album", 1)
+        # После сброса тот же ключ начинает новый альбом
+        second = await collector.collect("album", 2)
+        return first, second
+
+    assert asyncio.run(scenario()) == ([1], [2])
+
+
+class FakeGigaChat:
+    def __init__(self):
+        self.requests = []
+
+    async def asend_message(self, chat_id, user_message, extracted_text=None, file_type=None):
+        self.requests.append((user_message, extracted_text))
+        return "ответ"
+
+
+class FakeExtractor:
+    async def run(self, method, source, max_chars):
+        return f"текст {source.decode()}"
+
+
+class FakeFile:
+    def __init__(self, file_id):
+        self.file_id = file_id
+
+    async def download_as_bytearray(self):
+        return bytearray(self.file_id.encode())
+
+
+@pytest.fixture
+def bot(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "STREAM_REPLIES", False)
+    monkeypatch.setattr(Config, "TRACE_FILE", "")
+    instance = OfficeAssistantBot.__new__(OfficeAssistantBot)
+    instance.gigachat_client = FakeGigaChat()
+    instance.extractor = FakeExtractor()
+    instance.extraction_cache = ExtractionCache(str(tmp_path / "cache"))
+    instance.scheduler = FairScheduler(text_workers=1, ocr_workers=1)
+    instance.media_groups = MediaGroupCollector(window=0.02)
+    return instance
+
+
+def _context():
+    async def get_file(file_id):
+        return FakeFile(file_id)
+    return SimpleNamespace(bot=SimpleNamespace(get_file=get_file))
+
+
+def _photo_update(replies: list, number: int, media_group_id: str = None, caption: str = None):
+    async def reply_text(text):
+        replies.append(text)
+
+    photo = SimpleNamespace(file_id=f"photo{number}", file_unique_id=f"unique{number}", file_size=10)
+    message = SimpleNamespace(media_group_id=media_group_id, photo=[photo], caption=caption, reply_text=reply_text)
+    return SimpleNamespace(message=message, effective_chat=SimpleNamespace(id=7), effective_user=SimpleNamespace(id=7))
+
+
+def test_album_gets_one_answer(bot):
+    replies = []
+    updates = [_photo_update(replies, n, "album", "Сравни" if n == 2 else None) for n in (1, 2, 3)]
+
+    async def scenario():
+        try:
+            await asyncio.gather(*(bot.handle_photo(update, _context()) for update in updates))
+        finally:
+            await bot.scheduler.shutdown()
+
+    asyncio.run(scenario())
+    assert replies == ["🖼️ Обрабатываю альбом из 3 изображений...", "ответ"]
+    assert bot.gigachat_client.requests == [(
+        "Сравни",
+        "[Изображение 1]\nтекст photo1\n\n[Изображение 2]\nтекст photo2\n\n[Изображение 3]\nтекст photo3",
+    )]
+
+
+def test_single_photo_of_group_is_processed_after_window(bot):
+    replies = []
+
+    async def scenario():
+        try:
+            await bot.handle_photo(_photo_update(replies, 1, "album"), _context())
+        finally:
+            await bot.scheduler.shutdown()
+
+    asyncio.run(scenario())
+    assert replies[-1] == "ответ"
+    assert bot.gigachat_client.requests == [("Что на этом изображении?", "текст photo1")]
+
+
+def test_sequential_updates_are_rejected(monkeypatch):
+    monkeypatch.setattr(Config, "TELEGRAM_TOKEN", "token")
+    monkeypatch.setattr(Config, "GIGA_CHAT_TOKEN", "token")
+    monkeypatch.setattr(Config, "BOT_MODE", "polling")
+    monkeypatch.setattr(Config, "CONCURRENT_UPDATES", 1)
+    with pytest.raises(ValueError, match="CONCURRENT_UPDATES"):
+        Config.validate()
+    monkeypatch.setattr(Config, "CONCURRENT_UPDATES", 2)
+    Config.validate()
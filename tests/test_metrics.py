@@ -0,0 +1,70 @@
+import asyncio
+import json
+import socket
+
+import pytest
+
+import metrics
+from config import Config
+
+
+def test_registry_renders_prometheus_text():
+    registry = metrics.Registry()
+    requests = registry.counter("test_requests_total", "Запросы", ("kind",))
+    seconds = registry.histogram("test_seconds", "Длительность", ("stage",), buckets=(0.1, 1))
+    registry.gauge_callback("test_depth", "Очередь", lambda: [({"lane": "ocr"}, 3)])
+
+    requests.inc(kind="text")
+    requests.inc(2, kind="text")
+    seconds.observe(0.05, stage="llm")
+    seconds.observe(0.5, stage="llm")
+
+    lines = registry.render().splitlines()
+    assert 'test_requests_total{kind="text"} 3' in lines
+    assert 'test_seconds_bucket{stage="llm",le="0.1"} 1' in lines
+    assert 'test_seconds_bucket{stage="llm",le="1"} 2' in lines
+    assert 'test_seconds_bucket{stage="llm",le="+Inf"} 2' in lines
+    assert 'test_seconds_count{stage="llm"} 2' in lines
+    assert 'test_depth{lane="ocr"} 3' in lines
+
+
+def test_worker_snapshot_is_merged_once():
+    worker = metrics.Registry()
+    parent = metrics.Registry()
+    for registry in (worker, parent):
+        registry.counter("test_pages_total", "Страницы")
+    worker.counter("test_pages_total", "Страницы").inc(4)
+
+    parent.merge(worker.drain())
+    parent.merge(worker.drain())
+    assert "test_pages_total 4" in parent.render().splitlines()
+
+
+def test_traces_are_written_by_background_thread(tmp_path, monkeypatch):
+    path = tmp_path / "traces.jsonl"
+    monkeypatch.setattr(Config, "TRACE_FILE", str(path))
+
+    for number in range(3):
+        with metrics.trace("text", chat_id=number) as current:
+            current.add_stage("llm", 0.5)
+    with pytest.raises(ValueError):
+        with metrics.trace("ocr", chat_id=10):
+            raise ValueError("boom")
+    metrics.close_traces()
+
+    records = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+    assert [record["chat_id"] for record in records] == [0, 1, 2, 10]
+    assert records[0]["stages"] == [{"stage": "llm", "seconds": 0.5}]
+    assert records[-1]["error"] == "ValueError"
+
+
+def test_metrics_server_on_busy_port_is_skipped():
+    pytest.importorskip("aiohttp")
+
+    async def scenario():
+        with socket.socket() as busy:
+            busy.bind(("127.0.0.1", 0))
+            busy.listen()
+            return await metrics.start_metrics_server("127.0.0.1", busy.getsockname()[1])
+
+    assert asyncio.run(scenario()) is None
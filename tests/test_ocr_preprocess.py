@@ -0,0 +1,88 @@
+import pytest
+from PIL import Image, ImageChops, ImageDraw, ImageFilter, ImageFont, ImageStat
+
+import ocr_preprocess
+from config import Config
+
+FONT_PATH = "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf"
+
+
+@pytest.fixture(autouse=True)
+def no_osd(monkeypatch):
+    monkeypatch.setattr(Config, "OCR_DETECT_LANGUAGE", False)
+
+
+def _page(size=(1200, 900), font_size: int = 20, lines: int = 12, ink: int = 20, paper: int = 240):
+    try:
+        font = ImageFont.truetype(FONT_PATH, font_size)
+    except OSError:
+        pytest.skip("DejaVuSans is not installed")
+    img = Image.new("L", size, paper)
+    draw = ImageDraw.Draw(img)
+    for number in range(lines):
+        draw.text((100, 100 + number * font_size * 5 // 2), f"Sales report table formula column {number}",
+                  fill=ink, font=font)
+    return img
+
+
+def test_otsu_threshold_separates_two_tones():
+    histogram = [0] * 256
+    histogram[20] = 100
+    histogram[230] = 900
+    assert ocr_preprocess.otsu_threshold(histogram) == (20, 1.0)
+    assert ocr_preprocess.otsu_threshold([0] * 256) == (127, 0.0)
+
+
+def test_small_text_is_cropped_and_scaled_up():
+    page = _page()
+    prepared = ocr_preprocess.prepare(page)
+    assert prepared.lang == Config.TESSERACT_LANG
+    assert prepared.angle == 0
+    assert prepared.scale > 1.5
+    # Поля вокруг текста обрезаны до масштабирования
+    assert prepared.image.width < page.width * prepared.scale
+    assert set(prepared.image.getdata()) <= {0, 255}
+
+
+def test_skew_is_corrected():
+    page = _page().rotate(3, fillcolor=240, resample=Image.Resampling.BICUBIC)
+    assert ocr_preprocess.prepare(page).angle == pytest.approx(-3, abs=0.5)
+
+
+def test_dark_mode_is_inverted():
+    prepared = ocr_preprocess.prepare(_page(ink=230, paper=25))
+    # Фон белый, текст темный
+    assert ImageStat.Stat(prepared.image).mean[0] > 200
+
+
+def _gradient_page(lines: int = 30, blur: float = 0, noise: float = 0):
+    """Фото страницы с неравномерным освещением: фон от темно-серого к белому"""
+    page = _page(size=(1600, 1200), font_size=22, lines=lines, paper=255)
+    light = Image.linear_gradient("L").rotate(90).resize(page.size).point(lambda value: 60 + value * 0.7)
+    page = ImageChops.darker(page, light)
+    if noise:
+        page = Image.blend(page, Image.effect_noise(page.size, 40), noise)
+    if blur:
+        page = page.filter(ImageFilter.GaussianBlur(blur))
+    return page
+
+
+@pytest.mark.parametrize("image", [
+    pytest.param(lambda: _page(size=(1920, 1080), font_size=14, lines=1), id="screenshot-one-small-line"),
+    pytest.param(lambda: _page(size=(3000, 2000), font_size=20, lines=1), id="large-image-one-line"),
+    pytest.param(lambda: _gradient_page(), id="gradient-lit-page"),
+    pytest.param(lambda: _gradient_page(blur=1.2, noise=0.15), id="gradient-lit-page-blur-noise"),
+    pytest.param(lambda: _gradient_page(lines=2), id="two-lines-on-gradient"),
+])
+def test_text_images_are_not_skipped(image, monkeypatch):
+    monkeypatch.setattr(Config, "OCR_SKIP_NO_TEXT", True)
+    assert ocr_preprocess.prepare(image()) is not None
+
+
+def test_plain_images_are_skipped(monkeypatch):
+    monkeypatch.setattr(Config, "OCR_SKIP_NO_TEXT", True)
+    assert ocr_preprocess.prepare(Image.new("L", (800, 600), 200)) is None
+    assert ocr_preprocess.prepare(Image.linear_gradient("L").resize((800, 600))) is None
+
+    monkeypatch.setattr(Config, "OCR_SKIP_NO_TEXT", False)
+    assert ocr_preprocess.prepare(Image.new("L", (800, 600), 200)) is not None
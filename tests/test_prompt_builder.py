@@ -0,0 +1,58 @@
+from prompt_builder import PromptBuilder, estimate_tokens
+from prompts import compact_user_prompt, format_user_prompt
+from session_store import ROLE_ASSISTANT, ROLE_USER
+
+DOCUMENT = "строка отчета " * 2000
+
+
+def _history(*questions, attachment: str = DOCUMENT) -> list:
+    history = []
+    for question in questions:
+        history.append((ROLE_USER, format_user_prompt(question, attachment, "pdf")))
+        history.append((ROLE_ASSISTANT, f"ответ на {question}"))
+    return history
+
+
+def test_compact_user_prompt_replaces_attachment_with_reference():
+    prompt = format_user_prompt("Что в файле?", DOCUMENT, "pdf", ["[Excel] Сводные таблицы"])
+    compact = compact_user_prompt(prompt, preview_chars=30)
+
+    assert compact.startswith("Пользователь спрашивает: Что в файле?")
+    assert "Справка из базы знаний" in compact
+    assert f"pdf файл (содержимое {len(DOCUMENT)} симв. опущено, начало: «строка отчета строка отчета" in compact
+    assert len(compact) < 400
+    # Без вложения промпт не меняется, повторное сжатие ничего не делает
+    assert compact_user_prompt("Пользователь спрашивает: привет") == "Пользователь спрашивает: привет"
+    assert compact_user_prompt(compact) == compact
+
+
+def test_older_attachments_are_compacted_and_recent_kept_verbatim():
+    history = _history("первый", "второй")
+    messages, _ = PromptBuilder(token_budget=10**6, verbatim_messages=2).build("system", history, "вопрос")
+
+    assert len(messages) == 4
+    assert messages[0][1] == compact_user_prompt(history[0][1])
+    assert messages[1:] == history[1:]
+
+
+def test_compaction_happens_before_dropping_pairs():
+    history = _history("первый", "второй")
+    compacted = sum(estimate_tokens(compact_user_prompt(content)) for _, content in history)
+    budget = estimate_tokens("system") + estimate_tokens("вопрос") + compacted + 10
+
+    messages, total = PromptBuilder(token_budget=budget, verbatim_messages=2).build("system", history, "вопрос")
+    # Обе пары на месте, вложения сжаты и в дословной части
+    assert [role for role, _ in messages] == [ROLE_USER, ROLE_ASSISTANT] * 2
+    assert all("опущено" in content for role, content in messages if role == ROLE_USER)
+    assert total <= budget
+
+
+def test_oldest_pairs_are_dropped_when_compaction_is_not_enough():
+    history = _history("первый", "второй", "третий", attachment="")
+    last_pair = sum(estimate_tokens(content) for _, content in history[-2:])
+    budget = estimate_tokens("system") + estimate_tokens("вопрос") + last_pair
+
+    messages, total = PromptBuilder(token_budget=budget, verbatim_messages=2).build("system", history, "вопрос")
+    assert messages == history[-2:]
+    assert messages[0][0] == ROLE_USER
+    assert total <= budget
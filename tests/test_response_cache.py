@@ -0,0 +1,42 @@
+import pytest
+
+from response_cache import ResponseCache, normalize_question
+
+
+@pytest.mark.parametrize("question, expected", [
+    ("Как закрепить строку в Excel?", "как закрепить строку в excel"),
+    ("  как   ЗАКРЕПИТЬ строку\tв excel ", "как закрепить строку в excel"),
+    ("Где настройки «Ёлочкой»?!", "где настройки елочкой"),
+    ("ВПР/XLOOKUP: что выбрать...", "впр/xlookup: что выбрать"),
+    ("Почему =A1/B1 дает #ДЕЛ/0!", "почему =a1/b1 дает дел/0"),
+])
+def test_normalize_question(question, expected):
+    assert normalize_question(question) == expected
+
+
+def test_equivalent_questions_share_cache_key():
+    key = ResponseCache.make_key("Как закрепить строку в Excel?")
+    assert ResponseCache.make_key("как закрепить строку в excel") == key
+    assert ResponseCache.make_key("КАК ЗАКРЕПИТЬ  СТРОКУ В EXCEL!!!") == key
+    assert ResponseCache.make_key("Как закрепить столбец в Excel?") != key
+
+
+@pytest.mark.parametrize("first, second", [
+    ("Что вернет =A1/B1?", "Что вернет =A1*B1?"),
+    ("Что вернет =A1+B1?", "Что вернет =A1-B1?"),
+    ("Ошибка в =ВПР(A1;B:C;2;0)", "Ошибка в =ВПР(A1,B:C,2,0)"),
+    ("Чем =$A$1 отличается от =A1", "Чем =A$1 отличается от =$A1"),
+    ("Как сослаться на =Лист1!A1", "Как сослаться на =Лист1 A1"),
+    ("Формула =ЕСЛИ(A1>0;1;0)", "Формула =ЕСЛИ(A1<0;1;0)"),
+])
+def test_different_formulas_do_not_share_cache_key(first, second):
+    assert ResponseCache.make_key(first) != ResponseCache.make_key(second)
+
+
+def test_cache_hit_for_normalized_question():
+    cache = ResponseCache(max_entries=10, ttl=3600)
+    cache.put("Как закрепить строку в Excel?", "Вид → Закрепить области")
+
+    assert cache.get("как закрепить строку в excel") == "Вид → Закрепить области"
+    assert cache.get("Как удалить строку в Excel?") is None
+    assert (cache.hits, cache.misses) == (1, 1)
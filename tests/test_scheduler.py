@@ -0,0 +1,194 @@
+import asyncio
+
+import pytest
+
+import scheduler
+from scheduler import LANE_OCR, LANE_TEXT, FairScheduler, RateLimitedError, TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(scheduler.time, "monotonic", fake)
+    return fake
+
+
+def test_token_bucket_burst_then_refill(clock):
+    bucket = TokenBucket(rate=0.5, capacity=3)
+    assert [bucket.take() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket.take() == pytest.approx(2.0)
+
+    clock.now += 2
+    assert bucket.take() == 0.0
+    assert bucket.take() == pytest.approx(2.0)
+
+    # Простой дольше полного восстановления не дает больше capacity запросов подряд
+    clock.now += 60
+    assert [bucket.take() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket.take() > 0
+
+
+def test_rate_limit_is_per_user(clock):
+    async def scenario():
+        fair = FairScheduler(text_workers=1, ocr_workers=1)
+        try:
+            for _ in range(scheduler.Config.RATE_LIMIT_TEXT_BURST):
+                await fair.run(LANE_TEXT, 1, 1, _value(None))
+            with pytest.raises(RateLimitedError):
+                await fair.run(LANE_TEXT, 1, 1, _value(None))
+            await fair.run(LANE_TEXT, 2, 2, _value(None))
+            assert fair.stats()["rejected"] == 1
+        finally:
+            await fair.shutdown()
+
+    asyncio.run(scenario())
+
+
+def _value(value):
+    async def factory():
+        return value
+    return factory
+
+
+def _recorder(order: list, name, gate: asyncio.Event = None):
+    async def factory():
+        order.append(("start", name))
+        if gate is not None:
+            await gate.wait()
+        await asyncio.sleep(0)
+        order.append(("end", name))
+        return name
+    return factory
+
+
+def test_round_robin_across_chats():
+    async def scenario():
+        fair = FairScheduler(text_workers=1, ocr_workers=1)
+        order = []
+        gate = asyncio.Event()
+        try:
+            # Единственный воркер занят, пока в очередь встают задачи двух чатов
+            blocker = asyncio.create_task(fair.run(LANE_TEXT, 0, 0, _recorder(order, "blocker", gate)))
+            await asyncio.sleep(0)
+            jobs = [asyncio.create_task(fair.run(LANE_TEXT, chat, chat, _recorder(order, name)))
+                    for chat, name in ((1, "a1"), (1, "a2"), (1, "a3"), (2, "b1"), (2, "b2"))]
+            await asyncio.sleep(0)
+            gate.set()
+            await asyncio.gather(blocker, *jobs)
+        finally:
+            await fair.shutdown()
+        return [name for event, name in order if event == "start"]
+
+    assert asyncio.run(scenario()) == ["blocker", "a1", "b1", "a2", "b2", "a3"]
+
+
+def test_queue_position_is_reported_when_workers_are_busy():
+    async def scenario():
+        fair = FairScheduler(text_workers=1, ocr_workers=1)
+        gate = asyncio.Event()
+        notices = []
+
+        def notify(name):
+            async def on_queued(position):
+                notices.append((name, position))
+            return on_queued
+
+        try:
+            # Свободный воркер: уведомления нет
+            blocker = asyncio.create_task(
+                fair.run(LANE_TEXT, 1, 1, _recorder([], "blocker", gate), on_queued=notify("blocker")))
+            await asyncio.sleep(0)
+            jobs = []
+            for chat, name in ((2, "b1"), (3, "c1"), (2, "b2")):
+                jobs.append(asyncio.create_task(fair.run(LANE_TEXT, chat, chat, _value(name), on_queued=notify(name))))
+                await asyncio.sleep(0)
+            gate.set()
+            await asyncio.gather(blocker, *jobs)
+        finally:
+            await fair.shutdown()
+        return notices
+
+    # Вторая задача чата 2 пропускает вперед задачу чата 3
+    assert asyncio.run(scenario()) == [("b1", 1), ("c1", 2), ("b2", 3)]
+
+
+def test_workers_bound_concurrency_across_chats():
+    async def scenario():
+        fair = FairScheduler(text_workers=2, ocr_workers=1)
+        running = []
+        peak = 0
+
+        def job():
+            async def factory():
+                nonlocal peak
+                running.append(1)
+                peak = max(peak, len(running))
+                await asyncio.sleep(0.01)
+                running.pop()
+            return factory
+
+        try:
+            await asyncio.gather(*(fair.run(LANE_TEXT, chat, chat, job()) for chat in range(6)))
+            stats = fair.stats()[LANE_TEXT]
+        finally:
+            await fair.shutdown()
+        return peak, stats
+
+    peak, stats = asyncio.run(scenario())
+    assert peak == 2
+    assert stats["completed"] == 6
+    assert stats["depth"] == 0
+
+
+def test_jobs_of_one_chat_never_overlap():
+    async def scenario():
+        fair = FairScheduler(text_workers=4, ocr_workers=2)
+        order = []
+        try:
+            await asyncio.gather(
+                fair.run(LANE_OCR, 1, 1, _recorder(order, "document")),
+                fair.run(LANE_TEXT, 1, 1, _recorder(order, "question1")),
+                fair.run(LANE_TEXT, 1, 1, _recorder(order, "question2")),
+                fair.run(LANE_TEXT, 2, 2, _recorder(order, "other")),
+            )
+        finally:
+            await fair.shutdown()
+        return order
+
+    order = asyncio.run(scenario())
+    own = [item for item in order if item[1] != "other"]
+    # Задачи чата 1 идут строго одна за другой, в порядке постановки в очередь
+    assert own == [("start", "document"), ("end", "document"),
+                   ("start", "question1"), ("end", "question1"),
+                   ("start", "question2"), ("end", "question2")]
+    # Другой чат при этом не ждет
+    assert order.index(("start", "other")) < order.index(("end", "document"))
+
+
+def test_cancelled_job_releases_chat():
+    async def scenario():
+        fair = FairScheduler(text_workers=1, ocr_workers=1)
+        gate = asyncio.Event()
+        order = []
+        try:
+            blocker = asyncio.create_task(fair.run(LANE_TEXT, 1, 1, _recorder(order, "blocker", gate)))
+            await asyncio.sleep(0)
+            cancelled = asyncio.create_task(fair.run(LANE_TEXT, 1, 1, _recorder(order, "cancelled")))
+            await asyncio.sleep(0)
+            cancelled.cancel()
+            gate.set()
+            await blocker
+            assert await fair.run(LANE_TEXT, 1, 1, _value("next")) == "next"
+        finally:
+            await fair.shutdown()
+        assert not fair.active
+
+    asyncio.run(scenario())
@@ -0,0 +1,89 @@
+import session_store
+from session_store import ROLE_ASSISTANT, ROLE_USER, SessionStore
+
+
+def _exchange(store, chat_id, n: int, size: int = 10):
+    store.append(chat_id, ROLE_USER, f"q{n}" + "x" * size)
+    store.append(chat_id, ROLE_ASSISTANT, f"a{n}" + "x" * size)
+
+
+def _names(history: list) -> list:
+    return [content[:2] for _, content in history]
+
+
+def test_histories_are_kept_per_chat():
+    store = SessionStore(max_messages=10, max_bytes=10**9, ttl=3600)
+    _exchange(store, 1, 0)
+    _exchange(store, 2, 5)
+    assert _names(store.get_history(1)) == ["q0", "a0"]
+    assert _names(store.get_history(2)) == ["q5", "a5"]
+
+    store.clear(1)
+    assert store.get_history(1) == []
+    assert store.stats()["sessions"] == 1
+
+
+def test_message_limit_keeps_latest_messages():
+    store = SessionStore(max_messages=4, max_bytes=10**9, ttl=3600)
+    for n in range(3):
+        _exchange(store, 1, n)
+    assert _names(store.get_history(1)) == ["q1", "a1", "q2", "a2"]
+
+
+def test_least_recently_used_chat_is_evicted_first():
+    store = SessionStore(max_messages=10, max_bytes=10**9, ttl=3600)
+    for chat_id in (1, 2, 3):
+        _exchange(store, chat_id, chat_id, size=1000)
+    store.get_history(1)
+    store.max_bytes = store.memory_usage()
+
+    _exchange(store, 4, 4, size=1000)
+    assert store.get_history(2) == []
+    assert store.get_history(1) and store.get_history(3) and store.get_history(4)
+    assert store.stats()["evicted"] == 1
+    assert store.memory_usage() <= store.max_bytes
+
+
+def test_idle_sessions_expire(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(session_store.time, "monotonic", lambda: now[0])
+    store = SessionStore(max_messages=10, max_bytes=10**9, ttl=60)
+    _exchange(store, 1, 0)
+    now[0] += 30
+    _exchange(store, 2, 0)
+
+    now[0] += 40
+    assert store.get_history(1) == []
+    assert _names(store.get_history(2)) == ["q0", "a0"]
+
+
+def test_memory_usage_matches_stored_messages():
+    store = SessionStore(max_messages=4, max_bytes=10**9, ttl=3600)
+    for n in range(5):
+        _exchange(store, 1, n, size=n * 50)
+    fresh = SessionStore(max_messages=4, max_bytes=10**9, ttl=3600)
+    for role, content in store.get_history(1):
+        fresh.append(1, role, content)
+    assert store.memory_usage() == fresh.memory_usage() == store.stats()["bytes"]
+
+
+def test_message_limit_drops_whole_pairs():
+    store = SessionStore(max_messages=5, max_bytes=10**9, ttl=3600)
+    for n in range(4):
+        _exchange(store, 1, n)
+    history = store.get_history(1)
+    assert _names(history) == ["q2", "a2", "q3", "a3"]
+    assert history[0][0] == ROLE_USER
+
+
+def test_memory_limit_drops_whole_pairs_and_keeps_last_exchange():
+    store = SessionStore(max_messages=100, max_bytes=10**9, ttl=3600)
+    _exchange(store, 1, 0)
+    _exchange(store, 1, 1)
+    store.max_bytes = store.memory_usage()
+
+    store.append(1, ROLE_USER, "q2" + "x" * 1000)
+    assert _names(store.get_history(1)) == ["q2"]
+    store.append(1, ROLE_ASSISTANT, "a2" + "x" * 1000)
+    assert _names(store.get_history(1)) == ["q2", "a2"]
+    assert store.memory_usage() == store._sessions[1].size
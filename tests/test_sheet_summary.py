@@ -0,0 +1,55 @@
+from datetime import date
+
+import pytest
+
+from config import Config
+from file_processor import FileProcessor
+from sheet_summary import SheetSummary, format_row
+
+
+@pytest.fixture
+def processor(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "DOWNLOAD_DIR", str(tmp_path / "downloads"))
+    monkeypatch.setattr(Config, "XLSX_FULL_ROWS", 10)
+    monkeypatch.setattr(Config, "XLSX_SAMPLE_ROWS", 2)
+    return FileProcessor()
+
+
+def _xlsx(tmp_path, rows: list):
+    openpyxl = pytest.importorskip("openpyxl")
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "Данные"
+    for row in rows:
+        ws.append(row)
+    path = tmp_path / "table.xlsx"
+    wb.save(str(path))
+    return path
+
+
+def test_format_row_drops_trailing_empty_cells():
+    assert format_row(["a", 1.5, date(2024, 1, 2), None, ""]) == "a\t1.5\t2024-01-02"
+
+
+def test_small_sheet_is_emitted_verbatim(processor, tmp_path):
+    path = _xlsx(tmp_path, [["Имя", "Сумма"], ["Анна", 10], [None, None], ["Борис", 20]])
+    assert processor.process_xlsx(path) == "📊 Лист: Данные\nИмя\tСумма\nАнна\t10\nБорис\t20"
+
+
+def test_large_sheet_is_summarized(processor, tmp_path):
+    rows = [["Имя", "Сумма"]] + [[f"user {i % 3}", i] for i in range(1, 31)]
+    text = processor.process_xlsx(_xlsx(tmp_path, rows))
+
+    assert text.startswith("📊 Лист: Данные (сводка: 30 строк данных × 2 столбцов)")
+    assert "Первые 2 строк:\nuser 1\t1\nuser 2\t2" in text
+    assert "Последние 2 строк:\nuser 2\t29\nuser 0\t30" in text
+    assert "• Имя: текст 30: уникальных 3" in text
+    assert "• Сумма: чисел 30: мин 1, макс 30, среднее 15.5" in text
+
+
+def test_summary_without_header_names_columns():
+    summary = SheetSummary("Лист1", [[1, None], [2, "x"]], sample_rows=1)
+    lines = list(summary.lines())
+    assert "Заголовки" not in "\n".join(lines)
+    assert "• Столбец 1: чисел 2: мин 1, макс 2, среднее 1.5" in lines
+    assert "• Столбец 2: текст 1: уникальных 1, пример \"x\"; пустых 1" in lines
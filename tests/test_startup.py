@@ -0,0 +1,41 @@
+import asyncio
+import os
+import subprocess
+import sys
+
+from bot import OfficeAssistantBot
+from config import Config
+from extraction_executor import ExtractionExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_importing_bot_skips_document_backends():
+    # Отдельный процесс: в процессе тестов эти библиотеки уже могли быть импортированы
+    code = (
+        "import sys, bot; "
+        "print(','.join(m for m in ('fitz', 'openpyxl', 'pytesseract', 'docx', 'webhook_server') if m in sys.modules))"
+    )
+    completed = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert completed.stdout.strip() == ""
+
+
+class FakeGigaChat:
+    def __init__(self):
+        self.warmed_up = False
+
+    async def warm_up(self):
+        self.warmed_up = True
+
+
+def test_warm_up_starts_extraction_workers(monkeypatch):
+    monkeypatch.setattr(Config, "PREWARM", True)
+    bot = OfficeAssistantBot.__new__(OfficeAssistantBot)
+    bot.gigachat_client = FakeGigaChat()
+    bot.extractor = ExtractionExecutor(max_workers=2)
+    try:
+        asyncio.run(bot._warm_up())
+        assert bot.gigachat_client.warmed_up
+        assert len(bot.extractor._pool._processes) == 2
+    finally:
+        bot.extractor.shutdown(wait=True)
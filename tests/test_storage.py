@@ -0,0 +1,112 @@
+import sqlite3
+
+import pytest
+
+import storage as storage_module
+from prompts import format_user_prompt
+from session_store import ROLE_ASSISTANT, ROLE_USER, SessionStore
+from storage import Storage
+
+HISTORY = [(ROLE_USER, "вопрос"), (ROLE_ASSISTANT, "ответ")]
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "bot.sqlite3")
+
+
+@pytest.fixture
+def storage(db_path):
+    # Долгий интервал: без flush изменения остаются в очереди
+    db = Storage(db_path, flush_interval=3600, batch_size=1000)
+    yield db
+    db.close()
+
+
+def _rows(db_path: str) -> list:
+    with sqlite3.connect(db_path) as connection:
+        return connection.execute("SELECT chat_id, messages FROM sessions ORDER BY chat_id").fetchall()
+
+
+def test_reads_see_queued_writes(storage, db_path):
+    storage.save_session(1, HISTORY)
+    storage.put_response("key", "кэшированный ответ", 2e9)
+
+    assert _rows(db_path) == []
+    messages, _ = storage.load_session(1)
+    assert messages == HISTORY
+    assert storage.get_response("key") == ("кэшированный ответ", 2e9)
+    assert storage.stats()["pending"] == 2
+
+    storage.flush()
+    assert storage.stats()["pending"] == 0
+    assert storage.load_session(1)[0] == HISTORY
+    assert storage.get_response("key") == ("кэшированный ответ", 2e9)
+
+
+def test_delete_then_save_coalesces(storage, db_path):
+    storage.save_session(1, HISTORY)
+    storage.save_session(2, HISTORY)
+    storage.flush()
+
+    # Удаление и новая история до сброса - одна запись с последним значением
+    storage.delete_session(1)
+    storage.save_session(1, HISTORY[:1])
+    # Сохранение и удаление до сброса - удаление
+    storage.save_session(2, HISTORY[:1])
+    storage.delete_session(2)
+    assert storage.load_session(1)[0] == HISTORY[:1]
+    assert storage.load_session(2) is None
+
+    written = storage.written
+    storage.flush()
+    assert storage.written - written == 2
+    assert [chat_id for chat_id, _ in _rows(db_path)] == [1]
+    assert storage.load_session(1)[0] == HISTORY[:1]
+
+
+def test_session_ttl_applies_on_load(storage, monkeypatch):
+    now = storage_module.time.time()
+    monkeypatch.setattr(storage_module.time, "time", lambda: now - 120)
+    storage.save_session(1, HISTORY)
+    monkeypatch.undo()
+    storage.save_session(2, HISTORY)
+    storage.flush()
+
+    store = SessionStore(max_messages=10, max_bytes=10**9, ttl=60, storage=storage)
+    assert store.get_history(1) == []
+    assert store.get_history(2) == HISTORY
+    assert store.stats()["loaded"] == 1
+
+
+def test_close_flushes_pending_writes(db_path):
+    db = Storage(db_path, flush_interval=3600, batch_size=1000)
+    store = SessionStore(max_messages=10, max_bytes=10**9, ttl=3600, storage=db)
+    for role, content in HISTORY:
+        store.append(1, role, content)
+    db.close()
+
+    reopened = Storage(db_path, flush_interval=3600, batch_size=1000)
+    try:
+        restored = SessionStore(max_messages=10, max_bytes=10**9, ttl=3600, storage=reopened)
+        assert restored.get_history(1) == HISTORY
+        restored.clear(1)
+        assert restored.get_history(1) == []
+    finally:
+        reopened.close()
+    assert _rows(db_path) == []
+
+
+def test_attachment_content_is_not_persisted(db_path):
+    prompt = format_user_prompt("Что в отчете?", "Отчет за квартал. " * 50 + "Выручка 42 млн", "PDF")
+    db = Storage(db_path, flush_interval=3600, batch_size=1000)
+    store = SessionStore(max_messages=10, max_bytes=10**9, ttl=3600, storage=db)
+    store.append(1, ROLE_USER, prompt)
+    store.append(1, ROLE_ASSISTANT, "ответ")
+    db.close()
+
+    # В памяти - полный вопрос, в базе - ссылка на вложение
+    assert store.get_history(1)[0] == (ROLE_USER, prompt)
+    (_, stored), = _rows(db_path)
+    assert "Выручка 42 млн" not in stored
+    assert "Что в отчете?" in stored and "содержимое" in stored
@@ -0,0 +1,131 @@
+import asyncio
+import time
+
+from telegram.error import RetryAfter
+
+from scheduler import TokenBucket
+from stream_reply import TELEGRAM_MESSAGE_LIMIT, StreamingReply
+
+
+class FakeSent:
+    def __init__(self, chat, text: str):
+        self.chat = chat
+        self.texts = [text]
+
+    async def edit_text(self, text: str):
+        await self.chat.request()
+        self.texts.append(text)
+
+    @property
+    def text(self) -> str:
+        return self.texts[-1]
+
+
+class FakeChat:
+    """Сообщение пользователя: ответы и правки запоминаются, ошибки RetryAfter - по очереди"""
+
+    def __init__(self, delay: float = 0.0, retry_after: list = None):
+        self.delay = delay
+        self.retry_after = list(retry_after or [])
+        self.sent = []
+        self.requests = 0
+
+    async def request(self):
+        self.requests += 1
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.retry_after:
+            raise RetryAfter(self.retry_after.pop(0))
+
+    async def reply_text(self, text: str):
+        await self.request()
+        sent = FakeSent(self, text)
+        self.sent.append(sent)
+        return sent
+
+
+def _unlimited() -> TokenBucket:
+    return TokenBucket(rate=1000, capacity=1000)
+
+
+def test_long_answer_rolls_over_to_next_message():
+    paragraph = "слово " * 100 + "\n\n"
+    answer = paragraph * 12
+
+    async def scenario():
+        chat = FakeChat()
+        reply = StreamingReply(chat, edit_interval=0.01, limiter=_unlimited())
+        for i in range(0, len(answer), 50):
+            await reply.feed(answer[i:i + 50])
+            await asyncio.sleep(0)
+        await reply.finish()
+        return chat
+
+    chat = asyncio.run(scenario())
+    texts = [sent.text for sent in chat.sent]
+    assert len(texts) == 2
+    assert all(len(text) <= TELEGRAM_MESSAGE_LIMIT for text in texts)
+    # Разрыв - по абзацу, текст не теряется
+    assert texts[0].endswith("слово")
+    assert " ".join(" ".join(texts).split()) == " ".join(answer.split())
+
+
+def test_final_edit_waits_out_retry_after():
+    async def scenario():
+        chat = FakeChat(retry_after=[0, 0])
+        reply = StreamingReply(chat, edit_interval=60, limiter=_unlimited())
+        await reply.feed("Ответ")
+        await reply.finish()
+        return chat
+
+    chat = asyncio.run(scenario())
+    assert [sent.text for sent in chat.sent] == ["Ответ"]
+    assert chat.requests == 3
+
+
+def test_intermediate_retry_after_is_skipped_and_slows_down_edits():
+    async def scenario():
+        chat = FakeChat(retry_after=[5])
+        reply = StreamingReply(chat, edit_interval=0.01, limiter=_unlimited())
+        await reply.feed("Нача")
+        await asyncio.sleep(0.05)
+        interval = reply.edit_interval
+        await reply.feed("ло")
+        await reply.finish()
+        return chat, interval
+
+    chat, interval = asyncio.run(scenario())
+    assert interval == 5
+    assert [sent.text for sent in chat.sent] == ["Начало"]
+
+
+def test_feed_does_not_wait_for_telegram():
+    async def scenario():
+        chat = FakeChat(delay=0.2)
+        reply = StreamingReply(chat, edit_interval=0.01, limiter=_unlimited())
+        start = time.monotonic()
+        for _ in range(100):
+            await reply.feed("фрагмент ")
+        fed = time.monotonic() - start
+        await reply.finish()
+        return chat, fed
+
+    chat, fed = asyncio.run(scenario())
+    assert fed < 0.1
+    assert chat.sent[-1].text == "фрагмент " * 100
+
+
+def test_edit_limit_is_shared_between_replies():
+    async def scenario():
+        limiter = TokenBucket(rate=0.001, capacity=2)
+        chats = [FakeChat(), FakeChat(), FakeChat()]
+        replies = [StreamingReply(chat, edit_interval=0.01, limiter=limiter) for chat in chats]
+        for reply in replies:
+            await reply.feed("Промежуточный")
+        await asyncio.sleep(0.05)
+        for reply in replies:
+            reply.cancel()
+        return [chat.requests for chat in chats]
+
+    # Третья промежуточная правка пропущена: токены ушли двум другим ответам
+    assert sorted(asyncio.run(scenario())) == [0, 1, 1]
@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("aiohttp")
+from aiohttp.test_utils import TestClient, TestServer
+
+from config import Config
+from webhook_server import SECRET_HEADER, WebhookServer
+
+MESSAGE = {
+    "update_id": 1,
+    "message": {"message_id": 5, "date": 0, "chat": {"id": 7, "type": "private"}, "text": "привет"},
+}
+
+
+class FakeApplication:
+    bot = None
+
+    def __init__(self):
+        self.update_queue = asyncio.Queue()
+
+
+def _post(body, headers: dict = None, secret: str = "secret"):
+    async def scenario():
+        application = FakeApplication()
+        server = WebhookServer(application, "127.0.0.1", 0, "/telegram", secret)
+        async with TestClient(TestServer(server.app)) as client:
+            if isinstance(body, str):
+                response = await client.post("/telegram", data=body, headers=headers)
+            else:
+                response = await client.post("/telegram", json=body, headers=headers)
+            return response.status, application.update_queue.qsize()
+
+    return asyncio.run(scenario())
+
+
+def test_valid_update_is_queued():
+    assert _post(MESSAGE, {SECRET_HEADER: "secret"}) == (200, 1)
+
+
+def test_wrong_secret_is_rejected():
+    assert _post(MESSAGE, {SECRET_HEADER: "guess"}) == (403, 0)
+
+
+def test_invalid_json_is_rejected():
+    assert _post("{not json", {SECRET_HEADER: "secret"}) == (400, 0)
+
+
+def test_health_reports_pending_updates():
+    async def scenario():
+        application = FakeApplication()
+        await application.update_queue.put(object())
+        server = WebhookServer(application, "127.0.0.1", 0, "/telegram", "secret")
+        async with TestClient(TestServer(server.app)) as client:
+            response = await client.get("/healthz")
+            return await response.json()
+
+    assert asyncio.run(scenario()) == {"status": "ok", "pending_updates": 1}
+
+
+def test_malformed_update_is_acknowledged_and_dropped():
+    broken = {"update_id": 2, "message": {"message_id": "x", "chat": "nope"}}
+    assert _post(broken, {SECRET_HEADER: "secret"}) == (200, 0)
+
+
+def test_webhook_mode_requires_secret(monkeypatch):
+    monkeypatch.setattr(Config, "TELEGRAM_TOKEN", "token")
+    monkeypatch.setattr(Config, "GIGA_CHAT_TOKEN", "token")
+    monkeypatch.setattr(Config, "BOT_MODE", "webhook")
+    monkeypatch.setattr(Config, "WEBHOOK_SECRET", None)
+    with pytest.raises(ValueError, match="WEBHOOK_SECRET"):
+        Config.validate()
+    monkeypatch.setattr(Config, "WEBHOOK_SECRET", "secret")
+    Config.validate()
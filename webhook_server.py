@@ -0,0 +1,68 @@
+import hmac
+import logging
+from aiohttp import web
+from telegram import Update
+from telegram.ext import Application
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+class WebhookServer:
+    """HTTP-сервер aiohttp, принимающий обновления Telegram и передающий их в Application"""
+
+    def __init__(self, application: Application, host: str, port: int, path: str, secret_token: str = None):
+        self.application = application
+        self.host = host
+        self.port = port
+        self.path = path
+        self.secret_token = secret_token
+        self.app = web.Application()
+        self.app.router.add_post(path, self.handle_update)
+        self.app.router.add_get("/healthz", self.handle_health)
+        self._runner = None
+
+    async def handle_update(self, request: web.Request) -> web.Response:
+        """Прием обновления: проверка секрета и постановка в очередь приложения"""
+        if self.secret_token:
+            received = request.headers.get(SECRET_HEADER, "")
+            if not hmac.compare_digest(received, self.secret_token):
+                return web.Response(status=403)
+
+        try:
+            data = await request.json()
+        except ValueError:
+            return web.Response(status=400, text="Invalid JSON")
+
+        # На ошибку Telegram повторяет доставку бесконечно: неразборчивое обновление
+        # записывается в лог и подтверждается
+        try:
+            update = Update.de_json(data, self.application.bot)
+        except Exception as e:
+            logger.warning(f"Invalid update skipped: {e!r}")
+            return web.Response()
+        if update is None:
+            logger.warning("Empty update skipped")
+            return web.Response()
+
+        # Обработка асинхронная: Telegram получает ответ сразу, не дожидаясь GigaChat
+        await self.application.update_queue.put(update)
+        return web.Response()
+
+    async def handle_health(self, request: web.Request) -> web.Response:
+        return web.json_response({"status": "ok", "pending_updates": self.application.update_queue.qsize()})
+
+    async def start(self):
+        self._runner = web.AppRunner(self.app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        logger.info(f"Webhook server listening on http://{self.host}:{self.port}{self.path}")
+        if not self.secret_token:
+            logger.warning("Webhook secret is not set: updates are accepted from anyone")
+
+    async def stop(self):
+        """Прекращение приема новых обновлений"""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None